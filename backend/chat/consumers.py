@@ -0,0 +1,158 @@
+"""
+WebSocket endpoint for real-time chat: ws/chat/?token=<JWT access token>
+
+Plain ASGI application (routed in config.asgi). After connecting, the
+client subscribes to the rooms it shows and receives their events (see
+chat.realtime) as JSON text frames.
+
+Client -> server:
+    {"action": "subscribe", "room": 1}
+    {"action": "unsubscribe", "room": 1}
+    {"action": "typing", "room": 1}
+    {"action": "ping"}  keeps the user online while idle (chat.presence)
+
+Server -> client:
+    room events ("message", "read", "typing")
+    {"type": "subscribed", "room": 1} / {"type": "unsubscribed", "room": 1}
+    {"type": "pong"}
+    {"type": "error", "error": "..."}
+"""
+import asyncio
+import json
+from urllib.parse import parse_qs
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from .models import ChatParticipant
+from .presence import get_presence_store
+from .realtime import get_broker, room_channel
+
+# Close codes (4000-4999 are application defined)
+CLOSE_UNAUTHORIZED = 4401
+
+
+def database_sync_to_async(func):
+    """sync_to_async that recycles stale connections, as Django does per request"""
+    def wrapper(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(wrapper)
+
+
+@database_sync_to_async
+def _authenticate(scope):
+    """User of the access token in the query string, or None"""
+    token = parse_qs(scope.get('query_string', b'').decode()).get('token', [None])[0]
+    if not token:
+        return None
+    authentication = JWTAuthentication()
+    try:
+        user = authentication.get_user(authentication.get_validated_token(token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+    return user if user.is_active else None
+
+
+@database_sync_to_async
+def _is_participant(user, room_id) -> bool:
+    return ChatParticipant.objects.filter(room_id=room_id, user=user).exists()
+
+
+class ChatConnection:
+    """Room subscriptions of one WebSocket connection"""
+
+    def __init__(self, user, send):
+        self.user = user
+        self._send = send
+        self._forwarders = {}
+
+    async def send_json(self, data: dict):
+        await self._send({'type': 'websocket.send', 'text': json.dumps(data, cls=DjangoJSONEncoder)})
+
+    async def touch(self):
+        await sync_to_async(get_presence_store().touch)(self.user.id)
+
+    async def handle(self, text: str):
+        await self.touch()
+        try:
+            data = json.loads(text or '')
+            action = data['action']
+            if action == 'ping':
+                await self.send_json({'type': 'pong'})
+                return
+            room_id = int(data['room'])
+        except (ValueError, TypeError, KeyError):
+            await self.send_json({'type': 'error', 'error': 'Expected {"action": ..., "room": <id>}'})
+            return
+
+        if action == 'unsubscribe':
+            self._stop(room_id)
+            await self.send_json({'type': 'unsubscribed', 'room': room_id})
+        elif action in ('subscribe', 'typing'):
+            if room_id not in self._forwarders and not await _is_participant(self.user, room_id):
+                await self.send_json({'type': 'error', 'error': 'Not a participant', 'room': room_id})
+            elif action == 'subscribe':
+                await self.subscribe(room_id)
+            else:
+                await sync_to_async(get_presence_store().set_typing)(room_id, self.user.id)
+                await sync_to_async(get_broker().publish)(room_channel(room_id), {
+                    'type': 'typing', 'room': room_id,
+                    'user_id': self.user.id, 'username': self.user.username,
+                })
+        else:
+            await self.send_json({'type': 'error', 'error': f'Unknown action: {action}'})
+
+    async def subscribe(self, room_id: int):
+        if room_id not in self._forwarders:
+            subscription = await get_broker().subscribe(room_channel(room_id))
+            self._forwarders[room_id] = (subscription, asyncio.ensure_future(self._forward(subscription)))
+        await self.send_json({'type': 'subscribed', 'room': room_id})
+
+    async def _forward(self, subscription):
+        while True:
+            event = await subscription.get()
+            # Don't echo the user's own typing events
+            if event.get('type') == 'typing' and event.get('user_id') == self.user.id:
+                continue
+            await self.send_json(event)
+
+    def _stop(self, room_id: int):
+        forwarder = self._forwarders.pop(room_id, None)
+        if forwarder is not None:
+            subscription, task = forwarder
+            subscription.close()
+            task.cancel()
+
+    def close(self):
+        for room_id in list(self._forwarders):
+            self._stop(room_id)
+
+
+async def chat_socket(scope, receive, send):
+    """ASGI application of the chat WebSocket"""
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+
+    user = await _authenticate(scope)
+    if user is None:
+        await send({'type': 'websocket.close', 'code': CLOSE_UNAUTHORIZED})
+        return
+    await send({'type': 'websocket.accept'})
+
+    connection = ChatConnection(user, send)
+    await connection.touch()
+    try:
+        while True:
+            message = await receive()
+            if message['type'] == 'websocket.disconnect':
+                break
+            if message['type'] == 'websocket.receive':
+                await connection.handle(message.get('text'))
+    finally:
+        connection.close()
@@ -0,0 +1,65 @@
+"""
+Inbox query layer (room list)
+
+inbox_rooms() returns a user's rooms with everything the room list shows
+computed in the same query, so the list costs two queries (rooms and the
+other participants of direct rooms) however many rooms the user has:
+
+- participants_count: correlated COUNT subquery
+- last_message_id / last_message_text / last_message_at: latest message,
+  correlated subqueries on the (room, created_at, id) index
+- unread_count: the user's participant counter (see chat.unread)
+- last_activity_at: last_message_at, or created_at for empty rooms;
+  the inbox order and pagination key (see chat.pagination.InboxPagination)
+"""
+from django.db.models import (
+    Count, F, FilteredRelation, IntegerField, OuterRef, Prefetch, Q, QuerySet, Subquery, Value
+)
+from django.db.models.functions import Coalesce
+from .models import ChatMessage, ChatParticipant, ChatRoom
+
+
+def _count(queryset) -> Coalesce:
+    """COUNT(*) of a queryset correlated on room, as an annotation"""
+    return Coalesce(
+        Subquery(
+            queryset.order_by().values('room').annotate(count=Count('id')).values('count'),
+            output_field=IntegerField()
+        ),
+        Value(0)
+    )
+
+
+def inbox_rooms(user) -> QuerySet:
+    """
+    Rooms of a user, annotated for the room list, most recently active first
+
+    Direct rooms get other_participants: the other ChatParticipant(s) with
+    user and profile loaded.
+
+    Args:
+        user: User instance
+    """
+    last_message = ChatMessage.objects.filter(room=OuterRef('pk')).order_by('-created_at', '-id')
+
+    return ChatRoom.objects.annotate(
+        membership=FilteredRelation('participant_info', condition=Q(participant_info__user=user)),
+    ).filter(
+        membership__isnull=False
+    ).annotate(
+        participants_count=_count(ChatParticipant.objects.filter(room=OuterRef('pk'))),
+        last_message_id=Subquery(last_message.values('id')[:1]),
+        last_message_text=Subquery(last_message.values('text')[:1]),
+        last_message_at=Subquery(last_message.values('created_at')[:1]),
+        unread_count=F('membership__unread_count'),
+    ).annotate(
+        last_activity_at=Coalesce(F('last_message_at'), F('created_at')),
+    ).prefetch_related(
+        Prefetch(
+            'participant_info',
+            queryset=ChatParticipant.objects.filter(
+                room__room_type='direct'
+            ).exclude(user=user).select_related('user__profile'),
+            to_attr='other_participants'
+        )
+    ).order_by('-last_activity_at', '-id')
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0002_chatmessage_translation_de_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['room', 'created_at', 'id'], name='chat_msg_room_created_idx'),
+        ),
+    ]
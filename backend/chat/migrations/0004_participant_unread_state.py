@@ -0,0 +1,47 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:03
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def backfill_unread_state(apps, schema_editor):
+    """Count messages from others since last_read_at (or joining)"""
+    ChatParticipant = apps.get_model('chat', 'ChatParticipant')
+    ChatMessage = apps.get_model('chat', 'ChatMessage')
+    read_messages = ChatMessage.objects.filter(
+        room=OuterRef('room'), created_at__lte=OuterRef('last_read_at')
+    ).order_by('-created_at', '-id')
+    unread = ChatMessage.objects.filter(
+        room=OuterRef('room'), created_at__gt=Coalesce(OuterRef('last_read_at'), OuterRef('joined_at'))
+    ).exclude(sender=OuterRef('user')).order_by().values('room').annotate(count=Count('id')).values('count')
+    ChatParticipant.objects.update(
+        last_read_message=Subquery(read_messages.values('id')[:1]),
+        unread_count=Coalesce(Subquery(unread, output_field=models.IntegerField()), Value(0))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0003_chatmessage_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatparticipant',
+            name='last_read_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='chat.chatmessage'),
+        ),
+        migrations.AddField(
+            model_name='chatparticipant',
+            name='unread_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_unread_state, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='chatparticipant',
+            index=models.Index(fields=['user', 'unread_count'], name='chat_participant_unread_idx'),
+        ),
+    ]
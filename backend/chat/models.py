@@ -44,9 +44,17 @@ class ChatParticipant(models.Model):
     nickname = models.CharField(max_length=100, blank=True)
     joined_at = models.DateTimeField(auto_now_add=True)
     last_read_at = models.DateTimeField(null=True, blank=True)
+    # Maintained on send and mark-read (chat.unread)
+    unread_count = models.PositiveIntegerField(default=0)
+    last_read_message = models.ForeignKey('ChatMessage', on_delete=models.SET_NULL, null=True, blank=True,
+                                          related_name='+')
 
     class Meta:
         unique_together = ['room', 'user']
+        indexes = [
+            # Unread badge: SUM(unread_count) of a user
+            models.Index(fields=['user', 'unread_count'], name='chat_participant_unread_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} in {self.room.name}"
@@ -91,6 +99,10 @@ class ChatMessage(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            # Keyset pagination (chat.pagination)
+            models.Index(fields=['room', 'created_at', 'id'], name='chat_msg_room_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.sender.username}: {self.text[:50]}"
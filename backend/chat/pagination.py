@@ -0,0 +1,165 @@
+"""
+Keyset pagination for chat
+
+Offsets (and "everything, ordered") get slower as a room's history grows.
+Keyset pages seek from a cursor instead, so a page costs the same
+however long the history is.
+
+Messages (MessageKeysetPagination), on (room, created_at, id).
+Query params:
+    before_id: page of messages older than this message (scrolling back)
+    after_id: messages newer than this message (incremental sync)
+    since: messages created after an ISO 8601 timestamp, e.g. the last
+        time the client was in the room ("since last seen")
+    limit: page size (default 50, max 200)
+
+Without a cursor the latest page is returned. Messages of a page are
+always oldest first.
+
+Rooms (InboxPagination), on (last_activity_at, id) of chat.inbox.
+Query params:
+    before, before_id: rooms less recently active than this cursor
+        (the before / before_id of the previous page)
+    limit: page size (default 20, max 100)
+"""
+from datetime import timezone as dt_timezone
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+MESSAGE_PAGE_SIZE = 50
+MAX_MESSAGE_PAGE_SIZE = 200
+
+
+def _timestamp(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        parsed = parse_datetime(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValidationError({name: 'Expected an ISO 8601 timestamp'})
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, dt_timezone.utc)
+    return parsed
+
+
+def _positive_int(params, name):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        value = 0
+    if value < 1:
+        raise ValidationError({name: 'Must be a positive integer'})
+    return value
+
+
+class MessageKeysetPagination(BasePagination):
+    """
+    Keyset pagination for a queryset of one room's messages
+
+    The response is {"results", "has_more", "before_id", "after_id"}:
+    pass before_id to load older messages, after_id to sync newer ones.
+    has_more tells whether another page exists in the requested direction.
+    """
+    page_size = MESSAGE_PAGE_SIZE
+    max_page_size = MAX_MESSAGE_PAGE_SIZE
+
+    def _cursor_created_at(self, queryset, message_id):
+        created_at = queryset.filter(id=message_id).values_list('created_at', flat=True).first()
+        if created_at is None:
+            raise ValidationError({'cursor': f'Message {message_id} not found in this room'})
+        return created_at
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        limit = min(_positive_int(params, 'limit') or self.page_size, self.max_page_size)
+        before_id = _positive_int(params, 'before_id')
+        after_id = _positive_int(params, 'after_id')
+        since = _timestamp(params, 'since')
+        queryset = queryset.order_by()
+
+        if before_id:
+            created_at = self._cursor_created_at(queryset, before_id)
+            queryset = queryset.filter(
+                Q(created_at__lte=created_at), Q(created_at__lt=created_at) | Q(id__lt=before_id)
+            )
+            newest_first = True
+        elif after_id:
+            created_at = self._cursor_created_at(queryset, after_id)
+            queryset = queryset.filter(
+                Q(created_at__gte=created_at), Q(created_at__gt=created_at) | Q(id__gt=after_id)
+            )
+            newest_first = False
+        elif since:
+            queryset = queryset.filter(created_at__gt=since)
+            newest_first = False
+        else:
+            newest_first = True
+
+        order = ('-created_at', '-id') if newest_first else ('created_at', 'id')
+        messages = list(queryset.order_by(*order)[:limit + 1])
+        self.has_more = len(messages) > limit
+        messages = messages[:limit]
+        if newest_first:
+            messages.reverse()
+
+        self.before_id = messages[0].id if messages else before_id
+        self.after_id = messages[-1].id if messages else after_id
+        return messages
+
+    def get_paginated_response(self, data):
+        return Response({
+            'results': data,
+            'has_more': self.has_more,
+            'before_id': self.before_id,
+            'after_id': self.after_id,
+        })
+
+
+class InboxPagination(BasePagination):
+    """
+    Keyset pagination for chat.inbox.inbox_rooms(), most recently active first
+
+    The response is {"results", "has_more", "before", "before_id"}: pass
+    before and before_id to load the next page.
+    """
+    page_size = 20
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        limit = min(_positive_int(params, 'limit') or self.page_size, self.max_page_size)
+        before = _timestamp(params, 'before')
+        before_id = _positive_int(params, 'before_id')
+        if (before is None) != (before_id is None):
+            raise ValidationError({'cursor': 'before and before_id go together'})
+
+        if before is not None:
+            queryset = queryset.filter(
+                Q(last_activity_at__lte=before),
+                Q(last_activity_at__lt=before) | Q(id__lt=before_id)
+            )
+        rooms = list(queryset.order_by('-last_activity_at', '-id')[:limit + 1])
+        self.has_more = len(rooms) > limit
+        rooms = rooms[:limit]
+
+        self.before = rooms[-1].last_activity_at if self.has_more else None
+        self.before_id = rooms[-1].id if self.has_more else None
+        return rooms
+
+    def get_paginated_response(self, data):
+        return Response({
+            'results': data,
+            'has_more': self.has_more,
+            'before': self.before.isoformat() if self.before else None,
+            'before_id': self.before_id,
+        })
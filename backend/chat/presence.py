@@ -0,0 +1,141 @@
+"""
+Ephemeral presence and typing state (TTL store)
+
+Online status and "is typing" expire on their own after a few seconds,
+so they live in a TTL key-value store instead of the database: a typing
+ping is one store write, and nothing has to be swept.
+
+- online: refreshed by chat activity (REST requests, WebSocket messages
+  and pings), expires after PRESENCE_TTL seconds
+- typing: per (room, user), expires after TYPING_TTL seconds
+
+The store is chosen by the CHAT_PRESENCE_STORE setting:
+- InMemoryPresenceStore: this process only (single node, tests)
+- RedisPresenceStore: shared by every process
+"""
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+PRESENCE_TTL = 60
+TYPING_TTL = 5
+
+
+class PresenceStore:
+    """TTL store interface"""
+
+    def touch(self, user_id: int):
+        """Mark a user online for PRESENCE_TTL seconds"""
+        raise NotImplementedError
+
+    def online(self, user_ids: Iterable[int]) -> Set[int]:
+        """The given users that are online"""
+        raise NotImplementedError
+
+    def set_typing(self, room_id: int, user_id: int):
+        """Mark a user as typing in a room for TYPING_TTL seconds"""
+        raise NotImplementedError
+
+    def typing(self, room_id: int) -> List[int]:
+        """Users typing in a room"""
+        raise NotImplementedError
+
+
+class InMemoryPresenceStore(PresenceStore):
+    """Expiry times in process memory; expired entries are dropped lazily"""
+
+    # Prune expired online entries when there are more than this many
+    PRUNE_THRESHOLD = 10000
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._online: Dict[int, float] = {}
+        self._typing: Dict[int, Dict[int, float]] = {}
+
+    def touch(self, user_id: int):
+        now = self._clock()
+        with self._lock:
+            self._online[user_id] = now + PRESENCE_TTL
+            if len(self._online) > self.PRUNE_THRESHOLD:
+                self._online = {uid: expires for uid, expires in self._online.items() if expires > now}
+
+    def online(self, user_ids: Iterable[int]) -> Set[int]:
+        now = self._clock()
+        with self._lock:
+            return {user_id for user_id in user_ids if self._online.get(user_id, 0) > now}
+
+    def set_typing(self, room_id: int, user_id: int):
+        with self._lock:
+            self._typing.setdefault(room_id, {})[user_id] = self._clock() + TYPING_TTL
+
+    def typing(self, room_id: int) -> List[int]:
+        now = self._clock()
+        with self._lock:
+            room = self._typing.get(room_id)
+            if not room:
+                return []
+            for user_id in [uid for uid, expires in room.items() if expires <= now]:
+                del room[user_id]
+            if not room:
+                del self._typing[room_id]
+            return list(room)
+
+
+class RedisPresenceStore(PresenceStore):
+    """
+    Redis backend
+
+    online: one key per user with an expiry (SET EX / MGET).
+    typing: one sorted set per room, scored by expiry time.
+    """
+
+    def __init__(self, url: Optional[str] = None, prefix: str = 'chat:presence:'):
+        import redis
+
+        self._client = redis.Redis.from_url(url or settings.REDIS_URL)
+        self._prefix = prefix
+
+    def _online_key(self, user_id: int) -> str:
+        return f'{self._prefix}online:{user_id}'
+
+    def _typing_key(self, room_id: int) -> str:
+        return f'{self._prefix}typing:{room_id}'
+
+    def touch(self, user_id: int):
+        self._client.set(self._online_key(user_id), 1, ex=PRESENCE_TTL)
+
+    def online(self, user_ids: Iterable[int]) -> Set[int]:
+        user_ids = list(user_ids)
+        if not user_ids:
+            return set()
+        values = self._client.mget([self._online_key(user_id) for user_id in user_ids])
+        return {user_id for user_id, value in zip(user_ids, values) if value is not None}
+
+    def set_typing(self, room_id: int, user_id: int):
+        key = self._typing_key(room_id)
+        now = time.time()
+        pipeline = self._client.pipeline()
+        pipeline.zadd(key, {user_id: now + TYPING_TTL})
+        pipeline.zremrangebyscore(key, '-inf', now)
+        pipeline.expire(key, TYPING_TTL)
+        pipeline.execute()
+
+    def typing(self, room_id: int) -> List[int]:
+        return [int(user_id) for user_id in self._client.zrangebyscore(self._typing_key(room_id), time.time(), '+inf')]
+
+
+_store: Optional[PresenceStore] = None
+_store_lock = threading.Lock()
+
+
+def get_presence_store() -> PresenceStore:
+    """The process-wide store configured by settings.CHAT_PRESENCE_STORE"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = import_string(settings.CHAT_PRESENCE_STORE)()
+    return _store
@@ -0,0 +1,192 @@
+"""
+Real-time chat events (pub/sub)
+
+Views publish room events once their transaction has committed, and
+WebSocket connections (chat.consumers) subscribe to the rooms the client
+has open and push the events to it, so open chat screens don't poll.
+
+Events are JSON-serializable dicts {"type": ..., "room": room_id, ...}:
+- 'message': a new message ("message": ChatMessageSerializer data)
+- 'read': a participant read the room ("user_id", "last_read_at")
+- 'typing': a participant is typing ("user_id", "username")
+
+The broker is chosen by the CHAT_BROKER setting:
+- InProcessBroker: subscribers of this process only (single node, tests)
+- RedisBroker: Redis pub/sub, delivers to every ASGI process
+"""
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+from typing import Optional
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = 'chat:'
+# Events buffered per subscriber; the oldest are dropped for slow clients
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+def room_channel(room_id: int) -> str:
+    return f'{CHANNEL_PREFIX}room:{room_id}'
+
+
+class Subscription:
+    """Events of one channel for one subscriber, read with await get()"""
+
+    def __init__(self, broker: 'InProcessBroker', channel: str, loop: asyncio.AbstractEventLoop):
+        self.broker = broker
+        self.channel = channel
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def deliver(self, event: dict):
+        """Queue an event (thread-safe)"""
+        try:
+            self._loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # Event loop closed: the connection is gone
+            self.close()
+
+    def _put(self, event: dict):
+        if self._queue.full():
+            self._queue.get_nowait()
+        self._queue.put_nowait(event)
+
+    async def get(self) -> dict:
+        return await self._queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class Broker:
+    """
+    Pub/sub interface
+
+    publish() is called from synchronous code (views); subscribe() from
+    the event loop of an ASGI connection.
+    """
+
+    def publish(self, channel: str, event: dict):
+        raise NotImplementedError
+
+    async def subscribe(self, channel: str) -> Subscription:
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription: Subscription):
+        raise NotImplementedError
+
+
+class InProcessBroker(Broker):
+    """Delivers events to the subscribers of this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def publish(self, channel: str, event: dict):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.deliver(event)
+
+    async def subscribe(self, channel: str) -> Subscription:
+        subscription = Subscription(self, channel, asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.channel]
+
+    def subscriber_count(self, channel: str) -> int:
+        with self._lock:
+            return len(self._subscriptions.get(channel, ()))
+
+
+class RedisBroker(InProcessBroker):
+    """
+    Relays events through Redis pub/sub
+
+    publish() sends to Redis. Each process keeps one pattern subscription
+    to all chat channels and hands the events to its local subscribers,
+    so a process holds one Redis connection however many sockets it has.
+    """
+
+    def __init__(self, url: Optional[str] = None):
+        import redis
+
+        super().__init__()
+        self._url = url or settings.REDIS_URL
+        self._client = redis.Redis.from_url(self._url)
+        self._listener: Optional[asyncio.Task] = None
+
+    def publish(self, channel: str, event: dict):
+        self._client.publish(channel, json.dumps(event, cls=DjangoJSONEncoder))
+
+    async def subscribe(self, channel: str) -> Subscription:
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.ensure_future(self._listen())
+        return await super().subscribe(channel)
+
+    async def _listen(self):
+        from redis import asyncio as aioredis
+
+        client = aioredis.Redis.from_url(self._url)
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.psubscribe(f'{CHANNEL_PREFIX}*')
+            async for message in pubsub.listen():
+                if message['type'] == 'pmessage':
+                    super().publish(message['channel'].decode(), json.loads(message['data']))
+        finally:
+            await pubsub.close()
+            await client.close()
+
+
+_broker: Optional[Broker] = None
+_broker_lock = threading.Lock()
+
+
+def get_broker() -> Broker:
+    """The process-wide broker configured by settings.CHAT_BROKER"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.CHAT_BROKER)()
+    return _broker
+
+
+def publish_room_event(room_id: int, event_type: str, **data):
+    """
+    Publish an event to a room's subscribers after the current transaction commits
+
+    Delivery is best effort: a broker failure is logged and does not fail
+    the request (clients catch up through the REST endpoints).
+
+    Args:
+        room_id: ChatRoom ID
+        event_type: 'message', 'read' or 'typing'
+        **data: Event payload
+    """
+    event = {'type': event_type, 'room': room_id, **data}
+
+    def publish():
+        try:
+            get_broker().publish(room_channel(room_id), event)
+        except Exception:
+            logger.exception('Failed to publish %s event to room %s', event_type, room_id)
+
+    transaction.on_commit(publish)
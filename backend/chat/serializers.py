@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ObjectDoesNotExist
 from .models import ChatRoom, ChatParticipant, ChatMessage
 
 User = get_user_model()
@@ -20,11 +21,18 @@ class ChatParticipantSerializer(serializers.ModelSerializer):
 
 
 class ChatRoomSerializer(serializers.ModelSerializer):
+    """
+    Room list entry
+
+    Expects rooms from chat.inbox.inbox_rooms(), which annotates the counts
+    and the last message and prefetches other_participants. Pass the online
+    user IDs (chat.presence) as context['online_user_ids'].
+    """
     other_user = serializers.SerializerMethodField()
-    participants_count = serializers.SerializerMethodField()
+    participants_count = serializers.IntegerField(read_only=True)
     last_message_preview = serializers.SerializerMethodField()
-    last_message_at = serializers.SerializerMethodField()
-    unread_count = serializers.SerializerMethodField()
+    last_message_at = serializers.DateTimeField(read_only=True)
+    unread_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = ChatRoom
@@ -32,64 +40,39 @@ class ChatRoomSerializer(serializers.ModelSerializer):
                   'last_message_preview', 'last_message_at', 'unread_count', 'created_at', 'updated_at']
 
     def get_other_user(self, obj):
-        # Get the context to check current user
-        request = self.context.get('request')
-        if not request:
+        if obj.room_type != 'direct' or not obj.other_participants:
             return None
 
-        current_user = request.user
-        if obj.room_type == 'direct':
-            # Return the OTHER user (not the current one)
-            participant = obj.participants.exclude(id=current_user.id).first()
-            if participant:
-                profile = None
-                avatar_url = None
-                bio = None
-
-                # Safely get profile and its fields
+        # Return the OTHER user (not the current one)
+        participant = obj.other_participants[0].user
+        avatar_url = None
+        bio = None
+
+        # Safely get profile and its fields
+        try:
+            profile = participant.profile
+        except ObjectDoesNotExist:
+            profile = None
+        if profile is not None:
+            # Only get avatar URL if file exists (has a name)
+            if profile.avatar and profile.avatar.name:
                 try:
-                    if hasattr(participant, 'profile'):
-                        profile = participant.profile
-                        # Only get avatar URL if file exists (has a name)
-                        if profile and hasattr(profile, 'avatar') and profile.avatar and hasattr(profile.avatar, 'name') and profile.avatar.name:
-                            try:
-                                avatar_url = profile.avatar.url
-                            except:
-                                avatar_url = None
-                        # Get bio safely
-                        if profile and hasattr(profile, 'bio'):
-                            bio = profile.bio
-                except:
-                    pass
-
-                return {
-                    'id': participant.id,
-                    'username': participant.username,
-                    'email': participant.email,
-                    'avatar': avatar_url,
-                    'bio': bio,
-                    'online': getattr(participant, 'is_online', False)
-                }
-        return None
-
-    def get_participants_count(self, obj):
-        return obj.participants.count()
+                    avatar_url = profile.avatar.url
+                except ValueError:
+                    avatar_url = None
+            bio = profile.bio
+
+        return {
+            'id': participant.id,
+            'username': participant.username,
+            'email': participant.email,
+            'avatar': avatar_url,
+            'bio': bio,
+            'online': participant.id in self.context.get('online_user_ids', ())
+        }
 
     def get_last_message_preview(self, obj):
-        last_msg = obj.messages.first()
-        if last_msg:
-            return last_msg.text[:50] if last_msg.text else ''
-        return ''
-
-    def get_last_message_at(self, obj):
-        last_msg = obj.messages.first()
-        if last_msg:
-            return last_msg.created_at
-        return None
-
-    def get_unread_count(self, obj):
-        # Simplified - should be calculated based on read receipts
-        return 0
+        return (obj.last_message_text or '')[:50]
 
 
 class ChatMessageSerializer(serializers.ModelSerializer):
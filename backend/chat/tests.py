@@ -1,3 +1,388 @@
-from django.test import TestCase
+import asyncio
+import json
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.contrib.auth import get_user_model
+from datetime import timedelta
+
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from config.asgi import application
+from .consumers import CLOSE_UNAUTHORIZED
+from .models import ChatMessage, ChatParticipant, ChatRoom
+from .presence import PRESENCE_TTL, TYPING_TTL, InMemoryPresenceStore, get_presence_store
+from .realtime import InProcessBroker, get_broker, room_channel
+
+User = get_user_model()
+
+
+class InProcessBrokerTests(SimpleTestCase):
+    def test_publish_reaches_channel_subscribers_only(self):
+        async def scenario():
+            broker = InProcessBroker()
+            first = await broker.subscribe('chat:room:1')
+            second = await broker.subscribe('chat:room:1')
+            other = await broker.subscribe('chat:room:2')
+
+            broker.publish('chat:room:1', {'type': 'message', 'room': 1})
+            self.assertEqual(await asyncio.wait_for(first.get(), 1), {'type': 'message', 'room': 1})
+            self.assertEqual(await asyncio.wait_for(second.get(), 1), {'type': 'message', 'room': 1})
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(other.get(), 0.05)
+
+            first.close()
+            second.close()
+            self.assertEqual(broker.subscriber_count('chat:room:1'), 0)
+            self.assertEqual(broker.subscriber_count('chat:room:2'), 1)
+
+        asyncio.run(scenario())
+
+
+class ChatSocketTests(TransactionTestCase):
+    """End to end over the ASGI application with the in-process broker"""
+
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', email='alice@example.com', password='pass12345')
+        self.bob = User.objects.create_user(username='bob', email='bob@example.com', password='pass12345')
+        self.eve = User.objects.create_user(username='eve', email='eve@example.com', password='pass12345')
+        self.room = ChatRoom.objects.create(room_type='direct', created_by=self.alice)
+        ChatParticipant.objects.create(room=self.room, user=self.alice)
+        ChatParticipant.objects.create(room=self.room, user=self.bob)
+
+    def connect(self, user=None, path='/ws/chat/'):
+        query = f'token={AccessToken.for_user(user)}' if user else ''
+        return ApplicationCommunicator(application, {
+            'type': 'websocket', 'path': path, 'query_string': query.encode(), 'headers': [],
+        })
+
+    async def open(self, user):
+        socket = self.connect(user)
+        await socket.send_input({'type': 'websocket.connect'})
+        self.assertEqual(await socket.receive_output(1), {'type': 'websocket.accept'})
+        return socket
+
+    async def send(self, socket, **data):
+        await socket.send_input({'type': 'websocket.receive', 'text': json.dumps(data)})
+
+    async def receive(self, socket):
+        output = await socket.receive_output(1)
+        self.assertEqual(output['type'], 'websocket.send')
+        return json.loads(output['text'])
+
+    async def subscribe(self, socket, room_id):
+        await self.send(socket, action='subscribe', room=room_id)
+        self.assertEqual(await self.receive(socket), {'type': 'subscribed', 'room': room_id})
+
+    def api(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    async def test_rejects_missing_token(self):
+        socket = self.connect()
+        await socket.send_input({'type': 'websocket.connect'})
+        self.assertEqual(await socket.receive_output(1), {'type': 'websocket.close', 'code': CLOSE_UNAUTHORIZED})
+
+    async def test_rejects_non_participant(self):
+        socket = await self.open(self.eve)
+        await self.send(socket, action='subscribe', room=self.room.id)
+        event = await self.receive(socket)
+        self.assertEqual(event['type'], 'error')
+        self.assertEqual(get_broker().subscriber_count(room_channel(self.room.id)), 0)
+        await socket.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await socket.wait(1)
+
+    async def test_pushes_messages_read_receipts_and_typing(self):
+        alice = await self.open(self.alice)
+        bob = await self.open(self.bob)
+        await self.subscribe(alice, self.room.id)
+        await self.subscribe(bob, self.room.id)
+
+        response = await sync_to_async(self.api(self.bob).post)(
+            reverse('chat:send_message'), {'room': self.room.id, 'text': 'ni hao'}, format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        for socket in (alice, bob):
+            event = await self.receive(socket)
+            self.assertEqual(event['type'], 'message')
+            self.assertEqual(event['room'], self.room.id)
+            self.assertEqual(event['message']['id'], response.data['id'])
+            self.assertEqual(event['message']['text'], 'ni hao')
+
+        response = await sync_to_async(self.api(self.alice).post)(
+            reverse('chat:mark_messages_read', args=[self.room.id])
+        )
+        self.assertEqual(response.status_code, 200)
+        event = await self.receive(bob)
+        self.assertEqual((event['type'], event['user_id']), ('read', self.alice.id))
+        await self.receive(alice)
+
+        # Typing over the socket reaches the others, not the typist
+        await self.send(alice, action='typing', room=self.room.id)
+        event = await self.receive(bob)
+        self.assertEqual((event['type'], event['user_id'], event['username']), ('typing', self.alice.id, 'alice'))
+        self.assertTrue(await alice.receive_nothing(0.1))
+
+        await self.send(bob, action='unsubscribe', room=self.room.id)
+        self.assertEqual(await self.receive(bob), {'type': 'unsubscribed', 'room': self.room.id})
+        for socket in (alice, bob):
+            await socket.send_input({'type': 'websocket.disconnect', 'code': 1000})
+            await socket.wait(1)
+        self.assertEqual(get_broker().subscriber_count(room_channel(self.room.id)), 0)
+
+    def test_typing_endpoint_requires_participant(self):
+        url = reverse('chat:typing_indicator')
+        self.assertEqual(self.api(self.eve).post(url, {'room_id': self.room.id}, format='json').status_code, 403)
+        self.assertEqual(self.api(self.bob).post(url, {'room_id': self.room.id}, format='json').status_code, 200)
+
+
+class MessagePaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reader', email='reader@example.com', password='pass12345')
+        cls.room = ChatRoom.objects.create(room_type='group', name='Study group', created_by=cls.user)
+        ChatParticipant.objects.create(room=cls.room, user=cls.user)
+        ChatMessage.objects.bulk_create(
+            ChatMessage(room=cls.room, sender=cls.user, text=f'message {i}') for i in range(120)
+        )
+        # Pairs of messages share a timestamp: ties are ordered by id
+        start = timezone.now() - timedelta(days=1)
+        cls.ids = list(ChatMessage.objects.order_by('id').values_list('id', flat=True))
+        for position, message_id in enumerate(cls.ids):
+            ChatMessage.objects.filter(id=message_id).update(created_at=start + timedelta(minutes=position // 2))
+        cls.start = start
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, **params):
+        response = self.client.get(reverse('chat:get_messages'), {'room': self.room.id, **params})
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def ids_of(self, page):
+        return [message['id'] for message in page['results']]
+
+    def test_latest_page_by_default(self):
+        page = self.get()
+        self.assertEqual(self.ids_of(page), self.ids[-50:])
+        self.assertTrue(page['has_more'])
+        self.assertEqual(page['before_id'], self.ids[-50])
+
+    def test_before_id_pages_back_through_history(self):
+        collected = []
+        page = self.get(limit=37)
+        while True:
+            collected = self.ids_of(page) + collected
+            if not page['has_more']:
+                break
+            with self.assertNumQueries(3):  # room, cursor, page
+                page = self.get(limit=37, before_id=page['before_id'])
+        self.assertEqual(collected, self.ids)
+
+    def test_after_id_syncs_newer_messages(self):
+        page = self.get(after_id=self.ids[9], limit=20)
+        self.assertEqual(self.ids_of(page), self.ids[10:30])
+        self.assertTrue(page['has_more'])
+
+        page = self.get(after_id=self.ids[-1])
+        self.assertEqual(page['results'], [])
+        self.assertFalse(page['has_more'])
+        self.assertEqual(page['after_id'], self.ids[-1])
+
+    def test_since_returns_messages_after_timestamp(self):
+        since = (self.start + timedelta(minutes=54, seconds=30)).isoformat()
+        page = self.get(since=since)
+        self.assertEqual(self.ids_of(page), self.ids[110:])
+
+    def test_invalid_cursor(self):
+        other = ChatRoom.objects.create(room_type='direct', created_by=self.user)
+        ChatParticipant.objects.create(room=other, user=self.user)
+        foreign = ChatMessage.objects.create(room=other, sender=self.user, text='elsewhere')
+        for params in ({'before_id': foreign.id}, {'after_id': 'x'}, {'since': 'yesterday'}):
+            response = self.client.get(reverse('chat:get_messages'), {'room': self.room.id, **params})
+            self.assertEqual(response.status_code, 400, params)
+
+
+class InboxTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='inbox', email='inbox@example.com', password='pass12345')
+        cls.friends = [
+            User.objects.create_user(username=f'friend{i}', email=f'friend{i}@example.com')
+            for i in range(30)
+        ]
+        now = timezone.now()
+        cls.rooms = []
+        for i, friend in enumerate(cls.friends):
+            room = ChatRoom.objects.create(room_type='direct' if i % 3 else 'group', name=f'room {i}', created_by=cls.user)
+            ChatParticipant.objects.create(room=room, user=cls.user, last_read_at=now - timedelta(hours=10))
+            ChatParticipant.objects.create(room=room, user=friend)
+            if i % 5 == 0:
+                # No messages: ranked by creation time
+                ChatRoom.objects.filter(id=room.id).update(created_at=now - timedelta(days=2) + timedelta(minutes=i))
+                cls.rooms.append(room)
+                continue
+            ChatParticipant.objects.filter(room=room, user=cls.user).update(unread_count=2)
+            messages = ChatMessage.objects.bulk_create([
+                ChatMessage(room=room, sender=cls.user, text='mine'),
+                ChatMessage(room=room, sender=friend, text='old reply'),
+                ChatMessage(room=room, sender=friend, text=f'latest from {friend.username} ' + 'x' * 60),
+            ])
+            # The latest message of room i is i minutes old
+            for message, age in zip(messages, (timedelta(hours=12), timedelta(hours=1), timedelta(minutes=i))):
+                ChatMessage.objects.filter(id=message.id).update(created_at=now - age)
+            cls.rooms.append(room)
+        # A room the user is not in
+        stranger_room = ChatRoom.objects.create(room_type='group', name='elsewhere')
+        ChatParticipant.objects.create(room=stranger_room, user=cls.friends[0])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_room_list_in_constant_queries(self):
+        with self.assertNumQueries(2):  # rooms with annotations, other participants
+            response = self.client.get(reverse('chat:get_chat_rooms'), {'limit': 100})
+        self.assertEqual(response.status_code, 200)
+        rooms = {room['id']: room for room in response.data['results']}
+        self.assertEqual(len(rooms), 30)
+        self.assertFalse(response.data['has_more'])
+
+        room = rooms[self.rooms[1].id]
+        self.assertEqual(room['participants_count'], 2)
+        self.assertEqual(room['unread_count'], 2)
+        self.assertEqual(room['last_message_preview'], ('latest from friend1 ' + 'x' * 60)[:50])
+        self.assertEqual(room['other_user']['username'], 'friend1')
+
+        empty = rooms[self.rooms[5].id]
+        self.assertEqual((empty['unread_count'], empty['last_message_at'], empty['last_message_preview']), (0, None, ''))
+        self.assertIsNone(rooms[self.rooms[3].id]['other_user'])  # group
+
+    def test_paginates_by_last_activity(self):
+        order = []
+        params = {'limit': 7}
+        while True:
+            response = self.client.get(reverse('chat:get_chat_rooms'), params)
+            self.assertEqual(response.status_code, 200)
+            order += [room['id'] for room in response.data['results']]
+            if not response.data['has_more']:
+                break
+            params = {'limit': 7, 'before': response.data['before'], 'before_id': response.data['before_id']}
+
+        # Most recent message first; rooms without messages (newest first) after them
+        with_messages = [room.id for i, room in enumerate(self.rooms) if i % 5]
+        empty = [room.id for i, room in enumerate(self.rooms) if not i % 5]
+        self.assertEqual(order, with_messages + empty[::-1])
+
+
+class UnreadCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(username=f'member{i}', email=f'member{i}@example.com') for i in range(3)
+        ]
+        cls.group = ChatRoom.objects.create(room_type='group', name='Group', created_by=cls.users[0])
+        cls.direct = ChatRoom.objects.create(room_type='direct', created_by=cls.users[0])
+        for user in cls.users:
+            ChatParticipant.objects.create(room=cls.group, user=user)
+        for user in cls.users[:2]:
+            ChatParticipant.objects.create(room=cls.direct, user=user)
+
+    def api(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def send(self, user, room, text='hi'):
+        response = self.api(user).post(reverse('chat:send_message'), {'room': room.id, 'text': text}, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.data['id']
+
+    def participant(self, room, user):
+        return ChatParticipant.objects.get(room=room, user=user)
+
+    def badge(self, user):
+        with self.assertNumQueries(1):
+            response = self.api(user).get(reverse('chat:get_unread_badge'))
+        return response.data['unread_count']
+
+    def test_send_and_mark_read_maintain_counters(self):
+        first, second, third = self.users
+        self.send(first, self.group)
+        self.send(first, self.group)
+        last_id = self.send(second, self.group)
+        self.send(first, self.direct)
+
+        self.assertEqual(self.participant(self.group, third).unread_count, 3)
+        self.assertEqual(self.participant(self.group, second).unread_count, 0)  # sending reads the room
+        self.assertEqual(self.participant(self.group, second).last_read_message_id, last_id)
+        self.assertEqual(self.participant(self.group, first).unread_count, 1)
+        self.assertEqual([self.badge(user) for user in self.users], [1, 1, 3])
+
+        response = self.api(third).post(reverse('chat:mark_messages_read', args=[self.group.id]))
+        self.assertEqual(response.data['last_read_message_id'], last_id)
+        participant = self.participant(self.group, third)
+        self.assertEqual((participant.unread_count, participant.last_read_message_id), (0, last_id))
+        self.assertEqual(self.badge(third), 0)
+
+        rooms = self.api(second).get(reverse('chat:get_chat_rooms')).data['results']
+        self.assertEqual({room['id']: room['unread_count'] for room in rooms}, {self.group.id: 0, self.direct.id: 1})
+
+    def test_mark_read_requires_participant(self):
+        outsider = User.objects.create_user(username='outsider', email='outsider@example.com')
+        response = self.api(outsider).post(reverse('chat:mark_messages_read', args=[self.direct.id]))
+        self.assertEqual(response.status_code, 403)
+
+
+class PresenceTests(TestCase):
+    def setUp(self):
+        # Fresh process-wide store: user IDs can be reused between tests
+        patcher = mock.patch('chat.presence._store', InMemoryPresenceStore())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_in_memory_store_expires_entries(self):
+        now = [1000.0]
+        store = InMemoryPresenceStore(clock=lambda: now[0])
+        store.touch(1)
+        store.set_typing(7, 1)
+        store.set_typing(7, 2)
+        self.assertEqual(store.online([1, 2]), {1})
+        self.assertEqual(sorted(store.typing(7)), [1, 2])
+
+        now[0] += TYPING_TTL + 1
+        self.assertEqual(store.typing(7), [])
+        self.assertEqual(store.online([1]), {1})
+        now[0] += PRESENCE_TTL
+        self.assertEqual(store.online([1]), set())
+
+    def test_typing_ping_does_not_write_to_database(self):
+        first = User.objects.create_user(username='typist', email='typist@example.com')
+        second = User.objects.create_user(username='watcher', email='watcher@example.com')
+        room = ChatRoom.objects.create(room_type='direct', created_by=first)
+        for user in (first, second):
+            ChatParticipant.objects.create(room=room, user=user)
+        typist, watcher = APIClient(), APIClient()
+        typist.force_authenticate(first)
+        watcher.force_authenticate(second)
+
+        with self.assertNumQueries(1):  # participant check only
+            response = typist.post(reverse('chat:typing_indicator'), {'room_id': room.id}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        response = watcher.get(reverse('chat:get_typing_users', args=[room.id]))
+        self.assertEqual([user['username'] for user in response.data], ['typist'])
+        self.assertEqual(typist.get(reverse('chat:get_typing_users', args=[room.id])).data, [])
+
+        # The typist is online now; the watcher only after a chat request
+        self.assertEqual(get_presence_store().online([first.id, second.id]), {first.id})
+        suggested = {user['username']: user['online'] for user in watcher.get(reverse('chat:get_suggested_users')).data}
+        self.assertTrue(suggested['typist'])
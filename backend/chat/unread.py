@@ -0,0 +1,63 @@
+"""
+Denormalized unread state of chat participants
+
+Each participant row keeps unread_count and last_read_message, so the
+room list reads a column and the unread badge is one SUM over the
+(user, unread_count) index instead of counting messages per room.
+
+- record_message(): after a message is created, +1 for the other
+  participants (F() expression, safe under concurrent sends) and reset
+  the sender, who has read up to their own message.
+- mark_read(): reset a participant up to the room's latest message.
+"""
+from django.db import transaction
+from django.db.models import F, QuerySet, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+def record_message(participants: QuerySet, message):
+    """
+    Update the room's counters for a new message
+
+    Args:
+        participants: Participants of the message's room
+        message: Created message
+    """
+    with transaction.atomic():
+        participants.exclude(user_id=message.sender_id).update(unread_count=F('unread_count') + 1)
+        participants.filter(user_id=message.sender_id).update(
+            unread_count=0, last_read_message_id=message.id, last_read_at=message.created_at
+        )
+
+
+def mark_read(participant: QuerySet, messages: QuerySet):
+    """
+    Mark a room read up to its latest message
+
+    The participant row is locked while the latest message is read, so a
+    message sent concurrently is either covered here or counted after.
+
+    Args:
+        participant: Queryset of the participant
+        messages: Messages of the room
+
+    Returns:
+        Updated participant, or None if the queryset is empty
+    """
+    with transaction.atomic():
+        participant = participant.select_for_update().first()
+        if participant is None:
+            return None
+        participant.last_read_message_id = messages.order_by(
+            '-created_at', '-id'
+        ).values_list('id', flat=True).first()
+        participant.unread_count = 0
+        participant.last_read_at = timezone.now()
+        participant.save(update_fields=['last_read_message', 'unread_count', 'last_read_at'])
+    return participant
+
+
+def unread_total(participants: QuerySet) -> int:
+    """Sum of unread_count over a user's participant rows"""
+    return participants.aggregate(total=Coalesce(Sum('unread_count'), 0))['total']
@@ -10,6 +10,7 @@ urlpatterns = [
     path('rooms/create_direct/', views.create_direct_chat, name='create_direct_chat'),
     path('rooms/create_group/', views.create_group_chat, name='create_group_chat'),
     path('rooms/<int:room_id>/read/', views.mark_messages_read, name='mark_messages_read'),
+    path('unread/', views.get_unread_badge, name='get_unread_badge'),
 
     # Messages
     path('messages/', views.get_messages, name='get_messages'),
@@ -21,6 +22,7 @@ urlpatterns = [
 
     # Typing Indicators
     path('typing/', views.typing_indicator, name='typing_indicator'),
+    path('rooms/<int:room_id>/typing/', views.get_typing_users, name='get_typing_users'),
 
     # AI Chat
     path('ai/', views.ai_chat, name='ai_chat'),
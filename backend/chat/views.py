@@ -2,12 +2,18 @@ from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django.contrib.auth import get_user_model
+from django.db import transaction
 
 from .models import ChatRoom, ChatMessage, ChatParticipant
+from .inbox import inbox_rooms
+from .pagination import InboxPagination, MessageKeysetPagination
+from .presence import get_presence_store
+from .realtime import publish_room_event
+from .unread import mark_read, record_message, unread_total
 from .serializers import (
     ChatRoomSerializer, ChatRoomDetailSerializer, ChatMessageSerializer,
     CreateDirectChatSerializer, CreateGroupChatSerializer, SendMessageSerializer,
-    SuggestedUserSerializer
+    SuggestedUserSerializer, UserBasicSerializer
 )
 
 User = get_user_model()
@@ -16,11 +22,22 @@ User = get_user_model()
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def get_chat_rooms(request):
-    """Get all chat rooms for current user"""
-    user = request.user
-    rooms = ChatRoom.objects.filter(participants=user).distinct()
-    serializer = ChatRoomSerializer(rooms, many=True, context={'request': request})
-    return Response(serializer.data)
+    """
+    Get the current user's chat rooms, most recently active first
+
+    Keyset paginated by last message time (see chat.pagination.InboxPagination).
+    """
+    presence = get_presence_store()
+    presence.touch(request.user.id)
+    paginator = InboxPagination()
+    rooms = paginator.paginate_queryset(inbox_rooms(request.user), request)
+    online_user_ids = presence.online(
+        participant.user_id for room in rooms for participant in room.other_participants
+    )
+    serializer = ChatRoomSerializer(rooms, many=True, context={
+        'request': request, 'online_user_ids': online_user_ids
+    })
+    return paginator.get_paginated_response(serializer.data)
 
 
 @api_view(['GET'])
@@ -68,6 +85,7 @@ def create_direct_chat(request):
         ChatParticipant.objects.create(room=room, user=user, role='admin')
         ChatParticipant.objects.create(room=room, user=other_user, role='admin')
 
+    room = inbox_rooms(user).get(pk=room.pk)
     serializer = ChatRoomSerializer(room, context={'request': request})
     return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -96,7 +114,12 @@ def create_group_chat(request):
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def get_messages(request):
-    """Get messages for a specific room"""
+    """
+    Get a page of a room's messages
+
+    Keyset paginated (see chat.pagination): the latest page by default,
+    before_id to scroll back, after_id / since to sync new messages.
+    """
     room_id = request.GET.get('room')
     if not room_id:
         return Response({'error': 'Room ID required'}, status=status.HTTP_400_BAD_REQUEST)
@@ -107,10 +130,13 @@ def get_messages(request):
     except ChatRoom.DoesNotExist:
         return Response({'error': 'Chat room not found'}, status=status.HTTP_404_NOT_FOUND)
 
+    get_presence_store().touch(user.id)
+
     # Use select_related to optimize sender lookup
-    messages = room.messages.select_related('sender').all()[:50]  # Limit to last 50 messages
+    paginator = MessageKeysetPagination()
+    messages = paginator.paginate_queryset(room.messages.select_related('sender'), request)
     serializer = ChatMessageSerializer(messages, many=True)
-    return Response(serializer.data)
+    return paginator.get_paginated_response(serializer.data)
 
 
 @api_view(['POST'])
@@ -127,17 +153,21 @@ def send_message(request):
     except ChatRoom.DoesNotExist:
         return Response({'error': 'Chat room not found'}, status=status.HTTP_404_NOT_FOUND)
 
-    message = ChatMessage.objects.create(
-        room=room,
-        sender=user,
-        text=serializer.validated_data['text'],
-        message_type=serializer.validated_data.get('message_type', 'text')
-    )
+    get_presence_store().touch(user.id)
+    with transaction.atomic():
+        message = ChatMessage.objects.create(
+            room=room,
+            sender=user,
+            text=serializer.validated_data['text'],
+            message_type=serializer.validated_data.get('message_type', 'text')
+        )
+        record_message(room.participant_info.all(), message)
 
-    # Update room's updated_at timestamp
-    room.save()
+        # Update room's updated_at timestamp
+        room.save()
 
     serializer = ChatMessageSerializer(message)
+    publish_room_event(room.id, 'message', message=serializer.data)
     return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
@@ -147,15 +177,26 @@ def mark_messages_read(request, room_id):
     """Mark messages in a room as read"""
     user = request.user
 
-    try:
-        participant = ChatParticipant.objects.get(room__id=room_id, user=user)
-        from django.utils import timezone
-        participant.last_read_at = timezone.now()
-        participant.save()
-        return Response({'message': 'Messages marked as read'})
-    except ChatParticipant.DoesNotExist:
+    participant = mark_read(
+        ChatParticipant.objects.filter(room_id=room_id, user=user),
+        ChatMessage.objects.filter(room_id=room_id)
+    )
+    if participant is None:
         return Response({'error': 'Not a participant'}, status=status.HTTP_403_FORBIDDEN)
 
+    publish_room_event(participant.room_id, 'read', user_id=user.id,
+                       last_read_at=participant.last_read_at.isoformat(),
+                       last_read_message_id=participant.last_read_message_id)
+    return Response({'message': 'Messages marked as read',
+                     'last_read_message_id': participant.last_read_message_id})
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def get_unread_badge(request):
+    """Total unread messages of the current user, for the chat badge"""
+    return Response({'unread_count': unread_total(ChatParticipant.objects.filter(user=request.user))})
+
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
@@ -181,6 +222,7 @@ def get_suggested_users(request):
     )
 
     suggested = User.objects.exclude(id=user.id).exclude(username__in=demo_usernames).exclude(id__in=existing_chat_users)[:7]
+    online_user_ids = get_presence_store().online(u.id for u in suggested)
 
     data = []
 
@@ -217,7 +259,7 @@ def get_suggested_users(request):
             'username': u.username,
             'bio': bio,
             'avatar': avatar_url,
-            'online': False  # Simplified - would need online status tracking
+            'online': u.id in online_user_ids
         })
 
     serializer = SuggestedUserSerializer(data, many=True)
@@ -388,12 +430,42 @@ def translate_message(request, message_id):
 @api_view(['POST', 'GET'])
 @permission_classes([permissions.IsAuthenticated])
 def typing_indicator(request):
-    """Handle typing indicators (simplified - just returns success)"""
-    # In production, this would use WebSockets or Redis to broadcast typing status
-    # For now, just return success to avoid errors
+    """
+    Broadcast that the user is typing in a room
+
+    For clients without a WebSocket connection; connected clients send
+    {"action": "typing"} over the socket instead (see chat.consumers).
+    Typing state is kept in the presence store (chat.presence), not the database.
+    """
+    room_id = request.data.get('room_id') or request.GET.get('room_id')
+    if room_id:
+        try:
+            room_id = int(room_id)
+        except (TypeError, ValueError):
+            return Response({'error': 'Invalid room_id'}, status=status.HTTP_400_BAD_REQUEST)
+        user = request.user
+        if not ChatParticipant.objects.filter(room_id=room_id, user=user).exists():
+            return Response({'error': 'Not a participant'}, status=status.HTTP_403_FORBIDDEN)
+        presence = get_presence_store()
+        presence.touch(user.id)
+        presence.set_typing(room_id, user.id)
+        publish_room_event(room_id, 'typing', user_id=user.id, username=user.username)
     return Response({'message': 'Typing indicator received'}, status=status.HTTP_200_OK)
 
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def get_typing_users(request, room_id):
+    """Get the other users currently typing in a room"""
+    user = request.user
+    if not ChatParticipant.objects.filter(room_id=room_id, user=user).exists():
+        return Response({'error': 'Not a participant'}, status=status.HTTP_403_FORBIDDEN)
+
+    typing_user_ids = [user_id for user_id in get_presence_store().typing(room_id) if user_id != user.id]
+    users = User.objects.filter(id__in=typing_user_ids) if typing_user_ids else User.objects.none()
+    return Response(UserBasicSerializer(users, many=True).data)
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def ai_chat(request):
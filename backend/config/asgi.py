@@ -1,5 +1,8 @@
 """
 ASGI config for Drag'n'Scroll project.
+
+HTTP goes to Django; WebSocket connections to /ws/chat/ go to the
+real-time chat endpoint (chat.consumers).
 """
 
 import os
@@ -8,4 +11,22 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Import after Django is set up (models are loaded)
+from chat.consumers import chat_socket  # noqa: E402
+
+WEBSOCKET_ROUTES = {
+    '/ws/chat/': chat_socket,
+}
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        handler = WEBSOCKET_ROUTES.get(scope['path'])
+        if handler is None:
+            await receive()
+            await send({'type': 'websocket.close'})
+            return
+        return await handler(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -124,6 +124,39 @@ else:
     }
 
 
+# Cache (main screen snapshots, see learning.caching)
+# Use a shared cache (Redis) in production so invalidation reaches every worker;
+# the local-memory default is per process and only suitable for development
+REDIS_URL = config('REDIS_URL', default=None)
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'drag-n-scroll',
+        }
+    }
+
+# Real-time chat pub/sub (see chat.realtime); Redis reaches every ASGI process
+CHAT_BROKER = config(
+    'CHAT_BROKER',
+    default='chat.realtime.RedisBroker' if REDIS_URL else 'chat.realtime.InProcessBroker'
+)
+
+# Chat online/typing state (see chat.presence); kept out of the database
+CHAT_PRESENCE_STORE = config(
+    'CHAT_PRESENCE_STORE',
+    default='chat.presence.RedisPresenceStore' if REDIS_URL else 'chat.presence.InMemoryPresenceStore'
+)
+
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
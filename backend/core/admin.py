@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, UserProfile, UserCourseProgress
+from .models import LeaderboardEntry, User, UserProfile, UserCourseProgress, XPLedgerEntry
 
 
 @admin.register(User)
@@ -24,3 +24,18 @@ class UserCourseProgressAdmin(admin.ModelAdmin):
     list_filter = ['current_day', 'streak_days', 'last_study_date']
     search_fields = ['user__username']
     readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(XPLedgerEntry)
+class XPLedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ['user', 'amount', 'source', 'source_id', 'date', 'created_at']
+    list_filter = ['source', 'date']
+    search_fields = ['user__username']
+    readonly_fields = ['created_at']
+
+
+@admin.register(LeaderboardEntry)
+class LeaderboardEntryAdmin(admin.ModelAdmin):
+    list_display = ['board', 'rank', 'user', 'score', 'computed_at']
+    list_filter = ['board']
+    search_fields = ['user__username']
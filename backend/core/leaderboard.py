@@ -0,0 +1,124 @@
+"""
+Leaderboards backed by a precomputed ranking table (LeaderboardEntry)
+
+Ranking every learner on each request (ORDER BY total_xp plus COUNT(*)
+for the user's rank) scans UserCourseProgress. Instead, rebuild_board()
+periodically writes each board's ranking into LeaderboardEntry (run the
+rebuild_leaderboards management command from cron), and reads are
+index lookups:
+
+- top N: range scan on (board, rank)
+- rank of a user: unique lookup on (board, user)
+
+Boards:
+- 'global': total XP
+- 'streak': current streak (as of the last compute_streaks run)
+- 'hsk:<level>': total XP of users at that HSK level
+- 'weekly:<monday>': XP earned in that week, from the XP ledger
+"""
+from datetime import date, timedelta
+from itertools import islice
+from typing import Iterable, List, Optional, Tuple
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from .models import LeaderboardEntry, UserCourseProgress, XPLedgerEntry
+
+BOARD_GLOBAL = 'global'
+BOARD_STREAK = 'streak'
+BOARD_KINDS = ['global', 'streak', 'hsk', 'weekly']
+HSK_LEVELS = range(1, 7)
+
+REBUILD_BATCH_SIZE = 1000
+
+
+def hsk_board(level: int) -> str:
+    return f'hsk:{level}'
+
+
+def week_start(day: Optional[date] = None) -> date:
+    """Monday of the week containing day (default: today)"""
+    day = day or timezone.localdate()
+    return day - timedelta(days=day.weekday())
+
+
+def weekly_board(day: Optional[date] = None) -> str:
+    return f'weekly:{week_start(day).isoformat()}'
+
+
+def _board_scores(board: str) -> Iterable[Tuple[int, int]]:
+    """(user_id, score) of a board's users, best first"""
+    if board.startswith('weekly:'):
+        start = date.fromisoformat(board.split(':', 1)[1])
+        return XPLedgerEntry.objects.filter(
+            date__gte=start, date__lt=start + timedelta(days=7)
+        ).values('user_id').annotate(score=Sum('amount')).filter(
+            score__gt=0
+        ).order_by('-score', 'user_id').values_list('user_id', 'score').iterator()
+
+    if board == BOARD_STREAK:
+        field = 'streak_days'
+        progress = UserCourseProgress.objects.filter(streak_days__gt=0)
+    elif board == BOARD_GLOBAL or board.startswith('hsk:'):
+        field = 'total_xp'
+        progress = UserCourseProgress.objects.filter(total_xp__gt=0)
+        if board.startswith('hsk:'):
+            progress = progress.filter(user__profile__current_hsk_level=int(board.split(':', 1)[1]))
+    else:
+        raise ValueError(f'Unknown leaderboard: {board}')
+    return progress.order_by(f'-{field}', 'user_id').values_list('user_id', field).iterator()
+
+
+def rebuild_board(board: str) -> int:
+    """
+    Recompute one board
+
+    The old ranking is replaced in one transaction, so readers see either
+    the old or the new board.
+
+    Args:
+        board: Board key (see module docstring)
+
+    Returns:
+        Number of ranked users
+    """
+    now = timezone.now()
+    entries = (
+        LeaderboardEntry(board=board, rank=rank, user_id=user_id, score=score, computed_at=now)
+        for rank, (user_id, score) in enumerate(_board_scores(board), start=1)
+    )
+    total = 0
+    with transaction.atomic():
+        LeaderboardEntry.objects.filter(board=board).delete()
+        while True:
+            batch = list(islice(entries, REBUILD_BATCH_SIZE))
+            if not batch:
+                break
+            LeaderboardEntry.objects.bulk_create(batch)
+            total += len(batch)
+    return total
+
+
+def rebuild_all() -> dict:
+    """
+    Rebuild the global, streak, per-HSK and current weekly boards
+
+    Returns:
+        {board: number of ranked users}
+    """
+    boards = [BOARD_GLOBAL, BOARD_STREAK] + [hsk_board(level) for level in HSK_LEVELS] + [weekly_board()]
+    return {board: rebuild_board(board) for board in boards}
+
+
+def get_top(board: str, limit: int = 10, offset: int = 0) -> List[LeaderboardEntry]:
+    """Entries ranked offset+1 .. offset+limit, with users loaded"""
+    return list(
+        LeaderboardEntry.objects.filter(
+            board=board, rank__gt=offset, rank__lte=offset + limit
+        ).select_related('user').order_by('rank')
+    )
+
+
+def get_user_entry(board: str, user) -> Optional[LeaderboardEntry]:
+    """A user's entry on a board, or None if not ranked"""
+    return LeaderboardEntry.objects.filter(board=board, user=user).first()
@@ -0,0 +1,100 @@
+"""
+XP ledger and streaks
+
+XP is recorded as append-only XPLedgerEntry rows. The same transaction
+adds the amount to UserCourseProgress.total_xp with an F() expression,
+so concurrent submits never lose an update. The user's main screen
+snapshot (learning.caching) is dropped when the transaction commits.
+
+Streaks are not touched per request. compute_streaks() runs once per
+day (compute_streaks management command) over the ledger's study dates
+and updates streak_days / last_study_date with a few set-based UPDATEs.
+current_streak() adds today's activity for display.
+"""
+from datetime import date, timedelta
+from typing import Optional
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from learning.caching import invalidate_main_screen
+from .models import UserCourseProgress, XPLedgerEntry
+
+
+def award_xp(user_id: int, amount: int, source: str, source_id: Optional[int] = None) -> XPLedgerEntry:
+    """
+    Record XP in the ledger and add it to the user's total
+
+    Entries with amount 0 are recorded too: they still count as study
+    activity for streaks.
+
+    Args:
+        user_id: User ID
+        amount: XP earned
+        source: Ledger source ('session' or 'review')
+        source_id: Optional ID of the source object
+
+    Returns:
+        Created XPLedgerEntry
+    """
+    with transaction.atomic():
+        entry = XPLedgerEntry.objects.create(
+            user_id=user_id,
+            amount=amount,
+            source=source,
+            source_id=source_id,
+            date=timezone.localdate()
+        )
+        if amount:
+            UserCourseProgress.objects.filter(user_id=user_id).update(
+                total_xp=F('total_xp') + amount
+            )
+        # XP and today's streak on the main screen are now stale
+        invalidate_main_screen(user_id)
+    return entry
+
+
+def compute_streaks(day: date) -> dict:
+    """
+    Update streaks for one complete day from the ledger
+
+    Run for each day in order. Re-running a day changes nothing.
+
+    Args:
+        day: Local date to process
+
+    Returns:
+        {"continued", "started", "reset"}: number of users per outcome
+    """
+    studied = XPLedgerEntry.objects.filter(date=day).values('user_id')
+    progress = UserCourseProgress.objects.all()
+
+    with transaction.atomic():
+        # Studied the day before too: extend the streak
+        continued = progress.filter(
+            user_id__in=studied, last_study_date=day - timedelta(days=1)
+        ).update(streak_days=F('streak_days') + 1, last_study_date=day)
+        # First study day after a break
+        started = progress.filter(user_id__in=studied).filter(
+            Q(last_study_date__isnull=True) | Q(last_study_date__lt=day - timedelta(days=1))
+        ).update(streak_days=1, last_study_date=day)
+        # Did not study that day
+        reset = progress.filter(last_study_date__lt=day).exclude(streak_days=0).update(streak_days=0)
+
+    return {'continued': continued, 'started': started, 'reset': reset}
+
+
+def current_streak(progress: UserCourseProgress) -> int:
+    """
+    Streak including today (compute_streaks only covers complete days)
+
+    Args:
+        progress: UserCourseProgress with streaks computed up to yesterday
+    """
+    today = timezone.localdate()
+    if progress.last_study_date is not None and progress.last_study_date >= today:
+        return progress.streak_days
+
+    studied_today = XPLedgerEntry.objects.filter(user_id=progress.user_id, date=today).exists()
+    if progress.last_study_date == today - timedelta(days=1):
+        return progress.streak_days + (1 if studied_today else 0)
+    return 1 if studied_today else 0
@@ -0,0 +1,33 @@
+"""
+Update study streaks from the XP ledger
+Run daily: python manage.py compute_streaks [--days N]
+"""
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from core.ledger import compute_streaks
+
+
+class Command(BaseCommand):
+    help = 'Update streak_days from the XP ledger for complete days (default: yesterday)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=1,
+                            help='Number of complete days to process in order, ending yesterday')
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError('--days must be at least 1')
+
+        end = timezone.localdate() - timedelta(days=1)
+        start = end - timedelta(days=options['days'] - 1)
+        day = start
+        while day <= end:
+            counts = compute_streaks(day)
+            self.stdout.write(
+                f"{day}: {counts['continued']} continued, {counts['started']} started, "
+                f"{counts['reset']} reset"
+            )
+            day += timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(f'Streaks updated from {start} to {end}'))
@@ -0,0 +1,27 @@
+"""
+Rebuild the precomputed leaderboards (LeaderboardEntry)
+Run periodically: python manage.py rebuild_leaderboards [--board BOARD]
+"""
+from django.core.management.base import BaseCommand, CommandError
+from core.leaderboard import rebuild_all, rebuild_board
+
+
+class Command(BaseCommand):
+    help = 'Rebuild leaderboards (default: global, streak, per-HSK and current weekly boards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--board',
+                            help="Only rebuild this board, e.g. global, streak, hsk:2, weekly:2026-10-12")
+
+    def handle(self, *args, **options):
+        if options['board']:
+            try:
+                counts = {options['board']: rebuild_board(options['board'])}
+            except ValueError as exc:
+                raise CommandError(str(exc))
+        else:
+            counts = rebuild_all()
+
+        for board, count in counts.items():
+            self.stdout.write(f'{board}: {count} users ranked')
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(counts)} leaderboards'))
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_userprofile_avatar_userprofile_bio'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='srs_algorithm',
+            field=models.CharField(choices=[('sm2', 'SM-2'), ('fsrs', 'FSRS')], default='sm2', max_length=10),
+        ),
+    ]
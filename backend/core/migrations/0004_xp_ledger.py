@@ -0,0 +1,51 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_srs_scheduler'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='XPLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.IntegerField()),
+                ('source', models.CharField(choices=[('session', 'Learning session'), ('review', 'SRS review')], max_length=20)),
+                ('source_id', models.IntegerField(blank=True, null=True)),
+                ('date', models.DateField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'XP Ledger Entry',
+                'verbose_name_plural': 'XP Ledger',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='usercourseprogress',
+            index=models.Index(fields=['-total_xp', 'user'], name='progress_total_xp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usercourseprogress',
+            index=models.Index(fields=['-streak_days', 'user'], name='progress_streak_idx'),
+        ),
+        migrations.AddField(
+            model_name='xpledgerentry',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='xp_entries', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='xpledgerentry',
+            index=models.Index(fields=['user', 'date'], name='xp_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='xpledgerentry',
+            index=models.Index(fields=['date', 'user'], name='xp_date_user_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:50
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_xp_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('board', models.CharField(max_length=32)),
+                ('rank', models.PositiveIntegerField()),
+                ('score', models.IntegerField()),
+                ('computed_at', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Leaderboard Entry',
+                'verbose_name_plural': 'Leaderboard Entries',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='leaderboardentry',
+            constraint=models.UniqueConstraint(fields=('board', 'rank'), name='unique_leaderboard_rank'),
+        ),
+        migrations.AddConstraint(
+            model_name='leaderboardentry',
+            constraint=models.UniqueConstraint(fields=('board', 'user'), name='unique_leaderboard_user'),
+        ),
+    ]
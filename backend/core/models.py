@@ -3,7 +3,6 @@ Core models for User and Profile
 """
 from django.contrib.auth.models import AbstractUser
 from django.db import models
-from django.utils import timezone
 
 
 class User(AbstractUser):
@@ -50,6 +49,13 @@ class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     learning_language = models.CharField(max_length=2, choices=LANGUAGE_CHOICES, default='RU')
     current_hsk_level = models.IntegerField(default=1)  # HSK 1-6
+
+    # SRS scheduling algorithm (see learning.schedulers)
+    SRS_ALGORITHM_CHOICES = [
+        ('sm2', 'SM-2'),
+        ('fsrs', 'FSRS'),
+    ]
+    srs_algorithm = models.CharField(max_length=10, choices=SRS_ALGORITHM_CHOICES, default='sm2')
     avatar = models.ImageField(upload_to='avatars/%Y/%m/', blank=True, null=True)
     bio = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -88,29 +94,23 @@ class UserCourseProgress(models.Model):
     class Meta:
         verbose_name = 'User Course Progress'
         verbose_name_plural = 'User Course Progress'
+        indexes = [
+            models.Index(fields=['-total_xp', 'user'], name='progress_total_xp_idx'),
+            models.Index(fields=['-streak_days', 'user'], name='progress_streak_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username}'s progress - Day {self.current_day}"
 
     def add_xp(self, xp: int):
-        """Add XP and update total"""
+        """
+        Add XP to total_xp atomically
+
+        Prefer core.ledger.award_xp(), which also records the XP in the
+        ledger.
+        """
+        UserCourseProgress.objects.filter(pk=self.pk).update(total_xp=models.F('total_xp') + xp)
         self.total_xp += xp
-        self.save()
-
-    def update_streak(self):
-        """Update streak based on last study date"""
-        today = timezone.now().date()
-        if self.last_study_date:
-            delta = (today - self.last_study_date).days
-            if delta == 1:
-                # Studied yesterday, increment streak
-                self.streak_days += 1
-            elif delta > 1:
-                # Missed days, reset streak
-                self.streak_days = 1
-
-        self.last_study_date = today
-        self.save()
 
     def mark_day_complete(self, day_number: int):
         """Mark a day as completed"""
@@ -121,3 +121,62 @@ class UserCourseProgress(models.Model):
             self.current_lesson = 1
             self.current_step = 1
             self.save()
+
+
+class XPLedgerEntry(models.Model):
+    """
+    Append-only record of XP earned (one row per submit)
+
+    total_xp on UserCourseProgress is the running sum of the ledger;
+    streaks are computed from the ledger's study dates by the daily
+    compute_streaks job (see core.ledger).
+    """
+    SOURCE_CHOICES = [
+        ('session', 'Learning session'),
+        ('review', 'SRS review'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='xp_entries')
+    amount = models.IntegerField()
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    source_id = models.IntegerField(null=True, blank=True)  # e.g. LearningSession ID
+    date = models.DateField()  # Local study date
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'XP Ledger Entry'
+        verbose_name_plural = 'XP Ledger'
+        indexes = [
+            models.Index(fields=['user', 'date'], name='xp_user_date_idx'),
+            models.Index(fields=['date', 'user'], name='xp_date_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} +{self.amount} XP ({self.source}, {self.date})"
+
+
+class LeaderboardEntry(models.Model):
+    """
+    Precomputed leaderboard position (see core.leaderboard)
+
+    Boards: 'global' and 'streak' (all users), 'hsk:<level>' (XP within
+    an HSK level) and 'weekly:<week start>' (XP earned that week). Rows
+    are replaced by periodic rebuilds; top-N and rank-of-user reads are
+    index lookups on (board, rank) and (board, user).
+    """
+    board = models.CharField(max_length=32)
+    rank = models.PositiveIntegerField()  # 1-based, ties broken by user ID
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='leaderboard_entries')
+    score = models.IntegerField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = 'Leaderboard Entry'
+        verbose_name_plural = 'Leaderboard Entries'
+        constraints = [
+            models.UniqueConstraint(fields=['board', 'rank'], name='unique_leaderboard_rank'),
+            models.UniqueConstraint(fields=['board', 'user'], name='unique_leaderboard_user'),
+        ]
+
+    def __str__(self):
+        return f"{self.board} #{self.rank}: {self.user.username} ({self.score})"
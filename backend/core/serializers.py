@@ -11,7 +11,7 @@ from .models import User, UserProfile, UserCourseProgress
 class UserProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserProfile
-        fields = ['learning_language', 'current_hsk_level', 'created_at', 'updated_at']
+        fields = ['learning_language', 'current_hsk_level', 'srs_algorithm', 'created_at', 'updated_at']
         read_only_fields = ['created_at', 'updated_at']
 
 
@@ -64,6 +64,7 @@ class UserSerializer(BaseUserSerializer):
         return {
             'learning_language': 'RU',
             'current_hsk_level': 1,
+            'srs_algorithm': 'sm2',
             'created_at': None,
             'updated_at': None
         }
@@ -205,6 +206,7 @@ class UserDetailSerializer(serializers.ModelSerializer):
         return {
             'learning_language': 'RU',
             'current_hsk_level': 1,
+            'srs_algorithm': 'sm2',
             'created_at': None,
             'updated_at': None
         }
@@ -6,7 +6,9 @@ from .models import (
     GrammarTask,
     NewWordLearningProgress,
     StepProgress,
-    SRSReviewCard
+    SRSReviewCard,
+    SubmittedAnswer,
+    LearningPlan
 )
 
 
@@ -69,3 +71,20 @@ class SRSReviewCardAdmin(admin.ModelAdmin):
                     'time_spent_seconds', 'completed_at']
     list_filter = ['is_correct', 'is_problematic', 'completed_at']
     search_fields = ['session__user__username', 'word__hanzi']
+
+
+@admin.register(SubmittedAnswer)
+class SubmittedAnswerAdmin(admin.ModelAdmin):
+    """Admin for batch-submitted answers (idempotency log)"""
+    list_display = ['session', 'step', 'idempotency_key', 'created_at']
+    list_filter = ['step', 'created_at']
+    search_fields = ['session__user__username', 'idempotency_key']
+    readonly_fields = ['created_at']
+
+
+@admin.register(LearningPlan)
+class LearningPlanAdmin(admin.ModelAdmin):
+    """Admin for per-user learning plans (upcoming new words)"""
+    list_display = ['user', 'course_day', 'words_version', 'updated_at']
+    search_fields = ['user__username']
+    readonly_fields = ['updated_at']
@@ -0,0 +1,320 @@
+"""
+Step answer grading and batched answer submission
+
+apply_answer_batch() applies an ordered list of answers across steps in
+one transaction: cards, new-word progress, SRS state and step progress
+are written with bulk operations and the session row with one UPDATE
+(SessionState).
+Every answer carries a client-generated idempotency key; answers already
+applied for the session (SubmittedAnswer) are not applied again and
+return their stored result, so clients can queue answers offline and
+safely retry flushes.
+"""
+from typing import List, Optional, Tuple
+from django.db import transaction
+from django.utils import timezone
+from .content import get_content_bundle
+from .models import (
+    LearningSession, NewWordLearningProgress, SRSReviewCard, StepProgress, SubmittedAnswer
+)
+from .session_state import SessionState
+from .plan import advance_plans
+from .srs import mark_words_learned, update_srs_batch
+
+MAX_BATCH_SIZE = 100
+MAX_KEY_LENGTH = 64
+
+# XP per correct answer (step 2: per correctly answered word)
+STEP_XP = {1: 5, 2: 10, 3: 10, 4: 10, 5: 10}
+
+STEP_TYPES = {
+    1: 'SRS_REVIEW',
+    2: 'NEW_WORDS',
+    3: 'GRAMMAR',
+    4: 'DIALOGUE',
+    5: 'WORD_ARRANGEMENT',
+}
+
+# SM-2 quality for Step 1 answers
+CORRECT_QUALITY = 4
+INCORRECT_QUALITY = 1
+
+SESSION_DELTA_FIELDS = [
+    'current_step', 'is_completed', 'total_questions', 'correct_answers', 'xp_earned'
+]
+
+
+class AnswerError(ValueError):
+    """Malformed answer in a batch"""
+
+
+def grade_grammar(content: dict, built_sentence: str) -> Tuple[bool, Optional[dict]]:
+    """
+    Grade a Step 3 answer
+
+    Returns:
+        (is_correct, correct answer or None if the session has no task)
+    """
+    answer = content['answers']['grammar_task']
+    if not answer:
+        return False, None
+    # Simple comparison (can be enhanced for more flexible matching)
+    is_correct = (built_sentence or '').strip() == answer['correct_hanzi'].strip()
+    return is_correct, {'hanzi': answer['correct_hanzi']}
+
+
+def grade_dialogue(content: dict, selected_option_index, language: str = 'ru') -> Tuple[bool, str]:
+    """
+    Grade a Step 4 answer
+
+    Returns:
+        (is_correct, explanation in the user's language)
+    """
+    dialogue = content['dialogue']
+    if not dialogue:
+        return False, ''
+    options = dialogue['options']
+    is_correct = False
+    if isinstance(selected_option_index, int) and 0 <= selected_option_index < len(options):
+        is_correct = bool(options[selected_option_index].get('is_correct', False))
+    explanations = content['answers']['dialogue']
+    explanation = explanations['explanation_kz'] if language == 'kz' else explanations['explanation_ru']
+    return is_correct, explanation
+
+
+def grade_arrangement(content: dict, arranged_word_ids) -> Tuple[bool, Optional[dict]]:
+    """
+    Grade a Step 5 answer
+
+    Returns:
+        (is_correct, correct answer or None if the session has no exercise)
+    """
+    exercise = content['word_arrangement']
+    if not exercise:
+        return False, None
+    # For now, just check if all words are present (order validation would be more complex)
+    correct_order = [w.get('id') for w in exercise['scrambled_words']]
+    is_correct = sorted(arranged_word_ids or []) == sorted(correct_order)
+    return is_correct, {'target_hanzi': exercise['target_hanzi']}
+
+
+def user_language(user) -> str:
+    """'kz' or 'ru' from the user's profile"""
+    profile = getattr(user, 'profile', None)
+    return (getattr(profile, 'learning_language', None) or 'RU').lower()
+
+
+def _validate(answers) -> List[dict]:
+    if not isinstance(answers, list) or not answers:
+        raise AnswerError('answers must be a non-empty list')
+    if len(answers) > MAX_BATCH_SIZE:
+        raise AnswerError(f'At most {MAX_BATCH_SIZE} answers per batch')
+    for answer in answers:
+        if not isinstance(answer, dict):
+            raise AnswerError('Each answer must be an object')
+        key = answer.get('idempotency_key')
+        if not isinstance(key, str) or not key or len(key) > MAX_KEY_LENGTH:
+            raise AnswerError(f'idempotency_key must be a string of 1-{MAX_KEY_LENGTH} characters')
+        if answer.get('step') not in STEP_TYPES:
+            raise AnswerError('step must be between 1 and 5')
+    return answers
+
+
+def apply_answer_batch(user, session_id: int, answers: List[dict]) -> dict:
+    """
+    Apply an ordered batch of step answers
+
+    Answer shapes (besides "idempotency_key" and "step"):
+    - step 1: card_id, selected_option_id, time_spent_seconds
+    - step 2: words [{word_id, is_correct, time_spent_seconds,
+      pronunciation_attempts, pronunciation_ok_count}]
+    - step 3: built_sentence_hanzi, time_spent_seconds
+    - step 4: selected_option_index, time_spent_seconds
+    - step 5: arranged_word_ids, time_spent_seconds
+
+    Args:
+        user: User instance
+        session_id: LearningSession ID (must belong to user)
+        answers: Answers in the order they were given
+
+    Returns:
+        {"results": [...], "session": {...}}: one result per answer
+        (replays marked "duplicate") and the changed session counters
+
+    Raises:
+        AnswerError: If the batch is malformed
+        LearningSession.DoesNotExist: If the session is not the user's
+    """
+    _validate(answers)
+    now = timezone.now()
+
+    with transaction.atomic():
+        session = LearningSession.objects.select_for_update().get(id=session_id, user=user)
+        state = SessionState.of(session)
+
+        stored = dict(SubmittedAnswer.objects.filter(
+            session=session,
+            idempotency_key__in=[answer['idempotency_key'] for answer in answers]
+        ).values_list('idempotency_key', 'result'))
+
+        pending = []
+        for answer in answers:
+            if answer['idempotency_key'] not in stored:
+                stored[answer['idempotency_key']] = None
+                pending.append(answer)
+
+        steps = {answer['step'] for answer in pending}
+        content = None
+        if steps & {2, 3, 4, 5}:
+            content = get_content_bundle(session.course_day_id, session.session_type)
+        cards = {}
+        if 1 in steps:
+            cards = {card.id: card for card in session.srs_cards.all()}
+
+        results = {}
+        answered_cards = {}
+        srs_reviews = []
+        step_progress = []
+        learned_words = {}
+        completed_steps = set()
+
+        for answer in pending:
+            step = answer['step']
+            key = answer['idempotency_key']
+            time_spent = answer.get('time_spent_seconds') or 0
+            result = {'step': step}
+
+            if step == 1:
+                card = cards.get(answer.get('card_id'))
+                if card is None:
+                    raise AnswerError(f"Unknown card {answer.get('card_id')}")
+                is_correct = answer.get('selected_option_id') == card.word_id
+                card.selected_option_id = answer.get('selected_option_id')
+                card.is_correct = is_correct
+                card.time_spent_seconds = time_spent
+                card.completed_at = now
+                if not is_correct:
+                    card.is_problematic = True
+                    state.add_problematic_word(card.word_id)
+                answered_cards[card.id] = card
+                srs_reviews.append({
+                    'word_id': card.word_id,
+                    'quality': CORRECT_QUALITY if is_correct else INCORRECT_QUALITY,
+                    'time_spent_seconds': time_spent
+                })
+                questions = 1
+                correct_count = 1 if is_correct else 0
+                result['is_correct'] = is_correct
+
+            elif step == 2:
+                words = answer.get('words') or []
+                correct_count = 0
+                for word_answer in words:
+                    learned_words[word_answer.get('word_id')] = word_answer
+                    if word_answer.get('is_correct'):
+                        correct_count += 1
+                state.set(words_learned=len(words))
+                questions = len(words)
+                result['correct_words'] = correct_count
+                completed_steps.add(step)
+
+            else:
+                if step == 3:
+                    is_correct, correct_answer = grade_grammar(content, answer.get('built_sentence_hanzi', ''))
+                    data = {'built_sentence': answer.get('built_sentence_hanzi', '')}
+                    result['correct_answer'] = correct_answer
+                elif step == 4:
+                    is_correct, explanation = grade_dialogue(
+                        content, answer.get('selected_option_index'), user_language(user)
+                    )
+                    data = {'selected_option_index': answer.get('selected_option_index')}
+                    result['explanation'] = explanation
+                else:
+                    is_correct, correct_answer = grade_arrangement(content, answer.get('arranged_word_ids'))
+                    data = {'arranged_word_ids': answer.get('arranged_word_ids', [])}
+                    result['correct_answer'] = correct_answer
+                step_progress.append(StepProgress(
+                    session=session,
+                    step_type=STEP_TYPES[step],
+                    data=data,
+                    is_correct=is_correct,
+                    time_spent_seconds=time_spent,
+                    completed_at=now
+                ))
+                questions = 1
+                correct_count = 1 if is_correct else 0
+                result['is_correct'] = is_correct
+                completed_steps.add(step)
+
+            state.record_answers(questions, correct_count, correct_count * STEP_XP[step])
+            result['xp_earned'] = correct_count * STEP_XP[step]
+            results[key] = result
+
+        # Step 1 is done once every card of the deck has been answered
+        if cards and all(card.completed_at for card in cards.values()):
+            completed_steps.add(1)
+
+        if answered_cards:
+            SRSReviewCard.objects.bulk_update(
+                list(answered_cards.values()),
+                ['selected_option_id', 'is_correct', 'is_problematic', 'time_spent_seconds', 'completed_at']
+            )
+        if srs_reviews:
+            update_srs_batch(user, srs_reviews)
+
+        if learned_words:
+            progress_rows = list(NewWordLearningProgress.objects.filter(
+                session=session, word_id__in=list(learned_words)
+            ))
+            for progress in progress_rows:
+                word_answer = learned_words[progress.word_id]
+                progress.is_correct = word_answer.get('is_correct')
+                progress.time_spent_seconds = word_answer.get('time_spent_seconds', 0)
+                progress.pronunciation_attempts = word_answer.get('pronunciation_attempts', 0)
+                progress.pronunciation_ok_count = word_answer.get('pronunciation_ok_count', 0)
+                progress.completed_at = now
+            NewWordLearningProgress.objects.bulk_update(progress_rows, [
+                'is_correct', 'time_spent_seconds', 'pronunciation_attempts',
+                'pronunciation_ok_count', 'completed_at'
+            ])
+            # Initialize SRS for new words and mark as learned (level 1)
+            mark_words_learned(user, list(learned_words))
+            advance_plans(user, learned_words)
+
+        if step_progress:
+            StepProgress.objects.bulk_create(step_progress)
+
+        for step in sorted(completed_steps):
+            state.complete_step(step, next_step=max(session.current_step, step + 1), now=now)
+
+        if pending:
+            state.flush()
+            SubmittedAnswer.objects.bulk_create([
+                SubmittedAnswer(
+                    session=session,
+                    idempotency_key=answer['idempotency_key'],
+                    step=answer['step'],
+                    result=results[answer['idempotency_key']]
+                )
+                for answer in pending
+            ])
+
+    # Answers repeated within this batch or applied by an earlier one
+    response_results = []
+    applied = set()
+    for answer in answers:
+        key = answer['idempotency_key']
+        if key in results and key not in applied:
+            applied.add(key)
+            response_results.append({'idempotency_key': key, **results[key]})
+        else:
+            result = stored[key] if stored[key] is not None else results[key]
+            response_results.append({'idempotency_key': key, **result, 'duplicate': True})
+
+    return {
+        'results': response_results,
+        'session': {
+            'id': session.id,
+            **{field: getattr(session, field) for field in SESSION_DELTA_FIELDS}
+        }
+    }
@@ -5,3 +5,10 @@ class LearningConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'learning'
     verbose_name = 'Learning'
+
+    def ready(self):
+        """
+        App ready initialization
+        Import signals to ensure they are registered
+        """
+        import learning.signals
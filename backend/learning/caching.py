@@ -0,0 +1,90 @@
+"""
+Per-user main screen snapshots in the Django cache
+
+main_screen stores its response per user in one cache entry (one slot
+per hsk/day query variant) together with an ETag, so a steady-state
+refresh costs a single cache read and an unchanged screen is answered
+with 304 Not Modified.
+
+Snapshots are dropped by invalidate_main_screen() whenever something
+the screen shows changes: learning sessions and course progress
+(learning.signals), profile edits, SRS state changes
+(srs_summary.apply_srs_changes) and XP awards (core.ledger.award_xp).
+Due counts come from hourly buckets, so snapshots also expire at the end
+of the current hour.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from typing import Optional, Tuple
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from django.utils.http import parse_etags, quote_etag
+
+MAIN_SCREEN_KEY = 'learning:main_screen:{user_id}'
+
+# Upper bound on snapshot lifetime (seconds)
+MAIN_SCREEN_MAX_AGE = 3600
+
+
+def compute_etag(data) -> str:
+    """Quoted strong ETag for a JSON-serializable payload"""
+    payload = json.dumps(data, sort_keys=True, separators=(',', ':'), cls=DjangoJSONEncoder)
+    return quote_etag(hashlib.md5(payload.encode('utf-8')).hexdigest())
+
+
+def etag_matches(request, etag: str) -> bool:
+    """True if the request's If-None-Match header matches etag"""
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    return '*' in etags or etag in etags or f'W/{etag}' in etags
+
+
+def _seconds_until_next_hour() -> int:
+    now = timezone.localtime()
+    next_hour = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    return max(1, int((next_hour - now).total_seconds()))
+
+
+def get_main_screen(user_id: int, variant: str) -> Optional[Tuple[str, dict]]:
+    """
+    Cached (etag, data) for a main screen variant, or None
+
+    Args:
+        user_id: User ID
+        variant: Query variant key (see main_screen)
+    """
+    snapshots = cache.get(MAIN_SCREEN_KEY.format(user_id=user_id))
+    if not snapshots:
+        return None
+    return snapshots.get(variant)
+
+
+def set_main_screen(user_id: int, variant: str, data: dict) -> str:
+    """
+    Store a main screen snapshot
+
+    Returns:
+        ETag of the snapshot
+    """
+    key = MAIN_SCREEN_KEY.format(user_id=user_id)
+    etag = compute_etag(data)
+    snapshots = cache.get(key) or {}
+    snapshots[variant] = (etag, data)
+    cache.set(key, snapshots, min(MAIN_SCREEN_MAX_AGE, _seconds_until_next_hour()))
+    return etag
+
+
+def invalidate_main_screen(user_id: int):
+    """
+    Drop all main screen snapshots of a user
+
+    Deferred until the current transaction commits, so a concurrent
+    request cannot re-cache the pre-commit state.
+    """
+    key = MAIN_SCREEN_KEY.format(user_id=user_id)
+    transaction.on_commit(lambda: cache.delete(key))
@@ -0,0 +1,237 @@
+"""
+Prebuilt lesson content bundles per (course_day, session_type)
+
+Course content (new words, grammar task, dialogue, word arrangement) is
+the same for every learner, so it is compiled once into an immutable
+bundle and cached on two levels:
+
+- in process: LRU of up to LOCAL_MAX_BUNDLES bundles, revalidated
+  against the content generation at most every LOCAL_CHECK_SECONDS
+- shared: the Django cache, keyed by content generation
+
+Admin edits of any content model bump the content generation (see
+learning.signals), which retires every cached bundle at once. Step views
+only merge per-user state (learned words, session progress) on top of
+the bundle, so loading a step does no content queries once warm.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from django.core.cache import cache
+from course.models import CourseDay
+from .models import Dialogue, GrammarTask, WordArrangementExercise
+
+GENERATION_KEY = 'learning:content_generation'
+BUNDLE_KEY = 'learning:content:{generation}:{course_day_id}:{session_type}'
+
+# Shared cache lifetime of a bundle (seconds); bundles never go stale
+# within a generation, this only bounds memory use
+BUNDLE_CACHE_SECONDS = 24 * 3600
+
+LOCAL_MAX_BUNDLES = 256
+LOCAL_CHECK_SECONDS = 30
+
+_local_bundles: 'OrderedDict[tuple, tuple]' = OrderedDict()
+_local_lock = threading.Lock()
+
+
+def word_data(word) -> dict:
+    return {
+        'id': word.id,
+        'hanzi': word.hanzi,
+        'pinyin': word.pinyin,
+        'translation_ru': word.translation_ru,
+        'translation_kz': word.translation_kz,
+        'audio_url': word.audio_url
+    }
+
+
+def _grammar_task_data(course_day: CourseDay, session_type: str) -> Tuple[Optional[dict], Optional[dict]]:
+    """(task data, answer) of the session's grammar task"""
+    grammar_task = GrammarTask.objects.filter(
+        course_day=course_day,
+        session_type=session_type
+    ).select_related('grammar_rule').first()
+
+    if not grammar_task:
+        # Fallback: get any grammar rule from course day
+        grammar_rule = course_day.grammar_rules.first()
+        if not grammar_rule:
+            return None, None
+        # Create a simple grammar task
+        grammar_task = GrammarTask.objects.create(
+            course_day=course_day,
+            session_type=session_type,
+            grammar_rule=grammar_rule,
+            task_prompt_ru=f"Постройте предложение используя шаблон: {grammar_rule.pattern}",
+            task_prompt_kz=f"Үлгіні қолдана отырып, сөйлем құрыңыз: {grammar_rule.pattern}",
+            components=[],
+            correct_hanzi="",
+            correct_pinyin="",
+            correct_translation_ru="",
+            correct_translation_kz=""
+        )
+
+    rule = grammar_task.grammar_rule
+    examples = [
+        {
+            'hanzi': ex.sentence_hanzi,
+            'pinyin': ex.sentence_pinyin,
+            'translation_ru': ex.translation_ru,
+            'translation_kz': ex.translation_kz
+        }
+        for ex in rule.examples.all()[:2]
+    ]
+
+    task_data = {
+        'id': grammar_task.id,
+        'grammar_rule': {
+            'id': rule.id,
+            'title': rule.title,
+            'pattern': rule.pattern,
+            'explanation_ru': rule.explanation_ru,
+            'explanation_kz': rule.explanation_kz,
+            'examples': examples
+        },
+        'task_prompt_ru': grammar_task.task_prompt_ru,
+        'task_prompt_kz': grammar_task.task_prompt_kz,
+        'components': grammar_task.components
+    }
+    return task_data, {'correct_hanzi': grammar_task.correct_hanzi}
+
+
+def _dialogue_data(course_day: CourseDay, session_type: str) -> Tuple[Optional[dict], Optional[dict]]:
+    """(dialogue data, answer) of the session's dialogue"""
+    dialogue = Dialogue.objects.filter(
+        course_day=course_day,
+        session_type=session_type
+    ).first()
+    if not dialogue:
+        return None, None
+    dialogue_data = {
+        'id': dialogue.id,
+        'lines': dialogue.lines,
+        'question_hanzi': dialogue.question_hanzi,
+        'question_pinyin': dialogue.question_pinyin,
+        'question_translation_ru': dialogue.question_translation_ru,
+        'question_translation_kz': dialogue.question_translation_kz,
+        'audio_url': dialogue.audio_url,
+        'options': dialogue.options
+    }
+    return dialogue_data, {
+        'explanation_ru': dialogue.explanation_ru or '',
+        'explanation_kz': dialogue.explanation_kz or ''
+    }
+
+
+def _exercise_data(course_day: CourseDay, session_type: str) -> Optional[dict]:
+    exercise = WordArrangementExercise.objects.filter(
+        course_day=course_day,
+        session_type=session_type
+    ).first()
+    if not exercise:
+        return None
+    return {
+        'id': exercise.id,
+        'target_hanzi': exercise.target_hanzi,
+        'target_pinyin': exercise.target_pinyin,
+        'target_translation_ru': exercise.target_translation_ru,
+        'target_translation_kz': exercise.target_translation_kz,
+        'audio_url': exercise.audio_url,
+        'scrambled_words': exercise.scrambled_words,
+        'hint_ru': exercise.hint_ru,
+        'hint_kz': exercise.hint_kz
+    }
+
+
+def build_content_bundle(course_day_id: int, session_type: str) -> dict:
+    """
+    Compile the content of one session from the database
+
+    Args:
+        course_day_id: CourseDay ID
+        session_type: 'A' or 'B'
+
+    Returns:
+        {"course_day_id", "session_type", "version", "new_words",
+         "grammar_task", "dialogue", "word_arrangement", "answers"};
+        version is a hash of the content
+    """
+    course_day = CourseDay.objects.get(id=course_day_id)
+    grammar_task, grammar_answer = _grammar_task_data(course_day, session_type)
+    dialogue, dialogue_answer = _dialogue_data(course_day, session_type)
+    bundle = {
+        'course_day_id': course_day_id,
+        'session_type': session_type,
+        'new_words': [word_data(word) for word in course_day.new_words.all()],
+        'grammar_task': grammar_task,
+        'dialogue': dialogue,
+        'word_arrangement': _exercise_data(course_day, session_type),
+        # Server-side only: used to check submissions, never sent to clients
+        'answers': {
+            'grammar_task': grammar_answer,
+            'dialogue': dialogue_answer,
+        },
+    }
+    payload = json.dumps(bundle, sort_keys=True, ensure_ascii=False)
+    bundle['version'] = hashlib.md5(payload.encode('utf-8')).hexdigest()[:16]
+    return bundle
+
+
+def get_content_generation() -> int:
+    """Current content generation (created on first use)"""
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # Time-based start so a lost key never repeats an older generation
+        cache.add(GENERATION_KEY, int(time.time() * 1000), None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def get_content_bundle(course_day_id: int, session_type: str) -> dict:
+    """
+    Get the content bundle of a session, building it if needed
+
+    The returned dict is shared between requests and must not be modified.
+    """
+    key = (course_day_id, session_type)
+    now = time.monotonic()
+
+    with _local_lock:
+        entry = _local_bundles.get(key)
+        if entry is not None:
+            _local_bundles.move_to_end(key)
+            if now - entry[2] < LOCAL_CHECK_SECONDS:
+                return entry[1]
+
+    generation = get_content_generation()
+    if entry is not None and entry[0] == generation:
+        bundle = entry[1]
+    else:
+        shared_key = BUNDLE_KEY.format(
+            generation=generation, course_day_id=course_day_id, session_type=session_type
+        )
+        bundle = cache.get(shared_key)
+        if bundle is None:
+            bundle = build_content_bundle(course_day_id, session_type)
+            cache.set(shared_key, bundle, BUNDLE_CACHE_SECONDS)
+
+    with _local_lock:
+        _local_bundles[key] = (generation, bundle, now)
+        _local_bundles.move_to_end(key)
+        while len(_local_bundles) > LOCAL_MAX_BUNDLES:
+            _local_bundles.popitem(last=False)
+    return bundle
+
+
+def invalidate_content():
+    """Retire all bundles (this process immediately, others within LOCAL_CHECK_SECONDS)"""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, int(time.time() * 1000), None)
+    with _local_lock:
+        _local_bundles.clear()
@@ -0,0 +1,83 @@
+"""
+Step 1 deck builder
+
+Resolves a session's existing SRSReviewCards in one query, creates the
+missing ones with one bulk_create and returns cards with their words
+already attached, so serializing the deck does not trigger per-card
+word lookups.
+"""
+from typing import Dict, List, Set, Tuple
+from django.db import transaction
+from vocab.models import Word
+from .models import LearningSession, SRSReviewCard
+from .distractors import build_review_deck
+
+
+def build_session_deck(session: LearningSession, words: List[Word], pad_hsk_level: int,
+                       deck_size: int = 10) -> List[SRSReviewCard]:
+    """
+    Get or create the Step 1 cards of a session
+
+    Due words come first. When fewer than deck_size words are due, the
+    session's unanswered padding cards from an earlier load are reused
+    before new padding words are sampled, so resuming a session does not
+    pile up extra cards.
+
+    Args:
+        session: LearningSession instance
+        words: Words due for review (already loaded)
+        pad_hsk_level: HSK level of padding words
+        deck_size: Target number of cards
+
+    Returns:
+        List of SRSReviewCard instances with card.word populated
+    """
+    existing = _existing_cards(session)
+    deck_words, deck_word_ids = _plan_deck(existing, words, deck_size)
+    if len(deck_words) >= deck_size and all(word.id in existing for word in deck_words):
+        return [existing[word.id] for word in deck_words]
+
+    with transaction.atomic():
+        # Concurrent first loads of a session would each sample their own
+        # padding words; the session row lock lets only one create cards
+        list(LearningSession.objects.select_for_update().filter(pk=session.pk).values_list('pk'))
+        existing = _existing_cards(session)
+        deck_words, deck_word_ids = _plan_deck(existing, words, deck_size)
+
+        missing_words = [word for word in deck_words if word.id not in existing]
+        new_cards = [
+            SRSReviewCard(session=session, word=word, options=options)
+            for word, options in build_review_deck(
+                missing_words,
+                pad_hsk_level=pad_hsk_level,
+                deck_size=deck_size - (len(deck_words) - len(missing_words)),
+                exclude=deck_word_ids | set(existing)
+            )
+        ]
+        if new_cards:
+            new_cards = SRSReviewCard.objects.bulk_create(new_cards)
+
+    new_by_word = {card.word_id: card for card in new_cards}
+    cards = [existing.get(word.id) or new_by_word[word.id] for word in deck_words]
+    cards += [card for card in new_cards if card.word_id not in deck_word_ids]
+    return cards
+
+
+def _existing_cards(session: LearningSession) -> Dict[int, SRSReviewCard]:
+    """Cards of a session by word ID"""
+    cards = session.srs_cards.select_related('word').order_by('created_at', 'id')
+    return {card.word_id: card for card in cards}
+
+
+def _plan_deck(existing: Dict[int, SRSReviewCard], words: List[Word],
+               deck_size: int) -> Tuple[List[Word], Set[int]]:
+    """Due words plus unanswered padding cards from a previous load"""
+    deck_words = list(words)[:deck_size]
+    deck_word_ids = {word.id for word in deck_words}
+    for word_id, card in existing.items():
+        if len(deck_words) >= deck_size:
+            break
+        if word_id not in deck_word_ids and card.completed_at is None:
+            deck_words.append(card.word)
+            deck_word_ids.add(word_id)
+    return deck_words, deck_word_ids
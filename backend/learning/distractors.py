@@ -0,0 +1,203 @@
+"""
+In-process word pool for multiple-choice distractor sampling
+
+Replaces per-card ORDER BY RANDOM() queries in Step 1. The pool keeps
+word IDs per HSK level (and per level + part of speech) in memory and
+samples distractors from it without touching the database. Word rows for
+the whole deck are then fetched with a single in_bulk() query.
+
+The pool is rebuilt lazily after a Word is saved or deleted in this
+process (see learning.signals) and after POOL_TTL_SECONDS, so edits made
+by other processes are picked up as well.
+"""
+import random
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from vocab.models import Word
+
+POOL_TTL_SECONDS = 600
+
+# How many extra candidates to draw when ranking by translation length
+LENGTH_OVERSAMPLE = 3
+
+# Rejection-sampling attempts per requested item before falling back to a scan
+MAX_ATTEMPTS_PER_ITEM = 8
+
+
+class WordPool:
+    """
+    Immutable snapshot of word IDs grouped for sampling
+    """
+
+    def __init__(self, rows: Iterable[Tuple[int, int, str, str]]):
+        """
+        Args:
+            rows: (id, hsk_level, part_of_speech, translation_ru) tuples
+        """
+        self.by_level: Dict[int, List[int]] = defaultdict(list)
+        self.by_level_pos: Dict[Tuple[int, str], List[int]] = defaultdict(list)
+        self.level_of: Dict[int, int] = {}
+        self.pos_of: Dict[int, str] = {}
+        self.length_of: Dict[int, int] = {}
+
+        for word_id, hsk_level, part_of_speech, translation_ru in rows:
+            self.by_level[hsk_level].append(word_id)
+            self.by_level_pos[(hsk_level, part_of_speech)].append(word_id)
+            self.level_of[word_id] = hsk_level
+            self.pos_of[word_id] = part_of_speech
+            self.length_of[word_id] = len(translation_ru or '')
+
+    @staticmethod
+    def _sample_ids(ids: List[int], k: int, exclude: Set[int]) -> List[int]:
+        """
+        Sample up to k distinct IDs from ids, skipping excluded ones
+
+        Uses rejection sampling (O(k) when exclusions are few compared to
+        the pool) and falls back to a filtered scan for small pools.
+        """
+        if k <= 0 or not ids:
+            return []
+
+        picked = []
+        seen = set(exclude)
+        if len(ids) > 2 * (k + len(exclude)):
+            attempts = k * MAX_ATTEMPTS_PER_ITEM
+            while len(picked) < k and attempts > 0:
+                attempts -= 1
+                word_id = ids[random.randrange(len(ids))]
+                if word_id not in seen:
+                    seen.add(word_id)
+                    picked.append(word_id)
+            if len(picked) == k:
+                return picked
+
+        remaining = [word_id for word_id in ids if word_id not in seen]
+        return picked + random.sample(remaining, min(k - len(picked), len(remaining)))
+
+    def sample(self, hsk_level: int, k: int, exclude: Iterable[int] = (),
+               prefer_pos: Optional[str] = None,
+               target_length: Optional[int] = None) -> List[int]:
+        """
+        Sample k word IDs of an HSK level
+
+        Args:
+            hsk_level: HSK level to sample from
+            k: Number of IDs wanted
+            exclude: IDs that must not be returned
+            prefer_pos: Prefer words with this part of speech
+            target_length: Prefer translations of similar length
+
+        Returns:
+            Up to k distinct word IDs
+        """
+        exclude = set(exclude)
+        wanted = k * LENGTH_OVERSAMPLE if target_length is not None else k
+
+        candidates = []
+        if prefer_pos:
+            candidates = self._sample_ids(
+                self.by_level_pos.get((hsk_level, prefer_pos), []), wanted, exclude
+            )
+        if len(candidates) < wanted:
+            candidates += self._sample_ids(
+                self.by_level.get(hsk_level, []), wanted - len(candidates),
+                exclude | set(candidates)
+            )
+
+        if target_length is not None:
+            # Stable sort keeps same-POS candidates ahead on ties
+            candidates.sort(key=lambda word_id: abs(self.length_of[word_id] - target_length))
+        return candidates[:k]
+
+
+_pool: Optional[WordPool] = None
+_pool_built_at = 0.0
+_pool_lock = threading.Lock()
+
+
+def get_word_pool() -> WordPool:
+    """Get the current word pool, rebuilding it if stale"""
+    global _pool, _pool_built_at
+    pool = _pool
+    if pool is not None and time.monotonic() - _pool_built_at < POOL_TTL_SECONDS:
+        return pool
+
+    with _pool_lock:
+        if _pool is None or time.monotonic() - _pool_built_at >= POOL_TTL_SECONDS:
+            _pool = WordPool(
+                Word.objects.values_list('id', 'hsk_level', 'part_of_speech', 'translation_ru')
+            )
+            _pool_built_at = time.monotonic()
+        return _pool
+
+
+def invalidate_word_pool():
+    """Drop the pool so the next access rebuilds it"""
+    global _pool
+    with _pool_lock:
+        _pool = None
+
+
+def _option(word: Word) -> dict:
+    return {
+        'word_id': word.id,
+        'translation_ru': word.translation_ru,
+        'translation_kz': word.translation_kz
+    }
+
+
+def build_review_deck(words: List[Word], pad_hsk_level: int, deck_size: int = 10,
+                      num_distractors: int = 3,
+                      exclude: Iterable[int] = ()) -> List[Tuple[Word, List[dict]]]:
+    """
+    Build a multiple-choice deck with shuffled options
+
+    Pads the deck with random words of pad_hsk_level when fewer than
+    deck_size words are given. Distractors prefer the same part of speech
+    and a similar translation length. Padding words and distractors are
+    loaded with one bulk query.
+
+    Args:
+        words: Words to review (already loaded)
+        pad_hsk_level: HSK level of padding words
+        deck_size: Target number of cards
+        num_distractors: Wrong options per card
+        exclude: Word IDs that must not be used as padding
+
+    Returns:
+        List of (word, options) pairs
+    """
+    pool = get_word_pool()
+    deck_ids = [word.id for word in words]
+
+    pad_ids = pool.sample(
+        pad_hsk_level, deck_size - len(deck_ids), exclude=set(deck_ids) | set(exclude)
+    )
+
+    distractor_ids = {}
+    for word in words:
+        distractor_ids[word.id] = pool.sample(
+            word.hsk_level, num_distractors, exclude={word.id},
+            prefer_pos=word.part_of_speech, target_length=len(word.translation_ru or '')
+        )
+    for word_id in pad_ids:
+        distractor_ids[word_id] = pool.sample(
+            pool.level_of[word_id], num_distractors, exclude={word_id},
+            prefer_pos=pool.pos_of[word_id], target_length=pool.length_of[word_id]
+        )
+
+    needed = set(pad_ids)
+    for ids in distractor_ids.values():
+        needed.update(ids)
+    fetched = Word.objects.in_bulk(needed) if needed else {}
+
+    deck = []
+    for word in list(words) + [fetched[word_id] for word_id in pad_ids if word_id in fetched]:
+        options = [_option(word)] + [
+            _option(fetched[word_id]) for word_id in distractor_ids[word.id] if word_id in fetched
+        ]
+        random.shuffle(options)
+        deck.append((word, options))
+    return deck
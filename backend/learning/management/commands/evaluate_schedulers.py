@@ -0,0 +1,36 @@
+"""
+Compare SRS scheduling algorithms on recorded review history
+Run: python manage.py evaluate_schedulers [--user USERNAME] [--algorithms sm2 fsrs]
+"""
+from django.core.management.base import BaseCommand
+from vocab.models import ReviewHistory
+from learning.schedulers import SCHEDULERS, evaluate_schedulers
+
+
+class Command(BaseCommand):
+    help = 'Replay ReviewHistory and compare predicted recall of each scheduler with actual results'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Only replay reviews of this username')
+        parser.add_argument('--algorithms', nargs='+', choices=list(SCHEDULERS),
+                            help='Schedulers to evaluate (default: all)')
+
+    def handle(self, *args, **options):
+        history = ReviewHistory.objects.all()
+        if options['user']:
+            history = history.filter(user__username=options['user'])
+
+        reviews = history.order_by('user_id', 'word_id', 'reviewed_at', 'id').values_list(
+            'user_id', 'word_id', 'quality', 'reviewed_at'
+        ).iterator(chunk_size=5000)
+
+        results = evaluate_schedulers(reviews, options['algorithms'])
+
+        for name, stats in results.items():
+            self.stdout.write(
+                f"{name}: reviews={stats['reviews']} log_loss={stats['log_loss']} "
+                f"rmse={stats['rmse']} predicted={stats['mean_predicted']} "
+                f"actual={stats['actual_recall']} avg_interval_days={stats['avg_interval_days']}"
+            )
+
+        self.stdout.write(self.style.SUCCESS('Evaluation complete'))
@@ -0,0 +1,34 @@
+"""
+Rebuild materialized SRS summaries (UserSRSSummary) from WordProgress
+Run: python manage.py rebuild_srs_summaries [--user USERNAME]
+"""
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from learning.srs_summary import rebuild_summary
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Rebuild per-user SRS summary counters from WordProgress'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Only rebuild the summary for this username')
+
+    def handle(self, *args, **options):
+        # Users with SRS data or an existing (possibly stale) summary row
+        users = User.objects.filter(
+            Q(word_progress__isnull=False) | Q(srs_summary__isnull=False)
+        ).distinct()
+        if options['user']:
+            users = User.objects.filter(username=options['user'])
+
+        rebuilt = 0
+        for user in users.iterator():
+            rebuild_summary(user)
+            rebuilt += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully rebuilt {rebuilt} SRS summaries')
+        )
@@ -0,0 +1,64 @@
+"""
+Roll up ReviewHistory into per-user daily totals (ReviewDailyRollup)
+Run daily: python manage.py rollup_review_history [--user USERNAME]
+           (catches up every day after the lowest rollup watermark)
+Recompute: python manage.py rollup_review_history --days N
+Backfill:  python manage.py rollup_review_history --all
+"""
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+from vocab.models import ReviewHistory
+from learning.review_rollups import first_pending_day, rollup_reviews
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Roll up daily review totals for complete days (default: catch up to yesterday)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int,
+                            help='Recompute this many complete days, ending yesterday')
+        parser.add_argument('--all', action='store_true',
+                            help='Roll up all history up to yesterday')
+        parser.add_argument('--user', help='Only roll up reviews of this username')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['user']} not found")
+
+        end = timezone.localdate() - timedelta(days=1)
+        if options['all']:
+            history = ReviewHistory.objects.all()
+            if user is not None:
+                history = history.filter(user=user)
+            first_review = history.aggregate(first=Min('reviewed_at'))['first']
+            if first_review is None:
+                self.stdout.write('No review history to roll up')
+                return
+            start = timezone.localdate(first_review)
+        elif options['days'] is not None:
+            if options['days'] < 1:
+                raise CommandError('--days must be at least 1')
+            start = end - timedelta(days=options['days'] - 1)
+        else:
+            start = first_pending_day(user)
+            if start is None:
+                self.stdout.write('No review history to roll up')
+                return
+            if start > end:
+                self.stdout.write(f'Rollups are up to date through {end}')
+                return
+
+        written = rollup_reviews(start, end, user=user)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Rolled up {written} user-days from {start} to {end}')
+        )
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0002_remove_sessionprogress_course_day_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubmittedAnswer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idempotency_key', models.CharField(max_length=64)),
+                ('step', models.IntegerField()),
+                ('result', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='submitted_answers', to='learning.learningsession')),
+            ],
+            options={
+                'verbose_name': 'Submitted Answer',
+                'verbose_name_plural': 'Submitted Answers',
+                'ordering': ['session', 'created_at'],
+                'unique_together': {('session', 'idempotency_key')},
+            },
+        ),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:42
+
+from django.db import migrations, models
+
+STEP_COUNT = 5
+
+
+def pack_step_timings(apps, schema_editor):
+    """Move step_N_started_at / step_N_completed_at into step_timings"""
+    LearningSession = apps.get_model('learning', 'LearningSession')
+    columns = [
+        name for step in range(1, STEP_COUNT + 1)
+        for name in (f'step_{step}_started_at', f'step_{step}_completed_at')
+    ]
+    batch = []
+    for session in LearningSession.objects.only('id', *columns).iterator(chunk_size=2000):
+        timings = []
+        for step in range(1, STEP_COUNT + 1):
+            started = getattr(session, f'step_{step}_started_at')
+            completed = getattr(session, f'step_{step}_completed_at')
+            timings.append([
+                int(started.timestamp()) if started else None,
+                int(completed.timestamp()) if completed else None,
+            ])
+        # Trailing steps never reached are omitted
+        while timings and timings[-1] == [None, None]:
+            timings.pop()
+        if timings:
+            session.step_timings = timings
+            batch.append(session)
+        if len(batch) >= 2000:
+            LearningSession.objects.bulk_update(batch, ['step_timings'])
+            batch = []
+    if batch:
+        LearningSession.objects.bulk_update(batch, ['step_timings'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0003_submittedanswer'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='learningsession',
+            name='step_timings',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.RunPython(pack_step_timings, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='learningsession',
+            name='step_1_started_at',
+        ),
+        migrations.RemoveField(
+            model_name='learningsession',
+            name='step_1_completed_at',
+        ),
+        migrations.RemoveField(
+            model_name='learningsession',
+            name='step_2_started_at',
+        ),
+        migrations.RemoveField(
+            model_name='learningsession',
+            name='step_2_completed_at',
+        ),
+        migrations.RemoveField(
+            model_name='learningsession',
+            name='step_3_started_at',
+        ),
+        migrations.RemoveField(
+            model_name='learningsession',
+            name='step_3_completed_at',
+        ),
+        migrations.RemoveField(
+            model_name='learningsession',
+            name='step_4_started_at',
+        ),
+        migrations.RemoveField(
+            model_name='learningsession',
+            name='step_4_completed_at',
+        ),
+        migrations.RemoveField(
+            model_name='learningsession',
+            name='step_5_started_at',
+        ),
+        migrations.RemoveField(
+            model_name='learningsession',
+            name='step_5_completed_at',
+        ),
+    ]
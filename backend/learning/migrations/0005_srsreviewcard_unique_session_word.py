@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:45
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def delete_duplicate_cards(apps, schema_editor):
+    """Keep the oldest card per (session, word)"""
+    SRSReviewCard = apps.get_model('learning', 'SRSReviewCard')
+    duplicates = SRSReviewCard.objects.values('session_id', 'word_id').annotate(
+        count=Count('id'), keep_id=Min('id')
+    ).filter(count__gt=1).order_by()
+    for dup in list(duplicates):
+        SRSReviewCard.objects.filter(
+            session_id=dup['session_id'], word_id=dup['word_id']
+        ).exclude(id=dup['keep_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0004_learningsession_step_timings'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_cards, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='srsreviewcard',
+            constraint=models.UniqueConstraint(fields=('session', 'word'), name='unique_srs_card_session_word'),
+        ),
+    ]
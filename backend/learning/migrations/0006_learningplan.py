@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:52
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('course', '0002_courseday_grammar_rules_courseday_new_words'),
+        ('learning', '0005_srsreviewcard_unique_session_word'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LearningPlan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('word_ids', models.JSONField(default=list)),
+                ('words_version', models.CharField(max_length=16)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('course_day', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='learning_plans', to='course.courseday')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='learning_plans', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Learning Plan',
+                'verbose_name_plural': 'Learning Plans',
+                'unique_together': {('user', 'course_day')},
+            },
+        ),
+    ]
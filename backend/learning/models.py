@@ -2,6 +2,7 @@
 New Learning Session Models - Session A/B Structure with 5 Steps
 Replaces the existing lesson system
 """
+from datetime import datetime, timezone as dt_timezone
 from django.db import models
 from django.utils import timezone
 from django.conf import settings
@@ -170,17 +171,10 @@ class LearningSession(models.Model):
     current_step = models.IntegerField(default=1)
     is_completed = models.BooleanField(default=False)
 
-    # Step completion times (for tracking time spent on each step)
-    step_1_started_at = models.DateTimeField(null=True, blank=True)
-    step_1_completed_at = models.DateTimeField(null=True, blank=True)
-    step_2_started_at = models.DateTimeField(null=True, blank=True)
-    step_2_completed_at = models.DateTimeField(null=True, blank=True)
-    step_3_started_at = models.DateTimeField(null=True, blank=True)
-    step_3_completed_at = models.DateTimeField(null=True, blank=True)
-    step_4_started_at = models.DateTimeField(null=True, blank=True)
-    step_4_completed_at = models.DateTimeField(null=True, blank=True)
-    step_5_started_at = models.DateTimeField(null=True, blank=True)
-    step_5_completed_at = models.DateTimeField(null=True, blank=True)
+    # Step start/completion times (for tracking time spent on each step):
+    # [[started, completed], ...] per step as Unix timestamps or null.
+    # Written through learning.session_state
+    step_timings = models.JSONField(default=list, blank=True)
 
     # Session timing
     started_at = models.DateTimeField(auto_now_add=True)
@@ -225,13 +219,30 @@ class LearningSession(models.Model):
             delta = timezone.now() - self.started_at
         return round(delta.total_seconds() / 60, 1)
 
+    STEP_COUNT = 5
+
+    def _step_timing(self, step_number):
+        timings = self.step_timings or []
+        if 1 <= step_number <= len(timings):
+            return timings[step_number - 1]
+        return [None, None]
+
+    def get_step_started_at(self, step_number):
+        """When a step was started (None if not yet)"""
+        started = self._step_timing(step_number)[0]
+        return datetime.fromtimestamp(started, tz=dt_timezone.utc) if started is not None else None
+
+    def get_step_completed_at(self, step_number):
+        """When a step was completed (None if not yet)"""
+        completed = self._step_timing(step_number)[1]
+        return datetime.fromtimestamp(completed, tz=dt_timezone.utc) if completed is not None else None
+
     def get_step_time(self, step_number):
         """Get time spent on a specific step in seconds"""
-        started = getattr(self, f'step_{step_number}_started_at')
-        completed = getattr(self, f'step_{step_number}_completed_at')
+        started, completed = self._step_timing(step_number)
 
-        if started and completed:
-            return int((completed - started).total_seconds())
+        if started is not None and completed is not None:
+            return int(completed - started)
         return 0
 
 
@@ -348,6 +359,71 @@ class SRSReviewCard(models.Model):
         verbose_name = 'SRS Review Card'
         verbose_name_plural = 'SRS Review Cards'
         ordering = ['session', 'created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['session', 'word'], name='unique_srs_card_session_word'),
+        ]
 
     def __str__(self):
         return f"{self.session} - {self.word.hanzi} - {'Problematic' if self.is_problematic else 'OK'}"
+
+
+class SubmittedAnswer(models.Model):
+    """
+    Idempotency log of answers applied through the batch submit endpoint
+    Replayed answers (same session and key) return the stored result
+    """
+    session = models.ForeignKey(
+        LearningSession,
+        on_delete=models.CASCADE,
+        related_name='submitted_answers'
+    )
+    idempotency_key = models.CharField(max_length=64)
+    step = models.IntegerField()
+
+    # Per-answer result returned to the client
+    result = models.JSONField(default=dict)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Submitted Answer'
+        verbose_name_plural = 'Submitted Answers'
+        ordering = ['session', 'created_at']
+        unique_together = [['session', 'idempotency_key']]
+
+    def __str__(self):
+        return f"{self.session} - Step {self.step} - {self.idempotency_key}"
+
+
+class LearningPlan(models.Model):
+    """
+    Upcoming new words of a course day for one user (see learning.plan)
+    Step 2 reads its words from here instead of filtering the day's words
+    against the user's WordProgress on every load
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='learning_plans'
+    )
+    course_day = models.ForeignKey(
+        'course.CourseDay',
+        on_delete=models.CASCADE,
+        related_name='learning_plans'
+    )
+
+    # IDs of the day's words not introduced yet, in course order
+    word_ids = models.JSONField(default=list)
+
+    # Hash of the day's word list the plan was built from (rebuilt when it changes)
+    words_version = models.CharField(max_length=16)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Learning Plan'
+        verbose_name_plural = 'Learning Plans'
+        unique_together = [['user', 'course_day']]
+
+    def __str__(self):
+        return f"{self.user.username} - Day {self.course_day_id} plan ({len(self.word_ids)} words)"
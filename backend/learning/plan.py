@@ -0,0 +1,125 @@
+"""
+Per-user learning plans (LearningPlan)
+
+A plan holds the new words of a course day that a user has not been
+introduced to yet. It is built once per (user, course day) from the
+content bundle and the user's WordProgress, and advanced as words are
+learned in Step 2 (advance_plans), so loading Step 2 is a keyed lookup
+on (user, course_day) instead of a filter over the user's progress.
+
+Plans are rebuilt when the day's word list changes (words_version).
+The next day's plan is built ahead of time by next_day_audio(), which
+lets clients prefetch the next lesson's audio.
+"""
+import hashlib
+from typing import Iterable, List, Optional
+from django.utils import timezone
+from course.models import CourseDay
+from vocab.models import WordProgress
+from .content import get_content_bundle
+from .models import LearningPlan
+
+# New words introduced per Step 2
+STEP_2_WORDS = 5
+
+
+def _words_version(word_ids: List[int]) -> str:
+    return hashlib.md5(','.join(map(str, word_ids)).encode('ascii')).hexdigest()[:16]
+
+
+def build_plan(user, course_day_id: int, content: dict) -> List[int]:
+    """
+    (Re)build a user's plan for a course day
+
+    Args:
+        user: User instance
+        course_day_id: CourseDay ID
+        content: Content bundle of the day (see learning.content)
+
+    Returns:
+        Planned word IDs in course order
+    """
+    day_word_ids = [word['id'] for word in content['new_words']]
+    learned_word_ids = set(WordProgress.objects.filter(
+        user=user,
+        word_id__in=day_word_ids,
+        srs_level__gt=0
+    ).order_by().values_list('word_id', flat=True))
+    word_ids = [word_id for word_id in day_word_ids if word_id not in learned_word_ids]
+
+    LearningPlan.objects.bulk_create(
+        [LearningPlan(
+            user=user,
+            course_day_id=course_day_id,
+            word_ids=word_ids,
+            words_version=_words_version(day_word_ids)
+        )],
+        update_conflicts=True,
+        unique_fields=['user', 'course_day'],
+        update_fields=['word_ids', 'words_version', 'updated_at']
+    )
+    return word_ids
+
+
+def get_plan_word_ids(user, course_day_id: int, content: dict) -> List[int]:
+    """Planned word IDs of a course day, building the plan if needed"""
+    plan = LearningPlan.objects.filter(
+        user=user, course_day_id=course_day_id
+    ).values_list('word_ids', 'words_version').first()
+    if plan is not None and plan[1] == _words_version([word['id'] for word in content['new_words']]):
+        return plan[0]
+    return build_plan(user, course_day_id, content)
+
+
+def get_plan_words(user, course_day_id: int, content: dict, limit: int = STEP_2_WORDS) -> List[dict]:
+    """Word data (from the content bundle) of the next planned words"""
+    words_by_id = {word['id']: word for word in content['new_words']}
+    word_ids = get_plan_word_ids(user, course_day_id, content)
+    return [words_by_id[word_id] for word_id in word_ids if word_id in words_by_id][:limit]
+
+
+def advance_plans(user, word_ids: Iterable[int]):
+    """
+    Remove words the user has just learned from their plans
+
+    Args:
+        user: User instance
+        word_ids: IDs of the introduced words
+    """
+    word_ids = set(word_ids)
+    if not word_ids:
+        return
+    day_ids = CourseDay.new_words.through.objects.filter(
+        word_id__in=word_ids
+    ).values('courseday_id')
+    plans = list(LearningPlan.objects.filter(user=user, course_day_id__in=day_ids))
+    now = timezone.now()
+    for plan in plans:
+        plan.word_ids = [word_id for word_id in plan.word_ids if word_id not in word_ids]
+        plan.updated_at = now
+    if plans:
+        LearningPlan.objects.bulk_update(plans, ['word_ids', 'updated_at'])
+
+
+def next_day_audio(user, course_day: CourseDay, session_type: str) -> List[str]:
+    """
+    Audio URLs of the next course day's first planned words
+
+    Builds the next day's plan ahead of time if needed.
+
+    Args:
+        user: User instance
+        course_day: Current CourseDay
+        session_type: 'A' or 'B'
+    """
+    next_day_id: Optional[int] = CourseDay.objects.filter(
+        course_id=course_day.course_id,
+        day_number=course_day.day_number + 1
+    ).values_list('id', flat=True).first()
+    if next_day_id is None:
+        return []
+    content = get_content_bundle(next_day_id, session_type)
+    return [
+        word['audio_url'] for word in get_plan_words(user, next_day_id, content)
+        if word['audio_url']
+    ]
@@ -0,0 +1,208 @@
+"""
+Daily per-user rollups of ReviewHistory (ReviewDailyRollup)
+
+Statistics read review totals from the rollup table instead of counting
+raw history, which keeps them cheap as ReviewHistory grows (and lets old
+history partitions be dropped, see vocab.partitions). rollup_reviews()
+is run by the rollup_review_history management command for complete
+days.
+
+Days without reviews have no rollup row, so a missing row can't tell a
+quiet day from a day that was never rolled up. Each user therefore has a
+watermark (ReviewRollupWatermark): the last day up to which all of their
+days are rolled up. It only advances over contiguous ranges, so a missed
+run leaves it behind; get_review_totals() reads rollups up to the
+watermark and raw history after it, and the command catches up from the
+lowest watermark (first_pending_day()).
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Exists, Min, OuterRef, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from vocab.models import ReviewHistory, ReviewDailyRollup, ReviewRollupWatermark
+
+QUALITIES = range(6)
+
+ROLLUP_UPDATE_FIELDS = [
+    'reviews', 'correct_reviews', 'total_review_time_seconds', 'quality_counts', 'updated_at'
+]
+
+
+def _day_start(day: date) -> datetime:
+    """Start of a local day as an aware datetime"""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _review_aggregates():
+    return {
+        'reviews': Count('id'),
+        'correct_reviews': Count('id', filter=Q(quality__gte=3)),
+        'total_review_time_seconds': Sum('review_time_seconds'),
+        **{f'quality_{q}': Count('id', filter=Q(quality=q)) for q in QUALITIES}
+    }
+
+
+def rollup_reviews(start: date, end: date, user=None) -> int:
+    """
+    Recompute rollups for the days start..end (inclusive)
+
+    Days are grouped in the current time zone. Rows are upserted, so
+    re-running a range is safe. end must be before today: a partial day
+    would hide later reviews from get_review_totals().
+
+    Watermarks move up to end for users whose rolled-up days reach the
+    range (watermark >= start - 1), and are created for users without one
+    who have no history before start. Other users keep theirs, so a gap
+    before start stays visible.
+
+    Args:
+        start: First day to roll up
+        end: Last day to roll up
+        user: Optional user to restrict the rollup to
+
+    Returns:
+        Number of rollup rows written
+    """
+    today = timezone.localdate()
+    if end >= today:
+        raise ValueError('Only complete days can be rolled up')
+
+    history = ReviewHistory.objects.filter(
+        reviewed_at__gte=_day_start(start),
+        reviewed_at__lt=_day_start(end + timedelta(days=1))
+    )
+    if user is not None:
+        history = history.filter(user=user)
+
+    rows = history.order_by().annotate(day=TruncDate('reviewed_at')).values(
+        'user_id', 'day'
+    ).annotate(**_review_aggregates())
+
+    now = timezone.now()
+    rollups = [
+        ReviewDailyRollup(
+            user_id=row['user_id'],
+            date=row['day'],
+            reviews=row['reviews'],
+            correct_reviews=row['correct_reviews'],
+            total_review_time_seconds=row['total_review_time_seconds'] or 0,
+            quality_counts={str(q): row[f'quality_{q}'] for q in QUALITIES if row[f'quality_{q}']},
+            updated_at=now
+        )
+        for row in rows
+    ]
+
+    with transaction.atomic():
+        ReviewDailyRollup.objects.bulk_create(
+            rollups,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['user', 'date'],
+            update_fields=ROLLUP_UPDATE_FIELDS
+        )
+        _advance_watermarks(start, end, user, now)
+    return len(rollups)
+
+
+def _advance_watermarks(start: date, end: date, user, now: datetime):
+    """Move watermarks contiguous with start..end up to end"""
+    users = get_user_model().objects.all()
+    if user is not None:
+        users = users.filter(pk=user.pk)
+
+    ReviewRollupWatermark.objects.filter(
+        user__in=users,
+        rolled_up_through__gte=start - timedelta(days=1),
+        rolled_up_through__lt=end
+    ).update(rolled_up_through=end, updated_at=now)
+
+    new_users = users.filter(review_rollup_watermark__isnull=True).exclude(
+        Exists(ReviewHistory.objects.filter(user=OuterRef('pk'), reviewed_at__lt=_day_start(start)))
+    ).values_list('pk', flat=True)
+    ReviewRollupWatermark.objects.bulk_create(
+        [ReviewRollupWatermark(user_id=user_id, rolled_up_through=end, updated_at=now) for user_id in new_users],
+        batch_size=1000,
+        ignore_conflicts=True
+    )
+
+
+def first_pending_day(user=None) -> Optional[date]:
+    """
+    First day that is not rolled up for every user
+
+    Args:
+        user: Optional user to restrict the check to
+
+    Returns:
+        The day after the lowest watermark, or the first review day of a
+        user without a watermark, whichever is earlier; None if there is
+        nothing to roll up
+    """
+    watermarks = ReviewRollupWatermark.objects.all()
+    history = ReviewHistory.objects.filter(user__review_rollup_watermark__isnull=True)
+    if user is not None:
+        watermarks = watermarks.filter(user=user)
+        history = history.filter(user=user)
+
+    days = []
+    lowest = watermarks.aggregate(day=Min('rolled_up_through'))['day']
+    if lowest is not None:
+        days.append(lowest + timedelta(days=1))
+    first_review = history.aggregate(first=Min('reviewed_at'))['first']
+    if first_review is not None:
+        days.append(timezone.localdate(first_review))
+    return min(days) if days else None
+
+
+def get_review_totals(user, since: Optional[date] = None) -> dict:
+    """
+    Review totals for a user from rollups plus not-yet-rolled-up history
+
+    Args:
+        user: User instance
+        since: Optional first day to count (default: all time)
+
+    Returns:
+        {"reviews", "correct_reviews", "total_review_time_seconds"}
+    """
+    rolled_up_through = ReviewRollupWatermark.objects.filter(user=user).values_list(
+        'rolled_up_through', flat=True
+    ).first()
+
+    # Rollups only up to the watermark: rows after it may follow a gap
+    rollups = ReviewDailyRollup.objects.filter(user=user)
+    if rolled_up_through is None:
+        rollups = rollups.none()
+    else:
+        rollups = rollups.filter(date__lte=rolled_up_through)
+    if since is not None:
+        rollups = rollups.filter(date__gte=since)
+    rolled = rollups.aggregate(
+        reviews=Sum('reviews'),
+        correct_reviews=Sum('correct_reviews'),
+        total_review_time_seconds=Sum('total_review_time_seconds')
+    )
+
+    # Raw history after the watermark (normally today only), or all of it
+    # before the user's first complete rollup
+    raw = ReviewHistory.objects.filter(user=user)
+    if since is not None:
+        raw = raw.filter(reviewed_at__gte=_day_start(since))
+    if rolled_up_through is not None:
+        raw = raw.filter(reviewed_at__gte=_day_start(rolled_up_through + timedelta(days=1)))
+    recent = raw.aggregate(
+        reviews=Count('id'),
+        correct_reviews=Count('id', filter=Q(quality__gte=3)),
+        total_review_time_seconds=Sum('review_time_seconds')
+    )
+
+    return {
+        'reviews': (rolled['reviews'] or 0) + recent['reviews'],
+        'correct_reviews': (rolled['correct_reviews'] or 0) + recent['correct_reviews'],
+        'total_review_time_seconds': (
+            (rolled['total_review_time_seconds'] or 0) + (recent['total_review_time_seconds'] or 0)
+        )
+    }
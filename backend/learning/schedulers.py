@@ -0,0 +1,310 @@
+"""
+Pluggable SRS scheduling algorithms
+
+Every scheduler implements next_state(state, quality, elapsed_days) and
+predict_recall(state, elapsed_days). update_srs picks the scheduler from
+UserProfile.srs_algorithm via get_user_scheduler().
+
+- sm2: SuperMemo SM-2 (the original algorithm of this app)
+- fsrs: FSRS-4.5 style memory model (stability / difficulty), which
+  schedules each card for a target recall probability
+
+evaluate_schedulers() replays ReviewHistory and compares each
+algorithm's predicted recall with what actually happened.
+"""
+import math
+from dataclasses import dataclass, replace
+from typing import Dict, Iterable, List, Optional, Tuple
+
+MIN_EASE_FACTOR = 1.3
+DEFAULT_ALGORITHM = 'sm2'
+
+
+@dataclass(frozen=True)
+class CardState:
+    """Scheduler-visible part of a WordProgress row"""
+    srs_level: int = 0
+    ease_factor: float = 2.5
+    interval_days: int = 0
+    stability: Optional[float] = None
+    difficulty: Optional[float] = None
+
+    @classmethod
+    def from_progress(cls, word_progress) -> 'CardState':
+        return cls(
+            srs_level=word_progress.srs_level,
+            ease_factor=word_progress.ease_factor,
+            interval_days=word_progress.interval_days,
+            stability=word_progress.stability,
+            difficulty=word_progress.difficulty,
+        )
+
+
+class Scheduler:
+    """
+    Base class for scheduling algorithms
+    """
+    name = None
+    label = None
+
+    def next_state(self, state: CardState, quality: int, elapsed_days: Optional[float]) -> CardState:
+        """
+        Compute the state after a review
+
+        Args:
+            state: State before the review
+            quality: Quality rating (0-5), >= 3 counts as recalled
+            elapsed_days: Days since the previous review (None for the first one)
+
+        Returns:
+            New CardState; interval_days is the delay until the next review
+        """
+        raise NotImplementedError
+
+    def predict_recall(self, state: CardState, elapsed_days: float) -> Optional[float]:
+        """Predicted probability of recall after elapsed_days (None if unknown)"""
+        raise NotImplementedError
+
+
+SCHEDULERS: Dict[str, Scheduler] = {}
+
+
+def register_scheduler(cls):
+    """Class decorator adding a scheduler to the registry"""
+    SCHEDULERS[cls.name] = cls()
+    return cls
+
+
+def get_scheduler(name: Optional[str] = None) -> Scheduler:
+    """Get a registered scheduler by name (SM-2 if unknown)"""
+    return SCHEDULERS.get(name or DEFAULT_ALGORITHM, SCHEDULERS[DEFAULT_ALGORITHM])
+
+
+def get_user_scheduler(user) -> Scheduler:
+    """Scheduler selected in the user's profile"""
+    profile = getattr(user, 'profile', None)
+    return get_scheduler(getattr(profile, 'srs_algorithm', None))
+
+
+def scheduler_choices() -> List[Tuple[str, str]]:
+    return [(name, scheduler.label) for name, scheduler in SCHEDULERS.items()]
+
+
+@register_scheduler
+class SM2Scheduler(Scheduler):
+    """
+    SuperMemo SM-2
+    """
+    name = 'sm2'
+    label = 'SM-2'
+
+    # SM-2 has no memory model; assume recall decays to this value at the
+    # scheduled interval when predicting recall for evaluation
+    TARGET_RECALL = 0.9
+
+    def next_state(self, state, quality, elapsed_days):
+        # If answer was unsuccessful (quality < 3)
+        if quality < 3:
+            # Reset to beginning, decrease ease factor
+            return replace(
+                state,
+                srs_level=0,
+                interval_days=1,
+                ease_factor=max(MIN_EASE_FACTOR, state.ease_factor - 0.2)
+            )
+
+        # Successful answer (quality >= 3)
+        srs_level = state.srs_level + 1
+
+        # Update ease factor using SM-2 formula
+        # EF' = EF + (0.1 - (5 - q) * (0.08 + (5 - q) * 0.02))
+        ef = state.ease_factor
+        ef_new = ef + (0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+        ease_factor = max(MIN_EASE_FACTOR, ef_new)
+
+        # Calculate interval
+        if srs_level == 1:
+            interval = 1
+        elif srs_level == 2:
+            interval = 6
+        else:
+            interval = round(state.interval_days * ease_factor)
+
+        return replace(state, srs_level=srs_level, ease_factor=ease_factor, interval_days=interval)
+
+    def predict_recall(self, state, elapsed_days):
+        if state.interval_days <= 0:
+            return None
+        return self.TARGET_RECALL ** (elapsed_days / state.interval_days)
+
+
+@register_scheduler
+class FSRSScheduler(Scheduler):
+    """
+    FSRS-4.5 style scheduler
+
+    Tracks memory stability S (days until recall drops to 90%) and
+    difficulty D (1-10) per card and schedules the next review when
+    predicted recall reaches desired_retention. srs_level still counts
+    consecutive successes so dashboards keep working; ease_factor is left
+    untouched.
+    """
+    name = 'fsrs'
+    label = 'FSRS'
+
+    DECAY = -0.5
+    FACTOR = 19 / 81
+    MAX_INTERVAL_DAYS = 36500
+
+    # Default FSRS-4.5 parameters
+    WEIGHTS = (
+        0.4872, 1.4003, 3.7145, 13.8206, 5.1618, 1.2298, 0.8975, 0.031,
+        1.6474, 0.1367, 1.0461, 2.1072, 0.0793, 0.3246, 1.587, 0.2272, 2.8755,
+    )
+
+    def __init__(self, desired_retention: float = 0.9, weights: Tuple[float, ...] = None):
+        self.desired_retention = desired_retention
+        self.w = weights or self.WEIGHTS
+
+    @staticmethod
+    def _grade(quality: int) -> int:
+        """Map SM-2 quality (0-5) to FSRS rating: 1 again, 2 hard, 3 good, 4 easy"""
+        if quality < 3:
+            return 1
+        return min(quality - 1, 4)
+
+    @staticmethod
+    def _clamp_difficulty(difficulty: float) -> float:
+        return min(max(difficulty, 1.0), 10.0)
+
+    def _initial_difficulty(self, grade: int) -> float:
+        return self._clamp_difficulty(self.w[4] - (grade - 3) * self.w[5])
+
+    def retrievability(self, elapsed_days: float, stability: float) -> float:
+        return (1 + self.FACTOR * max(elapsed_days, 0.0) / stability) ** self.DECAY
+
+    def _interval(self, stability: float) -> int:
+        interval = stability / self.FACTOR * (self.desired_retention ** (1 / self.DECAY) - 1)
+        return min(max(1, round(interval)), self.MAX_INTERVAL_DAYS)
+
+    def next_state(self, state, quality, elapsed_days):
+        w = self.w
+        grade = self._grade(quality)
+        success = grade > 1
+
+        stability = state.stability
+        difficulty = state.difficulty
+        if stability is None and state.interval_days > 0:
+            # Card scheduled by another algorithm: seed S from its interval
+            stability = float(state.interval_days)
+        if difficulty is None and stability is not None:
+            difficulty = self._initial_difficulty(3)
+
+        if stability is None:
+            # First review
+            new_stability = w[grade - 1]
+            new_difficulty = self._initial_difficulty(grade)
+        else:
+            recall = self.retrievability(elapsed_days or 0.0, stability)
+            if success:
+                hard_penalty = w[15] if grade == 2 else 1.0
+                easy_bonus = w[16] if grade == 4 else 1.0
+                new_stability = stability * (
+                    math.exp(w[8]) * (11 - difficulty) * stability ** -w[9]
+                    * (math.exp(w[10] * (1 - recall)) - 1) * hard_penalty * easy_bonus + 1
+                )
+            else:
+                new_stability = min(
+                    stability,
+                    w[11] * difficulty ** -w[12] * ((stability + 1) ** w[13] - 1)
+                    * math.exp(w[14] * (1 - recall))
+                )
+            # Difficulty update with mean reversion towards D0(good)
+            next_difficulty = difficulty - w[6] * (grade - 3)
+            new_difficulty = self._clamp_difficulty(
+                w[7] * self._initial_difficulty(3) + (1 - w[7]) * next_difficulty
+            )
+
+        return replace(
+            state,
+            srs_level=state.srs_level + 1 if success else 0,
+            interval_days=self._interval(new_stability),
+            stability=new_stability,
+            difficulty=new_difficulty
+        )
+
+    def predict_recall(self, state, elapsed_days):
+        stability = state.stability
+        if stability is None:
+            if state.interval_days <= 0:
+                return None
+            stability = float(state.interval_days)
+        return self.retrievability(elapsed_days, stability)
+
+
+def evaluate_schedulers(reviews: Iterable[Tuple[int, int, int, object]],
+                        names: Optional[Iterable[str]] = None) -> Dict[str, dict]:
+    """
+    Replay review history and score each scheduler's recall predictions
+
+    Args:
+        reviews: (user_id, word_id, quality, reviewed_at) tuples ordered by
+            user, word and reviewed_at
+        names: Scheduler names to evaluate (default: all registered)
+
+    Returns:
+        {name: {"reviews", "log_loss", "rmse", "mean_predicted",
+                "actual_recall", "avg_interval_days"}}
+    """
+    schedulers = {name: get_scheduler(name) for name in (names or SCHEDULERS)}
+    totals = {
+        name: {'n': 0, 'log_loss': 0.0, 'squared_error': 0.0, 'predicted': 0.0,
+               'recalled': 0, 'intervals': 0, 'interval_sum': 0}
+        for name in schedulers
+    }
+
+    current_card = None
+    states = {}
+    last_reviewed_at = None
+    for user_id, word_id, quality, reviewed_at in reviews:
+        if (user_id, word_id) != current_card:
+            current_card = (user_id, word_id)
+            states = {name: CardState() for name in schedulers}
+            last_reviewed_at = None
+
+        elapsed = None
+        if last_reviewed_at is not None:
+            elapsed = (reviewed_at - last_reviewed_at).total_seconds() / 86400
+        recalled = 1 if quality >= 3 else 0
+
+        for name, scheduler in schedulers.items():
+            stats = totals[name]
+            if elapsed is not None:
+                predicted = scheduler.predict_recall(states[name], elapsed)
+                if predicted is not None:
+                    p = min(max(predicted, 1e-6), 1 - 1e-6)
+                    stats['n'] += 1
+                    stats['log_loss'] -= math.log(p) if recalled else math.log(1 - p)
+                    stats['squared_error'] += (p - recalled) ** 2
+                    stats['predicted'] += p
+                    stats['recalled'] += recalled
+            states[name] = scheduler.next_state(states[name], quality, elapsed)
+            stats['intervals'] += 1
+            stats['interval_sum'] += states[name].interval_days
+
+        last_reviewed_at = reviewed_at
+
+    results = {}
+    for name, stats in totals.items():
+        n = stats['n']
+        results[name] = {
+            'reviews': n,
+            'log_loss': round(stats['log_loss'] / n, 4) if n else None,
+            'rmse': round(math.sqrt(stats['squared_error'] / n), 4) if n else None,
+            'mean_predicted': round(stats['predicted'] / n, 4) if n else None,
+            'actual_recall': round(stats['recalled'] / n, 4) if n else None,
+            'avg_interval_days': (
+                round(stats['interval_sum'] / stats['intervals'], 1) if stats['intervals'] else None
+            ),
+        }
+    return results
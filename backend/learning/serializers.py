@@ -100,14 +100,21 @@ class LearningSessionSerializer(serializers.ModelSerializer):
             'words_learned', 'problematic_words', 'total_questions',
             'correct_answers', 'xp_earned', 'accuracy',
             'accuracy_percentage', 'total_time_minutes',
-            'step_1_started_at', 'step_1_completed_at',
-            'step_2_started_at', 'step_2_completed_at',
-            'step_3_started_at', 'step_3_completed_at',
-            'step_4_started_at', 'step_4_completed_at',
-            'step_5_started_at', 'step_5_completed_at',
         ]
         read_only_fields = ['started_at', 'current_step']
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Step timings are stored compactly in step_timings; keep the
+        # step_N_started_at / step_N_completed_at keys of the API
+        timestamp = serializers.DateTimeField()
+        for step in range(1, LearningSession.STEP_COUNT + 1):
+            started = instance.get_step_started_at(step)
+            completed = instance.get_step_completed_at(step)
+            data[f'step_{step}_started_at'] = timestamp.to_representation(started) if started else None
+            data[f'step_{step}_completed_at'] = timestamp.to_representation(completed) if completed else None
+        return data
+
 
 class StartSessionSerializer(serializers.Serializer):
     """Serializer for starting a new session"""
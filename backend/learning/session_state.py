@@ -0,0 +1,155 @@
+"""
+LearningSession state machine with coalesced writes
+
+Views change a session through SessionState (start/complete/skip steps,
+record answers, complete the session) and call flush() once before
+building the response. Changed fields are collected in memory and
+written with a single UPDATE of only those fields, instead of saving the
+full row after every change. Answer counters and XP are written as F()
+increments, and earned XP goes to the XP ledger (core.ledger) in the same
+transaction, so concurrent submits do not lose updates.
+
+Step timings live in LearningSession.step_timings as
+[[started, completed], ...] Unix timestamps, one pair per step.
+"""
+from typing import Optional
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from core.ledger import award_xp
+from .caching import invalidate_main_screen
+from .models import LearningSession
+
+COMPLETED_STEP = 6
+
+COUNTER_FIELDS = ('total_questions', 'correct_answers', 'xp_earned')
+
+
+class SessionState:
+    """
+    Pending changes to one LearningSession
+
+    Use SessionState.of(session) so that helpers working on the same
+    session instance within a request share one set of pending changes.
+    """
+
+    def __init__(self, session: LearningSession):
+        self.session = session
+        self.dirty = set()
+        self.increments = {}
+
+    @classmethod
+    def of(cls, session: LearningSession) -> 'SessionState':
+        state = getattr(session, '_session_state', None)
+        if state is None:
+            state = cls(session)
+            session._session_state = state
+        return state
+
+    # Field changes
+
+    def set(self, **fields):
+        """Set session fields"""
+        for name, value in fields.items():
+            if getattr(self.session, name) != value:
+                setattr(self.session, name, value)
+                self.dirty.add(name)
+
+    def _timing(self, step: int) -> list:
+        timings = self.session.step_timings or []
+        while len(timings) < step:
+            timings.append([None, None])
+        self.session.step_timings = timings
+        return timings[step - 1]
+
+    def start_step(self, step: int, now=None):
+        """Stamp the start time of a step (once)"""
+        timing = self._timing(step)
+        if timing[0] is None:
+            timing[0] = int((now or timezone.now()).timestamp())
+            self.dirty.add('step_timings')
+
+    def complete_step(self, step: int, next_step: Optional[int] = None, now=None):
+        """Stamp the completion time of a step and move to next_step (default: step + 1)"""
+        timing = self._timing(step)
+        timing[1] = int((now or timezone.now()).timestamp())
+        self.dirty.add('step_timings')
+        self.set(current_step=next_step if next_step is not None else step + 1)
+
+    def skip_step(self, step: int, now=None):
+        """Complete a step that has nothing to show and start the next one"""
+        now = now or timezone.now()
+        self.complete_step(step, now=now)
+        if step < LearningSession.STEP_COUNT:
+            self.start_step(step + 1, now=now)
+
+    def complete_session(self, now=None):
+        """Mark the whole session as completed"""
+        self.set(
+            is_completed=True,
+            completed_at=now or timezone.now(),
+            current_step=COMPLETED_STEP
+        )
+
+    def claim_completion(self, now=None) -> bool:
+        """
+        Complete the session unless it is already completed
+
+        Uses a conditional UPDATE, so of several concurrent or retried
+        completions exactly one returns True. Pending changes are not
+        written (call flush()).
+
+        Returns:
+            True if this call completed the session
+        """
+        now = now or timezone.now()
+        claimed = LearningSession.objects.filter(pk=self.session.pk, is_completed=False).update(
+            is_completed=True, completed_at=now, current_step=COMPLETED_STEP
+        )
+        if claimed:
+            self.session.is_completed = True
+            self.session.completed_at = now
+            self.session.current_step = COMPLETED_STEP
+            invalidate_main_screen(self.session.user_id)
+        else:
+            self.session.refresh_from_db(fields=['is_completed', 'completed_at', 'current_step'])
+        self.dirty -= {'is_completed', 'completed_at', 'current_step'}
+        return bool(claimed)
+
+    def record_answers(self, questions: int = 1, correct: int = 0, xp: int = 0):
+        """Add answered questions, correct answers and XP to the counters"""
+        for name, delta in zip(COUNTER_FIELDS, (questions, correct, xp)):
+            setattr(self.session, name, getattr(self.session, name) + delta)
+            self.increments[name] = self.increments.get(name, 0) + delta
+
+    def add_problematic_word(self, word_id: int):
+        words = self.session.problematic_words or []
+        if word_id not in words:
+            self.session.problematic_words = words + [word_id]
+            self.dirty.add('problematic_words')
+
+    # Persistence
+
+    def flush(self) -> bool:
+        """
+        Write all pending changes with one UPDATE
+
+        Returns:
+            True if anything was written
+        """
+        if not self.dirty and not self.increments:
+            return False
+        values = {name: getattr(self.session, name) for name in sorted(self.dirty)}
+        values.update({name: F(name) + delta for name, delta in self.increments.items()})
+        with transaction.atomic():
+            LearningSession.objects.filter(pk=self.session.pk).update(**values)
+            if 'total_questions' in self.increments:
+                award_xp(
+                    self.session.user_id, self.increments.get('xp_earned', 0),
+                    'session', source_id=self.session.pk
+                )
+        self.dirty.clear()
+        self.increments.clear()
+        # update() sends no post_save signal
+        invalidate_main_screen(self.session.user_id)
+        return True
@@ -0,0 +1,60 @@
+"""
+Signals for the learning app
+Keep in-process caches and content bundles in sync with content edits
+and the cached main screen snapshots in sync with user progress
+"""
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from core.models import UserCourseProgress, UserProfile
+from course.models import CourseDay
+from vocab.models import Word, GrammarRule, GrammarExample
+from .caching import invalidate_main_screen
+from .content import invalidate_content
+from .distractors import invalidate_word_pool
+from .models import LearningSession, GrammarTask, Dialogue, WordArrangementExercise
+
+
+@receiver(post_save, sender=Word)
+@receiver(post_delete, sender=Word)
+def invalidate_word_pool_on_change(sender, **kwargs):
+    """
+    Rebuild the distractor word pool after a Word is added, edited or removed
+    """
+    invalidate_word_pool()
+
+
+@receiver(post_save, sender=LearningSession)
+@receiver(post_delete, sender=LearningSession)
+@receiver(post_save, sender=UserCourseProgress)
+@receiver(post_save, sender=UserProfile)
+def invalidate_main_screen_on_change(sender, instance, **kwargs):
+    """
+    Drop the user's main screen snapshot when a session starts, advances
+    or completes, the course day / XP / streak changes or the profile
+    (HSK level) is edited
+    """
+    invalidate_main_screen(instance.user_id)
+
+
+CONTENT_MODELS = [
+    CourseDay, Word, GrammarRule, GrammarExample, GrammarTask, Dialogue, WordArrangementExercise
+]
+
+
+def invalidate_content_on_change(sender, **kwargs):
+    """
+    Retire content bundles after lesson content is added, edited or removed
+    """
+    transaction.on_commit(invalidate_content)
+
+
+for model in CONTENT_MODELS:
+    post_save.connect(invalidate_content_on_change, sender=model,
+                      dispatch_uid=f'learning_content_save_{model.__name__}')
+    post_delete.connect(invalidate_content_on_change, sender=model,
+                        dispatch_uid=f'learning_content_delete_{model.__name__}')
+
+for through in (CourseDay.new_words.through, CourseDay.grammar_rules.through):
+    m2m_changed.connect(invalidate_content_on_change, sender=through,
+                        dispatch_uid=f'learning_content_m2m_{through.__name__}')
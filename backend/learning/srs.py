@@ -1,77 +1,68 @@
 
 """
-SuperMemo SM-2 Algorithm Implementation
+SRS engine: reviews, due queues and statistics
+Scheduling itself lives in schedulers.py (SuperMemo SM-2 by default)
 """
 from datetime import datetime, timedelta
-from typing import List
+from typing import List, Tuple
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
 from django.utils import timezone
+from core.ledger import current_streak
 from vocab.models import Word, WordProgress, ReviewHistory
+from .srs_summary import srs_state, apply_srs_changes
+from .review_rollups import get_review_totals
+from .schedulers import CardState, Scheduler, get_scheduler, get_user_scheduler
 
 
-def update_srs(word_progress: WordProgress, quality: int, review_time_seconds: int = 0) -> WordProgress:
+def _apply_review(word_progress: WordProgress, quality: int, review_time_seconds: int = 0,
+                  now: datetime = None, scheduler: Scheduler = None) -> ReviewHistory:
     """
-    Update SRS state using SuperMemo SM-2 algorithm
+    Apply one review to a WordProgress in memory (no DB writes)
 
     Args:
         word_progress: WordProgress instance to update
-        quality: Quality rating (0-5)
-            5: Perfect response (< 3 sec)
-            4: Correct response (3-10 sec)
-            3: Correct response (> 10 sec or with difficulty)
-            2: Incorrect but remembered with hint
-            1: Incorrect but recognized correct answer
-            0: Complete failure
+        quality: Quality rating (0-5), see update_srs
         review_time_seconds: Time taken to answer
+        now: Review timestamp (defaults to timezone.now())
+        scheduler: Scheduling algorithm (defaults to SM-2)
 
     Returns:
-        Updated WordProgress instance
+        Unsaved ReviewHistory instance describing the transition
     """
+    if now is None:
+        now = timezone.now()
+    if scheduler is None:
+        scheduler = get_scheduler()
+
     # Store old values for history
     old_srs_level = word_progress.srs_level
     old_interval = word_progress.interval_days
     old_ease_factor = word_progress.ease_factor
 
-    # If answer was unsuccessful (quality < 3)
-    if quality < 3:
-        # Reset to beginning
-        word_progress.srs_level = 0
-        word_progress.interval_days = 1
-        word_progress.next_review_date = timezone.now() + timedelta(days=1)
-
-        # Decrease ease factor
-        word_progress.ease_factor = max(1.3, word_progress.ease_factor - 0.2)
-    else:
-        # Successful answer (quality >= 3)
-        word_progress.srs_level += 1
-
-        # Update ease factor using SM-2 formula
-        # EF' = EF + (0.1 - (5 - q) * (0.08 + (5 - q) * 0.02))
-        ef = word_progress.ease_factor
-        ef_new = ef + (0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
-        word_progress.ease_factor = max(1.3, ef_new)
-
-        # Calculate interval
-        if word_progress.srs_level == 1:
-            interval = 1
-        elif word_progress.srs_level == 2:
-            interval = 6
-        else:
-            interval = round(word_progress.interval_days * word_progress.ease_factor)
-
-        word_progress.interval_days = interval
-        word_progress.next_review_date = timezone.now() + timedelta(days=interval)
+    elapsed_days = None
+    if word_progress.last_reviewed_at:
+        elapsed_days = (now - word_progress.last_reviewed_at).total_seconds() / 86400
+
+    state = scheduler.next_state(CardState.from_progress(word_progress), quality, elapsed_days)
+    word_progress.srs_level = state.srs_level
+    word_progress.ease_factor = state.ease_factor
+    word_progress.interval_days = state.interval_days
+    word_progress.stability = state.stability
+    word_progress.difficulty = state.difficulty
+    word_progress.next_review_date = now + timedelta(days=state.interval_days)
 
     # Update statistics
     word_progress.total_reviews += 1
     if quality >= 3:
         word_progress.correct_reviews += 1
-    word_progress.last_reviewed_at = timezone.now()
-    word_progress.save()
+    word_progress.last_reviewed_at = now
+    word_progress.refresh_struggle_score()
 
-    # Create review history record
-    ReviewHistory.objects.create(
-        user=word_progress.user,
-        word=word_progress.word,
+    return ReviewHistory(
+        user_id=word_progress.user_id,
+        word_id=word_progress.word_id,
         quality=quality,
         old_srs_level=old_srs_level,
         new_srs_level=word_progress.srs_level,
@@ -79,12 +70,122 @@ def update_srs(word_progress: WordProgress, quality: int, review_time_seconds: i
         new_interval=word_progress.interval_days,
         old_ease_factor=old_ease_factor,
         new_ease_factor=word_progress.ease_factor,
-        review_time_seconds=review_time_seconds
+        review_time_seconds=review_time_seconds,
+        reviewed_at=now
+    )
+
+
+def update_srs(word_progress: WordProgress, quality: int, review_time_seconds: int = 0,
+               scheduler: Scheduler = None) -> WordProgress:
+    """
+    Update SRS state using SuperMemo SM-2 (or another registered scheduler)
+
+    Args:
+        word_progress: WordProgress instance to update
+        quality: Quality rating (0-5)
+            5: Perfect response (< 3 sec)
+            4: Correct response (3-10 sec)
+            3: Correct response (> 10 sec or with difficulty)
+            2: Incorrect but remembered with hint
+            1: Incorrect but recognized correct answer
+            0: Complete failure
+        review_time_seconds: Time taken to answer
+        scheduler: Scheduling algorithm (defaults to SM-2,
+            see schedulers.get_user_scheduler)
+
+    Returns:
+        Updated WordProgress instance
+    """
+    before = srs_state(word_progress)
+    history = _apply_review(word_progress, quality, review_time_seconds, scheduler=scheduler)
+    word_progress.save()
+
+    # Create review history record
+    history.save()
+
+    apply_srs_changes(
+        word_progress.user_id,
+        [(before, srs_state(word_progress))],
+        reviews=1,
+        correct=1 if quality >= 3 else 0
     )
 
     return word_progress
 
 
+# Fields written by update_srs_batch (updated_at is auto_now, which bulk_update skips)
+SRS_UPDATE_FIELDS = [
+    'srs_level', 'ease_factor', 'interval_days', 'next_review_date',
+    'stability', 'difficulty', 'total_reviews', 'correct_reviews', 'last_reviewed_at',
+    'struggle_score', 'updated_at'
+]
+
+
+def update_srs_batch(user, reviews: List[dict]) -> List[Tuple[WordProgress, ReviewHistory]]:
+    """
+    Apply many SM-2 reviews for one user in a single transaction
+
+    Loads and locks all affected WordProgress rows with one query,
+    computes the transitions in memory and persists them with one
+    bulk_update plus one ReviewHistory bulk_create. Reviews for words the user has no
+    progress for are skipped. Repeated reviews of the same word are
+    applied in order.
+
+    Args:
+        user: User instance
+        reviews: List of {"word_id", "quality", "time_spent_seconds"} dicts
+
+    Returns:
+        List of (WordProgress, ReviewHistory) pairs, one per applied review
+    """
+    word_ids = {review.get('word_id') for review in reviews}
+    scheduler = get_user_scheduler(user)
+    results = []
+
+    with transaction.atomic():
+        # Lock the rows before reading them, so an overlapping submit for
+        # the same words applies its reviews on top of these instead of
+        # the same starting state (and the summary gets the real "before"
+        # states). Locks are taken in word_id order to avoid deadlocks
+        # between batches.
+        progress_by_word = {
+            wp.word_id: wp
+            for wp in WordProgress.objects.select_for_update().filter(
+                user=user, word_id__in=word_ids
+            ).order_by('word_id')
+        }
+
+        now = timezone.now()
+        before_states = {}
+        for review in reviews:
+            word_progress = progress_by_word.get(review.get('word_id'))
+            if word_progress is None:
+                continue
+            before_states.setdefault(word_progress.word_id, srs_state(word_progress))
+            history = _apply_review(
+                word_progress,
+                review.get('quality'),
+                review.get('time_spent_seconds', 0),
+                now=now,
+                scheduler=scheduler
+            )
+            word_progress.updated_at = now
+            results.append((word_progress, history))
+
+        if results:
+            touched = list({id(wp): wp for wp, _ in results}.values())
+            WordProgress.objects.bulk_update(touched, SRS_UPDATE_FIELDS)
+            ReviewHistory.objects.bulk_create([history for _, history in results])
+            apply_srs_changes(
+                user.id,
+                [(before_states[wp.word_id], srs_state(wp)) for wp in touched],
+                reviews=len(results),
+                correct=sum(1 for _, history in results if history.quality >= 3)
+            )
+
+    return results
+
+
 def get_srs_batch(user, batch_size: int = 10, hsk_level: int = None) -> List[WordProgress]:
     """
     Get a batch of words due for review
@@ -97,6 +198,15 @@ def get_srs_batch(user, batch_size: int = 10, hsk_level: int = None) -> List[Wor
     Returns:
         List of WordProgress instances
     """
+    return list(due_queue(user, hsk_level=hsk_level)[:batch_size])
+
+
+def due_queue(user, hsk_level: int = None):
+    """
+    Queryset of words due for review, most overdue first
+
+    Served by the partial index wp_due_queue_idx.
+    """
     queryset = WordProgress.objects.filter(
         user=user,
         next_review_date__lte=timezone.now(),
@@ -106,13 +216,15 @@ def get_srs_batch(user, batch_size: int = 10, hsk_level: int = None) -> List[Wor
     if hsk_level is not None:
         queryset = queryset.filter(word__hsk_level=hsk_level)
 
-    return list(queryset[:batch_size])
+    return queryset
 
 
 def get_due_count(user) -> dict:
     """
     Get statistics about words due for review
 
+    All counts come from a single conditional-aggregate query.
+
     Args:
         user: User instance
 
@@ -123,103 +235,108 @@ def get_due_count(user) -> dict:
     today_end = now.replace(hour=23, minute=59, second=59)
     week_end = now + timedelta(days=7)
 
-    # Count words due now, today, and this week
-    due_now = WordProgress.objects.filter(
-        user=user,
-        next_review_date__lte=now,
-        srs_level__gt=0
-    ).count()
+    return WordProgress.objects.filter(user=user).aggregate(
+        # Count words due now, today, and this week
+        due_now=Count('id', filter=Q(next_review_date__lte=now, srs_level__gt=0)),
+        due_today=Count('id', filter=Q(next_review_date__lte=today_end, srs_level__gt=0)),
+        due_this_week=Count('id', filter=Q(next_review_date__lte=week_end, srs_level__gt=0)),
+        # Count by learning status
+        total_learning=Count('id', filter=Q(srs_level__in=[1, 2, 3, 4])),
+        total_mastered=Count('id', filter=Q(srs_level__gte=5)),
+    )
 
-    due_today = WordProgress.objects.filter(
-        user=user,
-        next_review_date__lte=today_end,
-        srs_level__gt=0
-    ).count()
 
-    due_this_week = WordProgress.objects.filter(
-        user=user,
-        next_review_date__lte=week_end,
-        srs_level__gt=0
-    ).count()
+def get_upcoming_reviews(user, days: int = 7) -> List[dict]:
+    """
+    Get a per-day histogram of scheduled reviews
 
-    # Count by learning status
-    total_learning = WordProgress.objects.filter(
-        user=user,
-        srs_level__in=[1, 2, 3, 4]
-    ).count()
+    Buckets next_review_date by calendar day with a single GROUP BY query.
+
+    Args:
+        user: User instance
+        days: Horizon in days, starting today
 
-    total_mastered = WordProgress.objects.filter(
+    Returns:
+        List of {"date", "count"} dicts, one per day (zero-filled)
+    """
+    start = timezone.now().date()
+    end = start + timedelta(days=days - 1)
+
+    buckets = WordProgress.objects.filter(
         user=user,
-        srs_level__gte=5
-    ).count()
+        next_review_date__date__gte=start,
+        next_review_date__date__lte=end
+    ).annotate(
+        review_date=TruncDate('next_review_date')
+    ).values('review_date').annotate(
+        count=Count('id')
+    ).order_by()
 
-    return {
-        'due_now': due_now,
-        'due_today': due_today,
-        'due_this_week': due_this_week,
-        'total_learning': total_learning,
-        'total_mastered': total_mastered
-    }
+    counts = {row['review_date']: row['count'] for row in buckets}
+
+    upcoming_reviews = []
+    for i in range(days):
+        date = start + timedelta(days=i)
+        upcoming_reviews.append({
+            'date': date.isoformat(),
+            'count': counts.get(date, 0)
+        })
+    return upcoming_reviews
 
 
-def get_srs_stats(user) -> dict:
+def get_srs_stats(user, upcoming_days: int = 7) -> dict:
     """
     Get detailed SRS statistics for a user
 
+    Uses one aggregate over WordProgress, review totals from the daily
+    rollups (see review_rollups) and one date-bucketed query for the
+    upcoming reviews histogram.
+
     Args:
         user: User instance
+        upcoming_days: Horizon of the upcoming reviews histogram
 
     Returns:
         Dictionary with SRS statistics
     """
-    # Count by SRS level
-    by_srs_level = {}
-    for level in range(9):  # 0-8
-        count = WordProgress.objects.filter(
-            user=user,
-            srs_level=level
-        ).count()
-        by_srs_level[str(level)] = count
-
-    # Calculate retention rate
-    total_reviews = ReviewHistory.objects.filter(user=user).count()
-    correct_reviews = ReviewHistory.objects.filter(
-        user=user,
-        quality__gte=3
-    ).count()
+    # Count by SRS level (0-8), total words and total review count
+    word_stats = WordProgress.objects.filter(user=user).aggregate(
+        total_words=Count('id'),
+        total_review_count=Sum('total_reviews'),
+        **{
+            f'level_{level}': Count('id', filter=Q(srs_level=level))
+            for level in range(9)
+        }
+    )
+    by_srs_level = {str(level): word_stats[f'level_{level}'] for level in range(9)}
+
+    # Calculate retention rate (daily rollups + today's raw history)
+    review_totals = get_review_totals(user)
+    total_reviews = review_totals['reviews']
+    correct_reviews = review_totals['correct_reviews']
 
     retention_rate = round(correct_reviews / total_reviews, 2) if total_reviews > 0 else 0.0
+    avg_review_time_seconds = (
+        round(review_totals['total_review_time_seconds'] / total_reviews, 1)
+        if total_reviews > 0 else 0.0
+    )
 
     # Average reviews per word
-    total_words = WordProgress.objects.filter(user=user).count()
-    total_review_count = sum(
-        wp.total_reviews for wp in WordProgress.objects.filter(user=user)
-    )
+    total_words = word_stats['total_words']
+    total_review_count = word_stats['total_review_count'] or 0
     avg_reviews_per_word = round(total_review_count / total_words, 1) if total_words > 0 else 0
 
-    # Streak days from user progress
-    streak_days = user.progress.streak_days
-
-    # Upcoming reviews (next 7 days)
-    upcoming_reviews = []
-    for i in range(7):
-        date = (timezone.now() + timedelta(days=i)).date()
-        count = WordProgress.objects.filter(
-            user=user,
-            next_review_date__date=date
-        ).count()
-        upcoming_reviews.append({
-            'date': date.isoformat(),
-            'count': count
-        })
+    # Streak days from user progress (plus today's activity)
+    streak_days = current_streak(user.progress)
 
     return {
         'total_words': total_words,
         'by_srs_level': by_srs_level,
         'retention_rate': retention_rate,
+        'avg_review_time_seconds': avg_review_time_seconds,
         'avg_reviews_per_word': avg_reviews_per_word,
         'streak_days': streak_days,
-        'upcoming_reviews': upcoming_reviews
+        'upcoming_reviews': get_upcoming_reviews(user, days=upcoming_days)
     }
 
 
@@ -244,10 +361,80 @@ def initialize_word_progress(user, word) -> WordProgress:
             'next_review_date': None
         }
     )
+    if created:
+        apply_srs_changes(user.id, [(None, srs_state(progress))])
     return progress
 
 
-def get_mistakes_batch(user, batch_size: int = 20, hsk_level: int = None) -> List[WordProgress]:
+def mark_word_learned(user, word) -> WordProgress:
+    """
+    Introduce a new word into SRS (Step 2): level 1, due immediately
+
+    Args:
+        user: User instance
+        word: Word instance
+
+    Returns:
+        Updated WordProgress instance
+    """
+    return mark_words_learned(user, [word.id])[0]
+
+
+def mark_words_learned(user, word_ids: List[int]) -> List[WordProgress]:
+    """
+    Introduce new words into SRS (Step 2): level 1, due immediately
+
+    Missing WordProgress rows are created with one bulk insert and all
+    rows are updated with one bulk_update, whatever the number of words.
+    Unknown word IDs are skipped.
+
+    Args:
+        user: User instance
+        word_ids: Word IDs
+
+    Returns:
+        Updated WordProgress instances
+    """
+    word_ids = list(Word.objects.filter(id__in=set(word_ids)).order_by().values_list('id', flat=True))
+    if not word_ids:
+        return []
+
+    now = timezone.now()
+    with transaction.atomic():
+        progress_by_word = {
+            wp.word_id: wp
+            for wp in WordProgress.objects.filter(user=user, word_id__in=word_ids)
+        }
+        before_states = {word_id: srs_state(wp) for word_id, wp in progress_by_word.items()}
+        missing = [word_id for word_id in word_ids if word_id not in progress_by_word]
+        if missing:
+            WordProgress.objects.bulk_create(
+                [WordProgress(user=user, word_id=word_id) for word_id in missing],
+                ignore_conflicts=True
+            )
+            progress_by_word.update({
+                wp.word_id: wp
+                for wp in WordProgress.objects.filter(user=user, word_id__in=missing)
+            })
+
+        progress_list = list(progress_by_word.values())
+        for progress in progress_list:
+            progress.srs_level = 1
+            progress.next_review_date = now
+            progress.refresh_struggle_score()
+            progress.updated_at = now
+        WordProgress.objects.bulk_update(
+            progress_list, ['srs_level', 'next_review_date', 'struggle_score', 'updated_at']
+        )
+        apply_srs_changes(
+            user.id,
+            [(before_states.get(wp.word_id), srs_state(wp)) for wp in progress_list]
+        )
+    return progress_list
+
+
+def get_mistakes_batch(user, batch_size: int = 20, hsk_level: int = None,
+                       cursor: Tuple[float, int] = None) -> List[WordProgress]:
     """
     Get a batch of words that user struggled with (mistakes review)
 
@@ -256,40 +443,48 @@ def get_mistakes_batch(user, batch_size: int = 20, hsk_level: int = None) -> Lis
     - OR accuracy < 70% (struggled with this word)
     - Has been reviewed at least once
 
+    This is precomputed in WordProgress.struggle_score (> 0 for mistakes),
+    so the batch is a top-k read of the wp_struggle_idx index, hardest
+    words first.
+
     Args:
         user: User instance
         batch_size: Number of words to return
         hsk_level: Optional HSK level filter
+        cursor: (struggle_score, id) of the last word of the previous
+            batch (keyset pagination, see mistakes_cursor)
 
     Returns:
         List of WordProgress instances
     """
-    from django.db.models import F, ExpressionWrapper, FloatField
-
-    # Get words with low SRS level (0, 1, 2) that have been reviewed
-    low_level_words = WordProgress.objects.filter(
+    queryset = WordProgress.objects.filter(
         user=user,
-        srs_level__in=[0, 1, 2],
-        total_reviews__gte=1
-    ).select_related('word')
+        struggle_score__gt=0
+    ).select_related('word').order_by('-struggle_score', 'id')
 
-    # Get words with poor accuracy (< 70%)
-    poor_accuracy_words = WordProgress.objects.filter(
-        user=user,
-        total_reviews__gte=1
-    ).annotate(
-        accuracy=ExpressionWrapper(
-            F('correct_reviews') * 1.0 / F('total_reviews'),
-            output_field=FloatField()
+    if cursor is not None:
+        score, last_id = cursor
+        queryset = queryset.filter(
+            Q(struggle_score__lt=score) | Q(struggle_score=score, id__gt=last_id)
         )
-    ).filter(
-        accuracy__lt=0.7
-    ).select_related('word')
-
-    # Combine both querysets and remove duplicates
-    all_mistakes = (low_level_words | poor_accuracy_words).order_by('srs_level', '-total_reviews')
 
     if hsk_level is not None:
-        all_mistakes = all_mistakes.filter(word__hsk_level=hsk_level)
+        queryset = queryset.filter(word__hsk_level=hsk_level)
 
-    return list(all_mistakes[:batch_size])
+    return list(queryset[:batch_size])
+
+
+def mistakes_cursor(word_progress: WordProgress) -> str:
+    """Opaque keyset cursor pointing after word_progress"""
+    return f'{word_progress.struggle_score!r}_{word_progress.id}'
+
+
+def parse_mistakes_cursor(value: str) -> Tuple[float, int]:
+    """
+    Parse a cursor built by mistakes_cursor
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    score, last_id = value.rsplit('_', 1)
+    return float(score), int(last_id)
@@ -0,0 +1,212 @@
+"""
+Vectorized SM-2 scheduler simulator
+
+Loads WordProgress state (level, ease, interval, next review date) into
+NumPy arrays and simulates N days of reviews under an accuracy
+assumption. sm2_step() reproduces the transitions of srs.update_srs
+exactly, for whole arrays of cards at once.
+
+Due cards follow the same rule as srs.get_srs_batch: srs_level > 0 and
+next_review_date <= review time. Reviews are assumed to happen at the
+same time of day as the simulation start.
+"""
+from datetime import timedelta
+from typing import Optional, Sequence, Union
+import numpy as np
+from django.utils import timezone
+from vocab.models import WordProgress
+from .schedulers import MIN_EASE_FACTOR, SM2Scheduler, get_user_scheduler
+
+# Quality ratings used by Step 1 answers (see submit_step_1)
+CORRECT_QUALITY = 4
+INCORRECT_QUALITY = 1
+
+SECONDS_PER_DAY = 86400.0
+
+
+class SRSState:
+    """
+    Array-backed SRS state for a set of cards
+
+    next_due is measured in days relative to the simulation start
+    (negative = overdue, NaN = never scheduled).
+    """
+
+    def __init__(self, level, ease, interval, next_due):
+        self.level = np.asarray(level, dtype=np.int64)
+        self.ease = np.asarray(ease, dtype=np.float64)
+        self.interval = np.asarray(interval, dtype=np.int64)
+        self.next_due = np.asarray(next_due, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.level)
+
+    def copy(self) -> 'SRSState':
+        return SRSState(self.level.copy(), self.ease.copy(),
+                        self.interval.copy(), self.next_due.copy())
+
+
+def load_state(queryset, now=None) -> SRSState:
+    """
+    Load WordProgress rows into arrays
+
+    Args:
+        queryset: WordProgress queryset (one user or a whole cohort)
+        now: Simulation start (defaults to timezone.now())
+
+    Returns:
+        SRSState with one entry per row
+    """
+    if now is None:
+        now = timezone.now()
+
+    rows = list(queryset.values_list('srs_level', 'ease_factor', 'interval_days', 'next_review_date'))
+    next_due = [
+        (next_date - now).total_seconds() / SECONDS_PER_DAY if next_date else np.nan
+        for _, _, _, next_date in rows
+    ]
+    return SRSState(
+        [row[0] for row in rows],
+        [row[1] for row in rows],
+        [row[2] for row in rows],
+        next_due
+    )
+
+
+def sm2_step(level: np.ndarray, ease: np.ndarray, interval: np.ndarray,
+             quality: np.ndarray):
+    """
+    Apply one SM-2 review to every card (vectorized update_srs)
+
+    Args:
+        level: Current srs_level per card
+        ease: Current ease_factor per card
+        interval: Current interval_days per card
+        quality: Quality rating (0-5) per card
+
+    Returns:
+        (new_level, new_ease, new_interval) arrays
+    """
+    quality = np.asarray(quality, dtype=np.int64)
+    success = quality >= 3
+
+    # Failure: reset to beginning, decrease ease factor
+    fail_ease = np.maximum(MIN_EASE_FACTOR, ease - 0.2)
+
+    # Success: EF' = EF + (0.1 - (5 - q) * (0.08 + (5 - q) * 0.02))
+    q_gap = 5 - quality
+    success_ease = np.maximum(MIN_EASE_FACTOR, ease + (0.1 - q_gap * (0.08 + q_gap * 0.02)))
+    success_level = level + 1
+    # np.round rounds half to even, like Python's round()
+    success_interval = np.where(
+        success_level == 1, 1,
+        np.where(success_level == 2, 6, np.round(interval * success_ease).astype(np.int64))
+    )
+
+    new_level = np.where(success, success_level, 0)
+    new_ease = np.where(success, success_ease, fail_ease)
+    new_interval = np.where(success, success_interval, 1)
+    return new_level, new_ease, new_interval
+
+
+def _accuracy_per_card(accuracy: Union[float, Sequence[float]], level: np.ndarray) -> np.ndarray:
+    """Scalar accuracy, or one value per srs_level (last value used for higher levels)"""
+    if np.isscalar(accuracy):
+        return np.full(level.shape, float(accuracy))
+    by_level = np.asarray(accuracy, dtype=np.float64)
+    return by_level[np.minimum(level, len(by_level) - 1)]
+
+
+def simulate(state: SRSState, days: int = 30,
+             accuracy: Union[float, Sequence[float]] = 0.85,
+             daily_limit: Optional[int] = None,
+             correct_quality: int = CORRECT_QUALITY,
+             incorrect_quality: int = INCORRECT_QUALITY,
+             seed: Optional[int] = None) -> dict:
+    """
+    Simulate daily reviews and return the projected workload
+
+    Args:
+        state: Initial SRSState (not modified)
+        days: Number of days to simulate, starting today
+        accuracy: Probability of a correct answer, scalar or per srs_level
+        daily_limit: Maximum reviews per day (most overdue first, then
+            lowest ease, as in get_srs_batch); None for no limit
+        correct_quality: Quality given to correct answers
+        incorrect_quality: Quality given to incorrect answers
+        seed: Random seed for reproducible forecasts
+
+    Returns:
+        Dictionary with per-day reviews/correct counts and the final
+        distribution of cards by srs_level
+    """
+    rng = np.random.default_rng(seed)
+    state = state.copy()
+
+    reviews = np.zeros(days, dtype=np.int64)
+    correct = np.zeros(days, dtype=np.int64)
+
+    for day in range(days):
+        # NaN next_due compares False, so unscheduled cards are never due
+        due = np.flatnonzero((state.level > 0) & (state.next_due <= day))
+        if daily_limit is not None and len(due) > daily_limit:
+            order = np.lexsort((state.ease[due], state.next_due[due]))
+            due = due[order[:daily_limit]]
+        if len(due) == 0:
+            continue
+
+        is_correct = rng.random(len(due)) < _accuracy_per_card(accuracy, state.level[due])
+        quality = np.where(is_correct, correct_quality, incorrect_quality)
+
+        level, ease, interval = sm2_step(
+            state.level[due], state.ease[due], state.interval[due], quality
+        )
+        state.level[due] = level
+        state.ease[due] = ease
+        state.interval[due] = interval
+        state.next_due[due] = day + interval
+
+        reviews[day] = len(due)
+        correct[day] = int(is_correct.sum())
+
+    start = timezone.now().date()
+    levels, counts = np.unique(state.level, return_counts=True)
+    return {
+        'days': [
+            {
+                'date': (start + timedelta(days=day)).isoformat(),
+                'reviews': int(reviews[day]),
+                'correct': int(correct[day])
+            }
+            for day in range(days)
+        ],
+        'total_reviews': int(reviews.sum()),
+        'peak_reviews': int(reviews.max()) if days else 0,
+        'final_by_srs_level': {str(int(lvl)): int(cnt) for lvl, cnt in zip(levels, counts)}
+    }
+
+
+def forecast_user(user, days: int = 30, accuracy: Union[float, Sequence[float]] = 0.85,
+                  daily_limit: Optional[int] = None, seed: Optional[int] = None) -> dict:
+    """
+    Forecast a user's review workload from their current WordProgress
+
+    Args:
+        user: User instance
+        days: Number of days to simulate
+        accuracy: Probability of a correct answer, scalar or per srs_level
+        daily_limit: Maximum reviews per day
+        seed: Random seed
+
+    Returns:
+        See simulate()
+
+    Raises:
+        ValueError: If the user is not on the SM-2 scheduler (the only
+            one simulated here)
+    """
+    if get_user_scheduler(user).name != SM2Scheduler.name:
+        raise ValueError('Forecasts are only available for the SM-2 scheduler')
+
+    state = load_state(WordProgress.objects.filter(user=user))
+    return simulate(state, days=days, accuracy=accuracy, daily_limit=daily_limit, seed=seed)
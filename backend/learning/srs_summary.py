@@ -0,0 +1,182 @@
+"""
+Materialized per-user SRS counters (UserSRSSummary)
+
+The main screen reads due/learning/mastered counts from a single summary
+row instead of counting WordProgress. Writers report SRS state changes
+through apply_srs_changes(); rebuild_summary() recomputes the row from
+WordProgress (used on first access and by the rebuild_srs_summaries
+management command for reconciliation).
+
+Due dates are bucketed by hour, so "due now" may include words that
+become due later within the current hour.
+"""
+from datetime import datetime, timedelta
+from typing import Iterable, Optional, Tuple
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+from vocab.models import WordProgress, UserSRSSummary
+from .caching import invalidate_main_screen
+
+# (srs_level, due bucket key or None) - the part of WordProgress the summary tracks
+SRSState = Tuple[int, Optional[str]]
+
+BUCKET_FORMAT = '%Y-%m-%dT%H'
+
+
+def _bucket_key(dt: datetime) -> str:
+    """Hour bucket key for a due date"""
+    return timezone.localtime(dt).strftime(BUCKET_FORMAT)
+
+
+def srs_state(word_progress: WordProgress) -> SRSState:
+    """
+    Snapshot the summary-relevant state of a WordProgress
+
+    Words at level 0 are never "due" (see get_due_count), so they have
+    no due bucket.
+    """
+    bucket = None
+    if word_progress.srs_level > 0 and word_progress.next_review_date:
+        bucket = _bucket_key(word_progress.next_review_date)
+    return (word_progress.srs_level, bucket)
+
+
+def _add(counter: dict, key: str, delta: int):
+    value = counter.get(key, 0) + delta
+    if value:
+        counter[key] = value
+    else:
+        counter.pop(key, None)
+
+
+def apply_srs_changes(user_id, transitions: Iterable[Tuple[Optional[SRSState], SRSState]],
+                      reviews: int = 0, correct: int = 0):
+    """
+    Incrementally update a user's summary row
+
+    Args:
+        user_id: User primary key
+        transitions: (before, after) state pairs; before is None for new words
+        reviews: Number of reviews to add to the totals
+        correct: Number of correct reviews to add to the totals
+
+    If the user has no summary row yet, nothing is written - it is built
+    from WordProgress on first read.
+    """
+    # Due counts on the main screen snapshot are now stale
+    invalidate_main_screen(user_id)
+
+    with transaction.atomic():
+        summary = UserSRSSummary.objects.select_for_update().filter(user_id=user_id).first()
+        if summary is None:
+            return
+
+        for before, after in transitions:
+            if before is not None:
+                _add(summary.level_counts, str(before[0]), -1)
+                if before[1]:
+                    _add(summary.due_histogram, before[1], -1)
+            _add(summary.level_counts, str(after[0]), 1)
+            if after[1]:
+                _add(summary.due_histogram, after[1], 1)
+
+        summary.total_reviews += reviews
+        summary.correct_reviews += correct
+        summary.save(update_fields=[
+            'level_counts', 'due_histogram', 'total_reviews', 'correct_reviews', 'updated_at'
+        ])
+
+
+def rebuild_summary(user) -> UserSRSSummary:
+    """
+    Recompute a user's summary row from WordProgress
+
+    Args:
+        user: User instance
+
+    Returns:
+        Saved UserSRSSummary instance
+    """
+    progress = WordProgress.objects.filter(user=user)
+
+    with transaction.atomic():
+        # Take the row lock apply_srs_changes() uses before counting, so a
+        # concurrent review waits for the rebuilt row instead of being
+        # overwritten. get_or_create() re-reads the row if a concurrent
+        # first access inserted it first.
+        summary, _ = UserSRSSummary.objects.select_for_update().get_or_create(user=user)
+
+        summary.level_counts = {
+            str(row['srs_level']): row['count']
+            for row in progress.values('srs_level').annotate(count=Count('id')).order_by()
+        }
+
+        summary.due_histogram = {
+            row['bucket'].strftime(BUCKET_FORMAT): row['count']
+            for row in progress.filter(
+                srs_level__gt=0,
+                next_review_date__isnull=False
+            ).annotate(
+                bucket=TruncHour('next_review_date')
+            ).values('bucket').annotate(count=Count('id')).order_by()
+        }
+
+        totals = progress.aggregate(
+            total_reviews=Sum('total_reviews'),
+            correct_reviews=Sum('correct_reviews'),
+        )
+        summary.total_reviews = totals['total_reviews'] or 0
+        summary.correct_reviews = totals['correct_reviews'] or 0
+        summary.rebuilt_at = timezone.now()
+        summary.save()
+
+    invalidate_main_screen(user.id)
+    return summary
+
+
+def get_summary(user) -> UserSRSSummary:
+    """Get the user's summary row, building it on first access"""
+    summary = UserSRSSummary.objects.filter(user=user).first()
+    if summary is None:
+        summary = rebuild_summary(user)
+    return summary
+
+
+def get_summary_due_count(user) -> dict:
+    """
+    Same shape as srs.get_due_count, read from the summary row
+
+    Args:
+        user: User instance
+
+    Returns:
+        Dictionary with due count statistics
+    """
+    summary = get_summary(user)
+
+    now = timezone.now()
+    now_key = _bucket_key(now)
+    today_key = _bucket_key(now.replace(hour=23, minute=59, second=59))
+    week_key = _bucket_key(now + timedelta(days=7))
+
+    due_now = due_today = due_this_week = 0
+    for key, count in summary.due_histogram.items():
+        if key <= now_key:
+            due_now += count
+        if key <= today_key:
+            due_today += count
+        if key <= week_key:
+            due_this_week += count
+
+    level_counts = summary.level_counts
+    return {
+        'due_now': due_now,
+        'due_today': due_today,
+        'due_this_week': due_this_week,
+        'total_learning': sum(level_counts.get(str(level), 0) for level in (1, 2, 3, 4)),
+        'total_mastered': sum(
+            count for level, count in level_counts.items() if int(level) >= 5
+        ),
+    }
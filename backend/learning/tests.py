@@ -0,0 +1,861 @@
+import random
+import re
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from io import StringIO
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.core.cache import cache
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from django.utils import timezone
+
+from core.leaderboard import rebuild_all, weekly_board
+from core.ledger import award_xp, compute_streaks, current_streak
+from core.models import UserCourseProgress, UserProfile, XPLedgerEntry
+from course.models import Course, CourseDay
+from vocab.models import (
+    GrammarRule, ReviewDailyRollup, ReviewHistory, ReviewRollupWatermark, UserSRSSummary, Word, WordProgress
+)
+from vocab.partitions import create_month_partition, default_partition_months, is_partitioned, partition_name
+from .content import get_content_bundle, invalidate_content
+from .distractors import get_word_pool, invalidate_word_pool
+from .models import Dialogue, LearningPlan, LearningSession
+from .review_rollups import get_review_totals, rollup_reviews
+from .srs import _apply_review, get_due_count, get_mistakes_batch, get_srs_batch, update_srs_batch
+from .srs_summary import rebuild_summary
+from .schedulers import CardState, evaluate_schedulers, get_scheduler
+from .srs_simulator import SRSState, simulate, sm2_step
+
+
+class SM2SimulatorParityTests(SimpleTestCase):
+    """sm2_step must reproduce update_srs transitions exactly"""
+
+    def test_sm2_step_matches_update_srs(self):
+        rng = random.Random(42)
+        cards = []
+        for _ in range(5000):
+            cards.append((
+                rng.randint(0, 8),
+                round(rng.uniform(1.3, 3.0), rng.randint(1, 4)),
+                rng.randint(0, 400),
+                rng.randint(0, 5),
+            ))
+
+        level, ease, interval, quality = (np.array(column) for column in zip(*cards))
+        new_level, new_ease, new_interval = sm2_step(level, ease, interval, quality)
+
+        for i, (srs_level, ease_factor, interval_days, q) in enumerate(cards):
+            word_progress = WordProgress(
+                srs_level=srs_level, ease_factor=ease_factor, interval_days=interval_days
+            )
+            _apply_review(word_progress, q)
+
+            self.assertEqual(word_progress.srs_level, new_level[i])
+            self.assertEqual(word_progress.ease_factor, new_ease[i])
+            self.assertEqual(word_progress.interval_days, new_interval[i])
+
+    def test_simulate_replays_transitions_day_by_day(self):
+        state = SRSState(level=[1, 2, 0], ease=[2.5, 2.5, 2.5], interval=[1, 6, 0],
+                         next_due=[0.0, 3.0, np.nan])
+
+        forecast = simulate(state, days=10, accuracy=1.0, seed=0)
+        reviews = [day['reviews'] for day in forecast['days']]
+
+        # Card 1: due day 0 -> level 2 (6 days) -> due day 6
+        # Card 2: due day 3 -> level 3 (round(6 * 2.6) = 16 days)
+        # Card 3: level 0 is never due
+        self.assertEqual(reviews, [1, 0, 0, 1, 0, 0, 1, 0, 0, 0])
+        self.assertEqual(forecast['final_by_srs_level'], {'0': 1, '3': 2})
+
+
+class SRSForecastTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='forecaster', email='forecaster@example.com', password='password'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('learning:srs-forecast')
+
+    def test_forecast_refuses_schedulers_other_than_sm2(self):
+        self.assertEqual(self.client.get(self.url, {'days': 7}).status_code, 200)
+
+        self.user.profile.srs_algorithm = 'fsrs'
+        self.user.profile.save()
+        response = self.client.get(self.url, {'days': 7})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('SM-2', response.json()['error'])
+
+    def test_forecast_rejects_daily_limit_below_one(self):
+        for daily_limit in (0, -5):
+            response = self.client.get(self.url, {'daily_limit': daily_limit})
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'daily_limit': 1}).status_code, 200)
+
+
+class SchedulerTests(SimpleTestCase):
+
+    def test_fsrs_grows_intervals_on_success_and_resets_on_failure(self):
+        fsrs = get_scheduler('fsrs')
+
+        state = fsrs.next_state(CardState(), 4, None)
+        self.assertEqual(state.srs_level, 1)
+        first_interval = state.interval_days
+
+        state = fsrs.next_state(state, 4, float(state.interval_days))
+        self.assertEqual(state.srs_level, 2)
+        self.assertGreater(state.interval_days, first_interval)
+
+        lapsed = fsrs.next_state(state, 1, float(state.interval_days))
+        self.assertEqual(lapsed.srs_level, 0)
+        self.assertLess(lapsed.stability, state.stability)
+
+    def test_evaluator_scores_every_scheduler(self):
+        start = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+        reviews = [
+            (1, 10, 4, start),
+            (1, 10, 4, start + timedelta(days=1)),
+            (1, 10, 1, start + timedelta(days=30)),
+            (1, 11, 5, start),
+            (1, 11, 4, start + timedelta(days=2)),
+        ]
+
+        results = evaluate_schedulers(reviews)
+
+        self.assertEqual(set(results), {'sm2', 'fsrs'})
+        for stats in results.values():
+            self.assertEqual(stats['reviews'], 3)
+            self.assertEqual(stats['actual_recall'], round(2 / 3, 4))
+
+
+class QueueIndexTests(TestCase):
+    """Due-queue queries must be served by the WordProgress indexes"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='learner', email='learner@example.com', password='password'
+        )
+        if connection.vendor == 'postgresql':
+            # Tiny test tables would otherwise always be sequentially scanned
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+
+    def assertQueriesUseIndex(self, index_name, func, *args, **kwargs):
+        with CaptureQueriesContext(connection) as context:
+            func(*args, **kwargs)
+
+        prefix = connection.ops.explain_query_prefix()
+        plans = []
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                cursor.execute(f"{prefix} {query['sql']}")
+                plans.append(' '.join(str(part) for row in cursor.fetchall() for part in row))
+
+        self.assertTrue(
+            any(index_name in plan for plan in plans),
+            f'{index_name} not used:\n' + '\n'.join(plans)
+        )
+
+    def test_srs_batch_uses_due_queue_index(self):
+        self.assertQueriesUseIndex('wp_due_queue_idx', get_srs_batch, self.user)
+
+    def test_mistakes_batch_uses_struggle_index(self):
+        self.assertQueriesUseIndex('wp_struggle_idx', get_mistakes_batch, self.user)
+
+    def test_due_count_uses_user_level_index(self):
+        self.assertQueriesUseIndex('wp_user_level_idx', get_due_count, self.user)
+
+
+class ReviewRollupTests(TestCase):
+
+    def test_totals_combine_rollups_with_recent_history(self):
+        user = get_user_model().objects.create_user(
+            username='learner', email='learner@example.com', password='password'
+        )
+        word = Word.objects.create(hanzi='你好', pinyin='nǐ hǎo', translation_ru='привет', hsk_level=1)
+        now = timezone.now()
+        for days_ago, quality in [(3, 4), (3, 1), (2, 5), (0, 4)]:
+            ReviewHistory.objects.create(
+                user=user, word=word, quality=quality, old_srs_level=0, new_srs_level=1,
+                old_interval=0, new_interval=1, old_ease_factor=2.5, new_ease_factor=2.5,
+                review_time_seconds=10, reviewed_at=now - timedelta(days=days_ago)
+            )
+
+        expected = {'reviews': 4, 'correct_reviews': 3, 'total_review_time_seconds': 40}
+        self.assertEqual(get_review_totals(user), expected)
+
+        today = timezone.localdate()
+        self.assertEqual(rollup_reviews(today - timedelta(days=5), today - timedelta(days=1)), 2)
+        self.assertEqual(get_review_totals(user), expected)
+        with self.assertRaises(ValueError):
+            rollup_reviews(today, today)
+
+    def test_totals_include_history_older_than_first_rollup(self):
+        user = get_user_model().objects.create_user(
+            username='veteran', email='veteran@example.com', password='password'
+        )
+        word = Word.objects.create(hanzi='谢谢', pinyin='xièxie', translation_ru='спасибо', hsk_level=1)
+        now = timezone.now()
+        for days_ago, quality in [(40, 5), (30, 2), (2, 4), (1, 5), (0, 3)]:
+            ReviewHistory.objects.create(
+                user=user, word=word, quality=quality, old_srs_level=0, new_srs_level=1,
+                old_interval=0, new_interval=1, old_ease_factor=2.5, new_ease_factor=2.5,
+                review_time_seconds=5, reviewed_at=now - timedelta(days=days_ago)
+            )
+
+        # The first nightly run only rolls up the last few days
+        today = timezone.localdate()
+        rollup_reviews(today - timedelta(days=3), today - timedelta(days=1))
+        self.assertEqual(
+            get_review_totals(user),
+            {'reviews': 5, 'correct_reviews': 4, 'total_review_time_seconds': 25}
+        )
+        self.assertEqual(get_review_totals(user, since=today - timedelta(days=35))['reviews'], 4)
+
+    def test_skipped_rollup_day_is_read_from_history_and_caught_up(self):
+        user = get_user_model().objects.create_user(
+            username='nightly', email='nightly@example.com', password='password'
+        )
+        word = Word.objects.create(hanzi='再见', pinyin='zàijiàn', translation_ru='до свидания', hsk_level=1)
+        now = timezone.now()
+        for days_ago in [3, 2, 1, 0]:
+            ReviewHistory.objects.create(
+                user=user, word=word, quality=4, old_srs_level=0, new_srs_level=1,
+                old_interval=0, new_interval=1, old_ease_factor=2.5, new_ease_factor=2.5,
+                review_time_seconds=10, reviewed_at=now - timedelta(days=days_ago)
+            )
+        expected = {'reviews': 4, 'correct_reviews': 4, 'total_review_time_seconds': 40}
+        today = timezone.localdate()
+
+        # Two nightly runs with the run for 2 days ago missing in between
+        rollup_reviews(today - timedelta(days=3), today - timedelta(days=3))
+        rollup_reviews(today - timedelta(days=1), today - timedelta(days=1))
+        watermark = ReviewRollupWatermark.objects.get(user=user)
+        self.assertEqual(watermark.rolled_up_through, today - timedelta(days=3))
+        self.assertEqual(get_review_totals(user), expected)
+
+        # The default run catches up from the watermark
+        call_command('rollup_review_history', stdout=StringIO())
+        watermark.refresh_from_db()
+        self.assertEqual(watermark.rolled_up_through, today - timedelta(days=1))
+        self.assertEqual(ReviewDailyRollup.objects.filter(user=user).count(), 3)
+        self.assertEqual(get_review_totals(user), expected)
+
+
+class ReviewPartitionTests(TestCase):
+
+    def setUp(self):
+        if not is_partitioned(connection):
+            self.skipTest('ReviewHistory is only partitioned on PostgreSQL')
+
+    def test_month_in_default_partition_gets_its_own_partition(self):
+        user = get_user_model().objects.create_user(
+            username='timetraveller', email='timetraveller@example.com', password='password'
+        )
+        word = Word.objects.create(hanzi='未来', pinyin='wèilái', translation_ru='будущее', hsk_level=1)
+        # Past the partitions created ahead of time: lands in DEFAULT
+        month = date(2099, 1, 1)
+        review = ReviewHistory.objects.create(
+            user=user, word=word, quality=4, old_srs_level=0, new_srs_level=1,
+            old_interval=0, new_interval=1, old_ease_factor=2.5, new_ease_factor=2.5,
+            review_time_seconds=5, reviewed_at=datetime(2099, 1, 15, tzinfo=dt_timezone.utc)
+        )
+        self.assertEqual(default_partition_months(connection), [month])
+
+        self.assertTrue(create_month_partition(connection, month))
+        self.assertEqual(default_partition_months(connection), [])
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT id FROM {partition_name(month)}')
+            self.assertEqual([row[0] for row in cursor.fetchall()], [review.id])
+
+
+class MainScreenCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            username='learner', email='learner@example.com', password='password'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('learning:main-screen')
+
+    def test_steady_state_is_served_from_cache_with_etag(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        etag = first['ETag']
+
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(second.json(), first.json())
+
+        with self.assertNumQueries(0):
+            not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_progress_change_invalidates_snapshot(self):
+        etag = self.client.get(self.url)['ETag']
+
+        UserCourseProgress.objects.filter(user=self.user).update(total_xp=50)
+        self.user.progress.refresh_from_db()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.progress.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['xp_total'], 50)
+
+    def test_xp_award_invalidates_snapshot(self):
+        etag = self.client.get(self.url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            award_xp(self.user.id, 20, 'review')
+        self.user.progress.refresh_from_db()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['xp_total'], 20)
+        self.assertEqual(response.json()['streak_days'], 1)
+
+
+class ContentBundleTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        invalidate_content()
+        course = Course.objects.create(title='HSK 1', hsk_level=1)
+        self.course_day = CourseDay.objects.create(course=course, day_number=1, title='Day 1')
+        self.word = Word.objects.create(hanzi='你好', pinyin='nǐ hǎo', translation_ru='привет', hsk_level=1)
+        self.course_day.new_words.add(self.word)
+
+    def test_bundle_is_cached_until_content_changes(self):
+        bundle = get_content_bundle(self.course_day.id, 'A')
+        self.assertEqual([word['id'] for word in bundle['new_words']], [self.word.id])
+        self.assertIsNone(bundle['dialogue'])
+
+        with self.assertNumQueries(0):
+            self.assertIs(get_content_bundle(self.course_day.id, 'A'), bundle)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Dialogue.objects.create(
+                course_day=self.course_day, session_type='A', question_hanzi='你好吗？',
+                question_pinyin='nǐ hǎo ma?', question_translation_ru='Как дела?',
+                question_translation_kz='Қалайсың?', explanation_ru='Ответ'
+            )
+
+        bundle = get_content_bundle(self.course_day.id, 'A')
+        self.assertEqual(bundle['dialogue']['question_hanzi'], '你好吗？')
+        self.assertEqual(bundle['answers']['dialogue']['explanation_ru'], 'Ответ')
+
+
+class LearningSessionTestMixin:
+    """A learner with a course day of 12 HSK 1 words (3 new) and a session A"""
+
+    def setUp(self):
+        cache.clear()
+        invalidate_content()
+        self.user = get_user_model().objects.create_user(
+            username='learner', email='learner@example.com', password='password'
+        )
+        course = Course.objects.create(title='HSK 1', hsk_level=1)
+        course_day = CourseDay.objects.create(course=course, day_number=1, title='Day 1')
+        words = [
+            Word.objects.create(hanzi=f'字{i}', pinyin=f'zi{i}', translation_ru=f'слово {i}', hsk_level=1)
+            for i in range(12)
+        ]
+        course_day.new_words.add(*words[:3])
+        self.session = LearningSession.objects.create(
+            user=self.user, course_day=course_day, session_type='A'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('learning:session-bundle', args=[self.session.id])
+
+
+class SessionBundleTests(LearningSessionTestMixin, TestCase):
+
+    def test_bundle_returns_all_steps_with_fixed_queries_and_etag(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        steps = first.json()['steps']
+        self.assertEqual([step['step'] for step in steps], [1, 2, 3, 4, 5])
+        self.assertEqual(steps[0]['data']['total_cards'], 10)
+        self.assertEqual(steps[1]['data']['total_words'], 3)
+
+        # Session (+ course day), lessons, due words, deck, learning plan, progress upsert
+        with self.assertNumQueries(6):
+            second = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 304)
+
+        compressed = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+
+
+class LearningPlanTests(LearningSessionTestMixin, TestCase):
+
+    def test_step_2_reads_plan_and_learning_advances_it(self):
+        self.session.current_step = 2
+        self.session.save()
+        step = self.client.get(reverse('learning:get-step-data', args=[self.session.id])).json()
+        word_ids = [word['id'] for word in step['data']['words']]
+        self.assertEqual(len(word_ids), 3)
+        plan = LearningPlan.objects.get(user=self.user, course_day=self.session.course_day)
+        self.assertEqual(plan.word_ids, word_ids)
+
+        self.client.post(reverse('learning:submit-step-2'), {
+            'session_id': self.session.id,
+            'words': [{'word_id': word_id, 'is_correct': True} for word_id in word_ids[:2]]
+        }, format='json')
+        plan.refresh_from_db()
+        self.assertEqual(plan.word_ids, word_ids[2:])
+
+
+class AnswerBatchTests(LearningSessionTestMixin, TestCase):
+
+    def test_batch_applies_answers_once(self):
+        cards = self.client.get(self.url).json()['steps'][0]['data']['cards']
+        answers = [
+            {'idempotency_key': 'a1', 'step': 1, 'card_id': cards[0]['id'],
+             'selected_option_id': cards[0]['word']['id'], 'time_spent_seconds': 3},
+            {'idempotency_key': 'a2', 'step': 1, 'card_id': cards[1]['id'],
+             'selected_option_id': -1, 'time_spent_seconds': 4},
+        ]
+        url = reverse('learning:submit-answers-batch')
+
+        response = self.client.post(url, {'session_id': self.session.id, 'answers': answers}, format='json')
+        self.assertEqual(response.status_code, 200)
+        delta = response.json()
+        self.assertEqual([r['is_correct'] for r in delta['results']], [True, False])
+        self.assertEqual(delta['session']['total_questions'], 2)
+        self.assertEqual(delta['session']['xp_earned'], 5)
+
+        # Replaying the flush (plus one new answer) applies only the new answer
+        answers.append({'idempotency_key': 'a3', 'step': 3, 'built_sentence_hanzi': ''})
+        replay = self.client.post(url, {'session_id': self.session.id, 'answers': answers}, format='json')
+        results = replay.json()['results']
+        self.assertEqual([r.get('duplicate', False) for r in results], [True, True, False])
+        self.assertEqual(replay.json()['session']['total_questions'], 3)
+
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.problematic_words, [cards[1]['word']['id']])
+        self.assertEqual(self.session.srs_cards.filter(completed_at__isnull=False).count(), 2)
+
+    def test_malformed_batch_is_rejected(self):
+        url = reverse('learning:submit-answers-batch')
+        response = self.client.post(
+            url, {'session_id': self.session.id, 'answers': [{'step': 1}]}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class SessionStateTests(LearningSessionTestMixin, TestCase):
+
+    def test_step_submit_writes_session_with_one_update(self):
+        self.session.current_step = 3
+        self.session.save()
+        url = reverse('learning:submit-step-3')
+        get_content_bundle(self.session.course_day_id, 'A')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                url, {'session_id': self.session.id, 'built_sentence_hanzi': ''}, format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        session_updates = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('UPDATE "learning_learningsession"')
+        ]
+        self.assertEqual(len(session_updates), 1)
+
+        # Timings are stored compactly and still exposed per step
+        data = response.json()['session']
+        self.assertEqual(data['current_step'], 4)
+        self.assertIsNotNone(data['step_3_completed_at'])
+        self.assertIsNone(data['step_4_started_at'])
+        self.session.refresh_from_db()
+        self.assertEqual(len(self.session.step_timings), 3)
+        self.assertIsNotNone(self.session.get_step_completed_at(3))
+
+
+# SQLite test databases fail concurrent write transactions with "database
+# (table) is locked" instead of waiting; these tests need PostgreSQL
+requires_concurrent_writes = skipUnlessDBFeature('has_select_for_update')
+
+
+def run_concurrently(func, count=4):
+    """
+    Call func(index) from count threads released at the same moment
+
+    Each thread uses its own database connection. Returns the results
+    (or raised exceptions) in thread order.
+    """
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def worker(index):
+        try:
+            barrier.wait()
+            results[index] = func(index)
+        except Exception as exc:  # reported to the test
+            results[index] = exc
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class ConcurrentSessionTests(TransactionTestCase):
+    """Parallel start/complete requests against the test database"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            username='racer', email='racer@example.com', password='password'
+        )
+        course = Course.objects.create(title='HSK 1', hsk_level=1)
+        self.course_day = CourseDay.objects.create(course=course, day_number=1, title='Day 1')
+        for i in range(12):
+            Word.objects.create(hanzi=f'字{i}', pinyin=f'zi{i}', translation_ru=f'слово {i}', hsk_level=1)
+
+    def post(self, name, data):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        return client.post(reverse(f'learning:{name}'), data, format='json').status_code
+
+    @requires_concurrent_writes
+    def test_parallel_starts_create_one_session(self):
+        data = {'course_day_id': self.course_day.id, 'session_type': 'A'}
+        results = run_concurrently(lambda index: self.post('start-session', data))
+        self.assertEqual(results, [200] * 4)
+        self.assertEqual(LearningSession.objects.filter(user=self.user).count(), 1)
+
+    @requires_concurrent_writes
+    def test_parallel_completions_advance_day_once(self):
+        sessions = [
+            LearningSession.objects.create(user=self.user, course_day=self.course_day, session_type=session_type)
+            for session_type in ('A', 'B')
+        ]
+        # Double taps on both sessions at once
+        results = run_concurrently(
+            lambda index: self.post('complete-session', {'session_id': sessions[index % 2].id})
+        )
+        self.assertEqual(results, [200] * 4)
+        self.assertEqual(UserCourseProgress.objects.get(user=self.user).current_day, 2)
+
+        # A retry after the fact changes nothing
+        self.assertEqual(self.post('complete-session', {'session_id': sessions[1].id}), 200)
+        self.assertEqual(UserCourseProgress.objects.get(user=self.user).current_day, 2)
+
+    @requires_concurrent_writes
+    def test_parallel_submits_do_not_lose_counts(self):
+        session = LearningSession.objects.create(
+            user=self.user, course_day=self.course_day, session_type='A', current_step=4
+        )
+        results = run_concurrently(
+            lambda index: self.post('submit-step-4', {'session_id': session.id, 'selected_option_index': 0})
+        )
+        self.assertEqual(results, [200] * 4)
+        session.refresh_from_db()
+        self.assertEqual(session.total_questions, 4)
+        self.assertEqual(XPLedgerEntry.objects.filter(user=self.user, source='session').count(), 4)
+
+    @requires_concurrent_writes
+    def test_overlapping_review_batches_apply_every_review(self):
+        words = list(Word.objects.order_by('id')[:3])
+        for word in words:
+            WordProgress.objects.create(user=self.user, word=word, srs_level=1, interval_days=1)
+        rebuild_summary(self.user)
+
+        # Same words, opposite orders: rows must still be locked in one order
+        def submit(index):
+            ordered = words if index % 2 else words[::-1]
+            return len(update_srs_batch(self.user, [
+                {'word_id': word.id, 'quality': 4, 'time_spent_seconds': 5} for word in ordered
+            ]))
+
+        self.assertEqual(run_concurrently(submit), [3] * 4)
+        for word_progress in WordProgress.objects.filter(user=self.user):
+            self.assertEqual(word_progress.total_reviews, 4)
+            self.assertEqual(word_progress.srs_level, 5)
+        self.assertEqual(ReviewHistory.objects.filter(user=self.user).count(), 12)
+
+        # Incremental summary agrees with a full rebuild
+        summary = UserSRSSummary.objects.get(user=self.user)
+        rebuilt = rebuild_summary(self.user)
+        self.assertEqual(summary.level_counts, rebuilt.level_counts)
+        self.assertEqual(summary.due_histogram, rebuilt.due_histogram)
+        self.assertEqual(summary.total_reviews, 12)
+
+    @requires_concurrent_writes
+    def test_parallel_first_reads_build_one_summary(self):
+        results = run_concurrently(lambda index: rebuild_summary(self.user).pk)
+        self.assertEqual(len(set(results)), 1, results)
+        self.assertEqual(UserSRSSummary.objects.filter(user=self.user).count(), 1)
+
+
+class StreakTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='streaker', email='streaker@example.com', password='password'
+        )
+        self.progress = UserCourseProgress.objects.get(user=self.user)
+
+    def study(self, day):
+        XPLedgerEntry.objects.create(user=self.user, amount=10, source='session', date=day)
+
+    def test_daily_job_extends_and_resets_streaks(self):
+        today = timezone.localdate()
+        days = [today - timedelta(days=n) for n in (3, 2, 1)]
+        for day in days:
+            self.study(day)
+        for day in days + days:  # re-running a day changes nothing
+            compute_streaks(day)
+        self.progress.refresh_from_db()
+        self.assertEqual((self.progress.streak_days, self.progress.last_study_date), (3, days[-1]))
+
+        # Today's activity shows before the job has run for today
+        self.assertEqual(current_streak(self.progress), 3)
+        self.study(today)
+        self.assertEqual(current_streak(self.progress), 4)
+
+        # A day without study resets the streak
+        compute_streaks(today)
+        compute_streaks(today + timedelta(days=1))
+        self.progress.refresh_from_db()
+        self.assertEqual(self.progress.streak_days, 0)
+
+
+class LeaderboardTests(TestCase):
+
+    def setUp(self):
+        self.users = []
+        for i, xp in enumerate([30, 50, 10, 0]):
+            user = get_user_model().objects.create_user(
+                username=f'player{i}', email=f'player{i}@example.com', password='password'
+            )
+            user.profile.current_hsk_level = 1 if i < 2 else 2
+            user.profile.save()
+            if xp:
+                award_xp(user.id, xp, 'session')
+            self.users.append(user)
+
+    def test_rebuild_ranks_boards_and_reads_by_index(self):
+        counts = rebuild_all()
+        self.assertEqual(counts['global'], 3)
+        self.assertEqual(counts['hsk:1'], 2)
+        self.assertEqual(counts[weekly_board()], 3)
+
+        client = APIClient()
+        client.force_authenticate(self.users[0])
+        url = reverse('learning:leaderboard')
+        # Page with users, own entry
+        with self.assertNumQueries(2):
+            data = client.get(url, {'limit': 2}).json()
+        self.assertEqual([e['username'] for e in data['entries']], ['player1', 'player0'])
+        self.assertEqual(data['me'], {'rank': 2, 'score': 30})
+
+        data = client.get(url, {'board': 'hsk', 'hsk': 2}).json()
+        self.assertEqual(data['board'], 'hsk:2')
+        self.assertEqual(data['me'], None)
+        self.assertEqual(client.get(url, {'board': 'monthly'}).status_code, 400)
+
+    def test_hsk_board_defaults_to_level_one_without_profile(self):
+        rebuild_all()
+        user = self.users[3]
+        UserProfile.objects.filter(user=user).delete()
+        user = get_user_model().objects.get(pk=user.pk)
+
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get(reverse('learning:leaderboard'), {'board': 'hsk'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['board'], 'hsk:1')
+
+
+class QueryBudgetMixin:
+    """assertBudget(): query count and payload size limits for a request"""
+
+    @staticmethod
+    def _query_shape(sql: str) -> str:
+        # Literals and IN lists vary between runs; group by statement shape
+        shape = re.sub(r"'(?:[^']|'')*'", "'?'", sql)
+        shape = re.sub(r'\b\d+(\.\d+)?\b', '?', shape)
+        return re.sub(r'\(\?(, \?)+\)', '(?, ...)', shape)
+
+    @contextmanager
+    def assertBudget(self, name: str, max_queries: int, max_bytes: int = None):
+        """
+        Fail if the block issues more than max_queries queries, or if the
+        response stored in the yielded dict ("response") is larger than
+        max_bytes
+
+        The failure message lists every query, numbered, followed by the
+        statement shapes that ran more than once (the usual N+1 suspects).
+        """
+        result = {}
+        with CaptureQueriesContext(connection) as context:
+            yield result
+        queries = [query['sql'] for query in context.captured_queries]
+
+        if len(queries) > max_queries:
+            shapes = Counter(self._query_shape(sql) for sql in queries)
+            lines = [f'{name}: {len(queries)} queries, budget {max_queries}']
+            lines += [f'{index:>3}. {sql}' for index, sql in enumerate(queries, start=1)]
+            repeated = [(count, shape) for shape, count in shapes.most_common() if count > 1]
+            if repeated:
+                lines.append('Repeated statements:')
+                lines += [f'  {count}x {shape}' for count, shape in repeated]
+            self.fail('\n'.join(lines))
+
+        response = result.get('response')
+        if max_bytes is not None and response is not None:
+            size = len(response.content)
+            self.assertLessEqual(size, max_bytes, f'{name}: payload {size} bytes, budget {max_bytes}')
+
+
+class EndpointBudgetTests(QueryBudgetMixin, TestCase):
+    """
+    DB work and payload size of every learning endpoint on a large account
+
+    Budgets are the current numbers; raise one only together with the
+    change that justifies it.
+    """
+    WORDS = 3000
+    LEARNED_WORDS = 800
+    REVIEWS = 12000
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            username='veteran', email='veteran@example.com', password='password'
+        )
+        course = Course.objects.create(title='HSK 1', hsk_level=1, total_days=5)
+        words = Word.objects.bulk_create([
+            Word(hanzi=f'词{i}', pinyin=f'ci{i}', translation_ru=f'слово {i}',
+                 hsk_level=1 + i % 6, audio_url=f'https://cdn.example.com/{i}.mp3')
+            for i in range(cls.WORDS)
+        ])
+        cls.days = []
+        for day_number in range(1, 6):
+            day = CourseDay.objects.create(course=course, day_number=day_number, title=f'Day {day_number}')
+            day.new_words.add(*words[cls.WORDS - day_number * 10:cls.WORDS - (day_number - 1) * 10])
+            rule = GrammarRule.objects.create(
+                title=f'Rule {day_number}', pattern='S + V + O', explanation_ru='...', explanation_kz='...'
+            )
+            day.grammar_rules.add(rule)
+            cls.days.append(day)
+
+        now = timezone.now()
+        WordProgress.objects.bulk_create([
+            WordProgress(
+                user=cls.user, word=word, srs_level=1 + i % 6, interval_days=i % 30,
+                next_review_date=now + timedelta(hours=i % 200 - 100),
+                total_reviews=15, correct_reviews=10 + i % 6, struggle_score=(i % 5) / 2
+            )
+            for i, word in enumerate(words[:cls.LEARNED_WORDS])
+        ])
+        ReviewHistory.objects.bulk_create([
+            ReviewHistory(
+                user=cls.user, word=words[i % cls.LEARNED_WORDS], quality=i % 6,
+                old_srs_level=1, new_srs_level=2, old_interval=1, new_interval=3,
+                old_ease_factor=2.5, new_ease_factor=2.5, review_time_seconds=5,
+                reviewed_at=now - timedelta(minutes=17 * i)
+            )
+            for i in range(cls.REVIEWS)
+        ], batch_size=2000)
+        rebuild_summary(cls.user)
+        cls.words = words
+
+    def setUp(self):
+        # Budgets cover per-user work: shared caches are warm in steady state
+        cache.clear()
+        invalidate_content()
+        invalidate_word_pool()
+        get_word_pool()
+        for day in self.days:
+            for session_type in ('A', 'B'):
+                get_content_bundle(day.id, session_type)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def session_at(self, step, session_type='A'):
+        session, _ = LearningSession.objects.get_or_create(
+            user=self.user, course_day=self.days[0], session_type=session_type
+        )
+        session.current_step = step
+        session.save()
+        return session
+
+    def get(self, name, *args, **params):
+        return self.client.get(reverse(f'learning:{name}', args=args), params)
+
+    def post(self, name, data):
+        return self.client.post(reverse(f'learning:{name}'), data, format='json')
+
+    def test_main_screen(self):
+        with self.assertBudget('main_screen (cold)', 6, 500) as result:
+            result['response'] = self.get('main-screen')
+        with self.assertBudget('main_screen (cached)', 0) as result:
+            result['response'] = self.get('main-screen')
+
+    def test_start_session(self):
+        with self.assertBudget('start_session', 17, 6000) as result:
+            result['response'] = self.post(
+                'start-session', {'course_day_id': self.days[0].id, 'session_type': 'A'}
+            )
+        self.assertEqual(result['response'].status_code, 200)
+
+    def test_get_step_data(self):
+        budgets = {1: (16, 6000), 2: (15, 2500), 3: (6, 1500), 4: (6, 1500), 5: (6, 1500)}
+        for step, (max_queries, max_bytes) in budgets.items():
+            session = self.session_at(step)
+            with self.assertBudget(f'get_step_data (step {step})', max_queries, max_bytes) as result:
+                result['response'] = self.get('get-step-data', session.id)
+            self.assertEqual(result['response'].status_code, 200)
+
+    def test_submit_steps(self):
+        session = self.session_at(1)
+        card = self.get('get-step-data', session.id).json()['data']['cards'][0]
+        submits = {
+            1: {'card_id': card['id'], 'selected_option_id': card['word']['id'],
+                'current_card_index': 0, 'total_shown_cards': 10},
+            2: {'words': [{'word_id': word.id, 'is_correct': True} for word in self.days[0].new_words.all()[:5]]},
+            3: {'built_sentence_hanzi': ''},
+            4: {'selected_option_index': 0},
+            5: {'arranged_word_ids': []},
+        }
+        budgets = {1: 22, 2: 23, 3: 11, 4: 10, 5: 10}
+        for step, data in submits.items():
+            session = self.session_at(step)
+            with self.assertBudget(f'submit_step_{step}', budgets[step], 1500) as result:
+                result['response'] = self.post(f'submit-step-{step}', {'session_id': session.id, **data})
+            self.assertEqual(result['response'].status_code, 200, result['response'].content)
+
+    def test_srs_endpoints(self):
+        with self.assertBudget('srs_review_batch', 1, 5000) as result:
+            result['response'] = self.get('srs-review-batch', batch_size=20)
+        with self.assertBudget('srs_mistakes_batch', 1, 5500) as result:
+            result['response'] = self.get('srs-mistakes-batch', batch_size=20)
+        reviews = [
+            {'word_id': word.id, 'quality': 4, 'time_spent_seconds': 5}
+            for word in self.words[:20]
+        ]
+        with self.assertBudget('srs_submit_review', 13, 3500) as result:
+            result['response'] = self.post('srs-submit-review', {'batch_id': 'b1', 'reviews': reviews})
+        self.assertEqual(result['response'].status_code, 200)
@@ -14,6 +14,7 @@ urlpatterns = [
     path('start/', views.start_session, name='start-session'),
     path('complete/', views.complete_session, name='complete-session'),
     path('step/<int:session_id>/', views.get_step_data, name='get-step-data'),
+    path('session/<int:session_id>/bundle/', views.get_session_bundle, name='session-bundle'),
 
     # Step Submission
     path('submit/step-1/', views.submit_step_1, name='submit-step-1'),
@@ -21,11 +22,16 @@ urlpatterns = [
     path('submit/step-3/', views.submit_step_3, name='submit-step-3'),
     path('submit/step-4/', views.submit_step_4, name='submit-step-4'),
     path('submit/step-5/', views.submit_step_5, name='submit-step-5'),
+    path('submit/batch/', views.submit_answers_batch, name='submit-answers-batch'),
 
     # SRS Review
     path('srs/review-batch/', views.srs_review_batch, name='srs-review-batch'),
     path('srs/mistakes-batch/', views.srs_mistakes_batch, name='srs-mistakes-batch'),
     path('srs/submit-review/', views.srs_submit_review, name='srs-submit-review'),
+    path('srs/forecast/', views.srs_forecast, name='srs-forecast'),
+
+    # Leaderboards
+    path('leaderboard/', views.leaderboard, name='leaderboard'),
 
     # Admin: Create Demo Data
     path('create-demo-data/', views.create_demo_data, name='create-demo-data'),
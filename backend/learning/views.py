@@ -5,11 +5,17 @@ Views for Session A/B Learning System
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
+from django.db.models import F
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
+from django.views.decorators.gzip import gzip_page
 import random
 import uuid
 
+from core.ledger import award_xp, current_streak
+from core.leaderboard import (
+    BOARD_GLOBAL, BOARD_KINDS, get_top, get_user_entry, hsk_board, weekly_board
+)
 from core.models import UserCourseProgress, UserProfile
 from course.models import Course, CourseDay
 from vocab.models import Word, WordProgress, GrammarRule, GrammarExample
@@ -23,7 +29,23 @@ from .serializers import (
     Step4DataSerializer, Step5DataSerializer, AnswerResponseSerializer,
     SessionSummaryResponseSerializer, MainScreenSerializer
 )
-from .srs import update_srs, get_srs_batch, get_due_count, initialize_word_progress, get_mistakes_batch
+from .srs import (
+    update_srs, update_srs_batch, get_srs_batch,
+    mark_words_learned, get_mistakes_batch, mistakes_cursor, parse_mistakes_cursor
+)
+from .srs_summary import get_summary_due_count
+from .caching import (
+    get_main_screen, set_main_screen, compute_etag, etag_matches, invalidate_main_screen
+)
+from .content import get_content_bundle
+from .session_state import SessionState
+from .plan import advance_plans, get_plan_words, next_day_audio
+from .answers import (
+    AnswerError, apply_answer_batch, grade_arrangement, grade_dialogue, grade_grammar, user_language
+)
+from .deck import build_session_deck
+from .srs_simulator import forecast_user
+from .schedulers import get_user_scheduler
 
 
 @api_view(['POST'])
@@ -556,11 +578,66 @@ def main_screen(request):
     Query params:
     - day (optional): override current day (1-5)
     - hsk (optional): override user's HSK level (1-6)
+
+    Responses carry an ETag; a matching If-None-Match returns 304.
+    """
+    user = request.user
+
+    # Check if specific HSK level requested
+    hsk_level = request.query_params.get('hsk')
+    if hsk_level:
+        try:
+            hsk_level = int(hsk_level)
+            if hsk_level < 1 or hsk_level > 6:
+                return Response({'error': 'HSK level must be between 1 and 6'}, status=status.HTTP_400_BAD_REQUEST)
+        except ValueError:
+            return Response({'error': 'Invalid HSK level'}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Check if specific day requested
+    day_number = request.query_params.get('day')
+    if day_number:
+        try:
+            day_number = int(day_number)
+            if day_number < 1 or day_number > 5:
+                return Response({'error': 'Day must be between 1 and 5'}, status=status.HTTP_400_BAD_REQUEST)
+        except ValueError:
+            return Response({'error': 'Invalid day number'}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Steady state: one cache read (see learning.caching)
+    variant = f'hsk={hsk_level or ""}&day={day_number or ""}'
+    snapshot = get_main_screen(user.id, variant)
+    if snapshot is None:
+        response_data = _build_main_screen(user, hsk_level or None, day_number or None)
+        if isinstance(response_data, Response):
+            return response_data
+        etag = set_main_screen(user.id, variant, response_data)
+    else:
+        etag, response_data = snapshot
+
+    if etag_matches(request, etag):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(response_data)
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _build_main_screen(user, hsk_level=None, day_number=None):
+    """
+    Build main screen data for a user
+
+    Args:
+        user: User instance
+        hsk_level: HSK level override (default: profile level)
+        day_number: Day override (default: current course day)
+
+    Returns:
+        Response data dict, or an error Response
     """
     import logging
     logger = logging.getLogger(__name__)
 
-    user = request.user
     logger.info(f"[MainScreen] Loading for user: {user.username}")
 
     # Safely get user profile with defaults
@@ -583,28 +660,10 @@ def main_screen(request):
         logger.error(f"[MainScreen] Error accessing progress: {e}")
         user_progress = UserCourseProgress.objects.create(user=user)
 
-    # Check if specific HSK level requested
-    hsk_level = request.query_params.get('hsk')
-    if hsk_level:
-        try:
-            hsk_level = int(hsk_level)
-            if hsk_level < 1 or hsk_level > 6:
-                return Response({'error': 'HSK level must be between 1 and 6'}, status=status.HTTP_400_BAD_REQUEST)
-        except ValueError:
-            return Response({'error': 'Invalid HSK level'}, status=status.HTTP_400_BAD_REQUEST)
-    else:
+    if hsk_level is None:
         hsk_level = getattr(user_profile, 'current_hsk_level', 1)
 
-    # Check if specific day requested
-    day_number = request.query_params.get('day')
-    if day_number:
-        try:
-            day_number = int(day_number)
-            if day_number < 1 or day_number > 5:
-                return Response({'error': 'Day must be between 1 and 5'}, status=status.HTTP_400_BAD_REQUEST)
-        except ValueError:
-            return Response({'error': 'Invalid day number'}, status=status.HTTP_400_BAD_REQUEST)
-    else:
+    if day_number is None:
         day_number = user_progress.current_day
         # Reset to day 5 if user is beyond available days (max 5 days per course)
         if day_number > 5:
@@ -667,14 +726,8 @@ def main_screen(request):
 
     logger.info(f"[MainScreen] Session A: {'Yes' if session_a else 'No'}, Session B: {'Yes' if session_b else 'No'}")
 
-    # Get due for review count
-    due_counts = get_due_count(user)
-
-    # Get learning words count
-    total_learning = WordProgress.objects.filter(
-        user=user,
-        srs_level__in=[1, 2, 3, 4]
-    ).count()
+    # Get due for review and learning words counts (materialized summary row)
+    due_counts = get_summary_due_count(user)
 
     response_data = {
         'current_course_day': {
@@ -687,8 +740,8 @@ def main_screen(request):
         'session_a': None,
         'session_b': None,
         'due_for_review': due_counts['due_now'],
-        'total_learning_words': total_learning,
-        'streak_days': user_progress.streak_days,
+        'total_learning_words': due_counts['total_learning'],
+        'streak_days': current_streak(user_progress),
         'xp_total': user_progress.total_xp
     }
 
@@ -700,7 +753,7 @@ def main_screen(request):
 
     logger.info(f"[MainScreen] Returning data with {len(response_data)} fields")
 
-    return Response(response_data)
+    return response_data
 
 
 # ============================================================================
@@ -722,24 +775,14 @@ def start_session(request):
 
     course_day = get_object_or_404(CourseDay, id=course_day_id)
 
-    # Check if session already exists
-    existing_session = LearningSession.objects.filter(
+    # Resume the existing session or create it; the unique constraint on
+    # (user, course_day, session_type) resolves concurrent starts
+    session, _ = LearningSession.objects.get_or_create(
         user=user,
         course_day=course_day,
-        session_type=session_type
-    ).first()
-
-    if existing_session:
-        # Resume existing session
-        session = existing_session
-    else:
-        # Create new session
-        session = LearningSession.objects.create(
-            user=user,
-            course_day=course_day,
-            session_type=session_type,
-            current_step=1
-        )
+        session_type=session_type,
+        defaults={'current_step': 1}
+    )
 
     # Get step 1 data (SRS Review) - call helper directly to avoid decorator issues
     return _get_step_1_data(session)
@@ -754,38 +797,24 @@ def complete_session(request):
     session_id = request.data.get('session_id')
     user = request.user
 
-    session = get_object_or_404(LearningSession, id=session_id, user=user)
+    session = get_object_or_404(
+        LearningSession.objects.select_related('course_day'), id=session_id, user=user
+    )
 
-    # Mark as completed
-    session.is_completed = True
-    session.completed_at = timezone.now()
-    session.current_step = 6  # 6 = completed
-    session.save()
+    # Mark as completed (once, however often the request is repeated)
+    SessionState.of(session).claim_completion()
 
     # Check if both sessions A and B are completed
-    session_a = LearningSession.objects.filter(
-        user=user,
-        course_day=session.course_day,
-        session_type='A',
-        is_completed=True
-    ).exists()
-
-    session_b = LearningSession.objects.filter(
+    completed_types = set(LearningSession.objects.filter(
         user=user,
         course_day=session.course_day,
-        session_type='B',
         is_completed=True
-    ).exists()
-
-    is_day_completed = session_a and session_b
+    ).values_list('session_type', flat=True))
+    is_day_completed = {'A', 'B'} <= completed_types
 
     # If both sessions completed, move to next day
     if is_day_completed:
-        user_progress = user.progress
-        if not user_progress:
-            user_progress = UserCourseProgress.objects.create(user=user)
-        user_progress.current_day += 1
-        user_progress.save()
+        _advance_day(user, session.course_day)
 
     # Get problematic words details
     problematic_words = []
@@ -816,6 +845,27 @@ def complete_session(request):
     return Response(response_data)
 
 
+def _advance_day(user, course_day) -> bool:
+    """
+    Move the user past a completed course day
+
+    Compare-and-set on current_day: only the completion of the user's
+    current day advances it, so a repeated or concurrent completion
+    (both sessions finishing at once, a retried request) advances once.
+
+    Returns:
+        True if the day was advanced
+    """
+    UserCourseProgress.objects.get_or_create(user=user)
+    advanced = UserCourseProgress.objects.filter(
+        user=user, current_day=course_day.day_number
+    ).update(current_day=F('current_day') + 1, updated_at=timezone.now())
+    if advanced:
+        # update() sends no post_save signal
+        invalidate_main_screen(user.id)
+    return bool(advanced)
+
+
 # ============================================================================
 # STEP DATA RETRIEVAL
 # ============================================================================
@@ -845,106 +895,134 @@ def get_step_data(request, session_id):
         return Response({'error': 'Session completed'}, status=status.HTTP_400_BAD_REQUEST)
 
 
-def _get_step_1_data(session):
+@gzip_page
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def get_session_bundle(request, session_id):
     """
-    Step 1: SRS Review (2 minutes)
-    Get 10 words from previous lessons for review with SRS logic
+    Get the data of all five steps of a session in one response
+
+    Unlike get_step_data this does not start or skip steps; steps without
+    content have "data": null and the client moves past them. Built with
+    a fixed number of queries (content comes from the cached content
+    bundle). Responses carry an ETag; a matching If-None-Match returns 304.
     """
-    # Mark step as started
-    if not session.step_1_started_at:
-        session.step_1_started_at = timezone.now()
-        session.save()
+    session = get_object_or_404(
+        LearningSession.objects.select_related('user__profile', 'course_day').prefetch_related(
+            'course_day__lessons__steps'
+        ),
+        id=session_id,
+        user=request.user
+    )
+    content = get_content_bundle(session.course_day_id, session.session_type)
 
+    cards = _step_1_cards(session)
+    words = _step_2_words(session, content)
+
+    response_data = {
+        'session': LearningSessionSerializer(session).data,
+        'content_version': content['version'],
+        'steps': [
+            {
+                'step': 1,
+                'step_type': 'SRS_REVIEW',
+                'data': {'cards': cards, 'total_cards': len(cards)} if cards else None
+            },
+            {
+                'step': 2,
+                'step_type': 'NEW_WORDS',
+                'data': {'words': words, 'total_words': len(words)} if words else None
+            },
+            {'step': 3, 'step_type': 'GRAMMAR', 'data': content['grammar_task']},
+            {'step': 4, 'step_type': 'DIALOGUE', 'data': content['dialogue']},
+            {'step': 5, 'step_type': 'WORD_ARRANGEMENT', 'data': content['word_arrangement']},
+        ]
+    }
+
+    etag = compute_etag(response_data)
+    if etag_matches(request, etag):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(response_data)
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _step_1_cards(session):
+    """
+    Step 1 cards of a session as response dicts
+
+    Gets or creates the session's deck: 10 words due for review, padded
+    with random words of the user's level when fewer are due.
+    """
     # Get 10 words due for review
     word_progress_list = get_srs_batch(session.user, batch_size=10)
 
-    # Create SRS cards for this session
-    cards = []
-    for wp in word_progress_list:
-        # Get 3 distractor words for multiple choice
-        distractors = Word.objects.filter(
-            hsk_level=wp.word.hsk_level
-        ).exclude(id=wp.word.id).order_by('?')[:3]
-
-        # Create options (correct word + 3 distractors)
-        options = [{'word_id': wp.word.id, 'translation_ru': wp.word.translation_ru,
-                    'translation_kz': wp.word.translation_kz}]
-        for d in distractors:
-            options.append({'word_id': d.id, 'translation_ru': d.translation_ru,
-                          'translation_kz': d.translation_kz})
-
-        # Shuffle options
-        random.shuffle(options)
-
-        # Create card - use filter().first() to handle potential duplicates
-        card = SRSReviewCard.objects.filter(
-            session=session,
-            word=wp.word
-        ).first()
-
-        if not card:
-            # Create new card if doesn't exist
-            card = SRSReviewCard.objects.create(
-                session=session,
-                word=wp.word,
-                options=options
-            )
+    # Get or create this session's cards with words attached
+    cards = build_session_deck(
+        session,
+        [wp.word for wp in word_progress_list],
+        pad_hsk_level=session.user.profile.current_hsk_level,
+        deck_size=10
+    )
+    return [
+        {
+            'id': card.id,
+            'word': {
+                'id': card.word.id,
+                'hanzi': card.word.hanzi,
+                'pinyin': card.word.pinyin,
+                'audio_url': card.word.audio_url
+            },
+            'options': card.options
+        }
+        for card in cards
+    ]
 
-        cards.append(card)
-
-    # If less than 10 words available, pad with random words
-    if len(cards) < 10:
-        existing_word_ids = [c.word.id for c in cards]
-        additional_words = Word.objects.filter(
-            hsk_level=session.user.profile.current_hsk_level
-        ).exclude(id__in=existing_word_ids).order_by('?')[:(10 - len(cards))]
-
-        for word in additional_words:
-            distractors = Word.objects.filter(
-                hsk_level=word.hsk_level
-            ).exclude(id=word.id).order_by('?')[:3]
-
-            options = [{'word_id': word.id, 'translation_ru': word.translation_ru,
-                        'translation_kz': word.translation_kz}]
-            for d in distractors:
-                options.append({'word_id': d.id, 'translation_ru': d.translation_ru,
-                              'translation_kz': d.translation_kz})
-            random.shuffle(options)
-
-            card = SRSReviewCard.objects.create(
-                session=session,
-                word=word,
-                options=options
-            )
-            cards.append(card)
+
+def _step_2_words(session, content):
+    """
+    Step 2 words of a session: up to 5 words of the course day the user
+    has not learned yet (from the user's learning plan), with their
+    NewWordLearningProgress rows created
+    """
+    words_data = get_plan_words(session.user, session.course_day_id, content)
+
+    # Initialize progress for these words
+    if words_data:
+        NewWordLearningProgress.objects.bulk_create(
+            [NewWordLearningProgress(session=session, word_id=word['id']) for word in words_data],
+            ignore_conflicts=True
+        )
+    return words_data
+
+
+def _get_step_1_data(session):
+    """
+    Step 1: SRS Review (2 minutes)
+    Get 10 words from previous lessons for review with SRS logic
+    """
+    # Mark step as started
+    state = SessionState.of(session)
+    state.start_step(1)
+
+    cards = _step_1_cards(session)
 
     # If no cards available, auto-complete step 1 and move to step 2
     if len(cards) == 0:
         # Mark step 1 as completed
-        session.step_1_completed_at = timezone.now()
-        session.current_step = 2
-        session.step_2_started_at = timezone.now()
-        session.save()
+        state.skip_step(1)
         # Auto-move to step 2
         return _get_step_2_data(session)
 
+    state.flush()
+
     response_data = {
         'step': 1,
         'step_type': 'SRS_REVIEW',
         'data': {
-            'cards': [
-                {
-                    'id': card.id,
-                    'word': {
-                        'id': card.word.id,
-                        'hanzi': card.word.hanzi,
-                        'pinyin': card.word.pinyin,
-                        'audio_url': card.word.audio_url
-                    },
-                    'options': card.options
-                }
-                for card in cards
-            ],
+            'cards': cards,
             'total_cards': len(cards),
             'current_card_index': 0
         },
@@ -960,55 +1038,31 @@ def _get_step_2_data(session):
     Get 5 new words to learn with mini-tests
     """
     # Mark step as started
-    if not session.step_2_started_at:
-        session.step_2_started_at = timezone.now()
-        session.save()
-
-    # Get new words from course day (not yet learned by user)
-    learned_word_ids = WordProgress.objects.filter(
-        user=session.user,
-        srs_level__gt=0
-    ).values_list('word_id', flat=True)
-
-    new_words = session.course_day.new_words.exclude(
-        id__in=learned_word_ids
-    )[:5]
+    state = SessionState.of(session)
+    state.start_step(2)
 
-    # Initialize progress for these words
-    words_data = []
-    for word in new_words:
-        # Create progress record
-        NewWordLearningProgress.objects.get_or_create(
-            session=session,
-            word=word
-        )
-
-        words_data.append({
-            'id': word.id,
-            'hanzi': word.hanzi,
-            'pinyin': word.pinyin,
-            'translation_ru': word.translation_ru,
-            'translation_kz': word.translation_kz,
-            'audio_url': word.audio_url
-        })
+    # New words of the course day (content bundle) not yet learned by user
+    content = get_content_bundle(session.course_day_id, session.session_type)
+    words_data = _step_2_words(session, content)
 
     # If no new words available, auto-complete step 2 and move to step 3
     if not words_data:
         # Mark step 2 as completed
-        session.step_2_completed_at = timezone.now()
-        session.current_step = 3
-        session.step_3_started_at = timezone.now()
-        session.save()
+        state.skip_step(2)
         # Auto-move to step 3
         return _get_step_3_data(session)
 
+    state.flush()
+
     response_data = {
         'step': 2,
         'step_type': 'NEW_WORDS',
         'data': {
             'words': words_data,
             'total_words': len(words_data),
-            'current_word_index': 0
+            'current_word_index': 0,
+            # Audio of the next lesson's new words, for prefetching
+            'next_lesson_audio': next_day_audio(session.user, session.course_day, session.session_type)
         },
         'session': LearningSessionSerializer(session).data
     }
@@ -1022,71 +1076,21 @@ def _get_step_3_data(session):
     Get grammar rule with sentence building task
     """
     # Mark step as started
-    if not session.step_3_started_at:
-        session.step_3_started_at = timezone.now()
-        session.save()
+    state = SessionState.of(session)
+    state.start_step(3)
 
-    # Get grammar task for this session
-    grammar_task = GrammarTask.objects.filter(
-        course_day=session.course_day,
-        session_type=session.session_type
-    ).first()
-
-    if not grammar_task:
-        # Fallback: get any grammar rule from course day
-        grammar_rule = session.course_day.grammar_rules.first()
-        if grammar_rule:
-            # Create a simple grammar task
-            grammar_task = GrammarTask.objects.create(
-                course_day=session.course_day,
-                session_type=session.session_type,
-                grammar_rule=grammar_rule,
-                task_prompt_ru=f"Постройте предложение используя шаблон: {grammar_rule.pattern}",
-                task_prompt_kz=f"Үлгіні қолдана отырып, сөйлем құрыңыз: {grammar_rule.pattern}",
-                components=[],
-                correct_hanzi="",
-                correct_pinyin="",
-                correct_translation_ru="",
-                correct_translation_kz=""
-            )
-
-    task_data = None
-    if grammar_task:
-        # Get examples from grammar rule
-        examples = []
-        for ex in grammar_task.grammar_rule.examples.all()[:2]:
-            examples.append({
-                'hanzi': ex.sentence_hanzi,
-                'pinyin': ex.sentence_pinyin,
-                'translation_ru': ex.translation_ru,
-                'translation_kz': ex.translation_kz
-            })
-
-        task_data = {
-            'id': grammar_task.id,
-            'grammar_rule': {
-                'id': grammar_task.grammar_rule.id,
-                'title': grammar_task.grammar_rule.title,
-                'pattern': grammar_task.grammar_rule.pattern,
-                'explanation_ru': grammar_task.grammar_rule.explanation_ru,
-                'explanation_kz': grammar_task.grammar_rule.explanation_kz,
-                'examples': examples
-            },
-            'task_prompt_ru': grammar_task.task_prompt_ru,
-            'task_prompt_kz': grammar_task.task_prompt_kz,
-            'components': grammar_task.components
-        }
+    # Grammar task for this session (content bundle)
+    task_data = get_content_bundle(session.course_day_id, session.session_type)['grammar_task']
 
     # If no grammar task available, auto-complete step 3 and move to step 4
     if not task_data:
         # Mark step 3 as completed
-        session.step_3_completed_at = timezone.now()
-        session.current_step = 4
-        session.step_4_started_at = timezone.now()
-        session.save()
+        state.skip_step(3)
         # Auto-move to step 4
         return _get_step_4_data(session)
 
+    state.flush()
+
     response_data = {
         'step': 3,
         'step_type': 'GRAMMAR',
@@ -1103,39 +1107,21 @@ def _get_step_4_data(session):
     Get dialogue for listening comprehension
     """
     # Mark step as started
-    if not session.step_4_started_at:
-        session.step_4_started_at = timezone.now()
-        session.save()
+    state = SessionState.of(session)
+    state.start_step(4)
 
-    # Get dialogue for this session
-    dialogue = Dialogue.objects.filter(
-        course_day=session.course_day,
-        session_type=session.session_type
-    ).first()
-
-    dialogue_data = None
-    if dialogue:
-        dialogue_data = {
-            'id': dialogue.id,
-            'lines': dialogue.lines,
-            'question_hanzi': dialogue.question_hanzi,
-            'question_pinyin': dialogue.question_pinyin,
-            'question_translation_ru': dialogue.question_translation_ru,
-            'question_translation_kz': dialogue.question_translation_kz,
-            'audio_url': dialogue.audio_url,
-            'options': dialogue.options
-        }
+    # Dialogue for this session (content bundle)
+    dialogue_data = get_content_bundle(session.course_day_id, session.session_type)['dialogue']
 
     # If no dialogue available, auto-complete step 4 and move to step 5
     if not dialogue_data:
         # Mark step 4 as completed
-        session.step_4_completed_at = timezone.now()
-        session.current_step = 5
-        session.step_5_started_at = timezone.now()
-        session.save()
+        state.skip_step(4)
         # Auto-move to step 5
         return _get_step_5_data(session)
 
+    state.flush()
+
     response_data = {
         'step': 4,
         'step_type': 'DIALOGUE',
@@ -1152,38 +1138,18 @@ def _get_step_5_data(session):
     Get word arrangement exercise
     """
     # Mark step as started
-    if not session.step_5_started_at:
-        session.step_5_started_at = timezone.now()
-        session.save()
+    state = SessionState.of(session)
+    state.start_step(5)
 
-    # Get arrangement exercise for this session
-    exercise = WordArrangementExercise.objects.filter(
-        course_day=session.course_day,
-        session_type=session.session_type
-    ).first()
-
-    exercise_data = None
-    if exercise:
-        exercise_data = {
-            'id': exercise.id,
-            'target_hanzi': exercise.target_hanzi,
-            'target_pinyin': exercise.target_pinyin,
-            'target_translation_ru': exercise.target_translation_ru,
-            'target_translation_kz': exercise.target_translation_kz,
-            'audio_url': exercise.audio_url,
-            'scrambled_words': exercise.scrambled_words,
-            'hint_ru': exercise.hint_ru,
-            'hint_kz': exercise.hint_kz
-        }
+    # Arrangement exercise for this session (content bundle)
+    exercise_data = get_content_bundle(session.course_day_id, session.session_type)['word_arrangement']
 
     # If no exercise available, auto-complete session
     if not exercise_data:
         # Mark step 5 and session as completed
-        session.step_5_completed_at = timezone.now()
-        session.is_completed = True
-        session.completed_at = timezone.now()
-        session.current_step = 6
-        session.save()
+        state.complete_step(5)
+        state.complete_session()
+        state.flush()
 
         # Return session completion data with step info for frontend
         response_data = {
@@ -1201,6 +1167,8 @@ def _get_step_5_data(session):
         }
         return Response(response_data)
 
+    state.flush()
+
     response_data = {
         'step': 5,
         'step_type': 'WORD_ARRANGEMENT',
@@ -1243,16 +1211,12 @@ def submit_step_1(request):
     card.completed_at = timezone.now()
 
     # Mark as problematic if incorrect
+    state = SessionState.of(session)
     if not is_correct:
         card.is_problematic = True
-        # Ensure problematic_words is a list
-        if session.problematic_words is None:
-            session.problematic_words = []
-        if card.word.id not in session.problematic_words:
-            session.problematic_words.append(card.word.id)
+        state.add_problematic_word(card.word_id)
 
     card.save()
-    session.save()
 
     # Update SRS for this word
     word_progress = WordProgress.objects.filter(
@@ -1263,14 +1227,10 @@ def submit_step_1(request):
     if word_progress:
         # Quality rating based on correctness
         quality = 4 if is_correct else 1
-        update_srs(word_progress, quality, time_spent_seconds)
+        update_srs(word_progress, quality, time_spent_seconds, scheduler=get_user_scheduler(user))
 
     # Update session stats
-    session.total_questions += 1
-    if is_correct:
-        session.correct_answers += 1
-        session.xp_earned += 5
-    session.save()
+    state.record_answers(correct=1 if is_correct else 0, xp=5 if is_correct else 0)
 
     # Check if all cards are completed
     # Use frontend data if provided, otherwise fallback to DB check
@@ -1283,10 +1243,9 @@ def submit_step_1(request):
         is_step_completed = (remaining_cards == 0)
 
     if is_step_completed:
-        session.step_1_completed_at = timezone.now()
-        session.current_step = 2
-        session.save()
+        state.complete_step(1)
         print(f"Step 1 completed! Moving to step 2")
+    state.flush()
 
     # Get next card or step completion
     next_data = {}
@@ -1333,53 +1292,43 @@ def submit_step_2(request):
     session = get_object_or_404(LearningSession, id=session_id, user=user)
 
     # Process each word
+    word_ids = [word_answer.get('word_id') for word_answer in words_data]
+    progress_by_word = {
+        progress.word_id: progress
+        for progress in NewWordLearningProgress.objects.filter(session=session, word_id__in=word_ids)
+    }
+    now = timezone.now()
     correct_count = 0
     for word_answer in words_data:
-        word_id = word_answer.get('word_id')
         is_correct = word_answer.get('is_correct')
-        time_spent = word_answer.get('time_spent_seconds', 0)
-        pronunciation_attempts = word_answer.get('pronunciation_attempts', 0)
-        pronunciation_ok_count = word_answer.get('pronunciation_ok_count', 0)
 
         # Update progress
-        progress = NewWordLearningProgress.objects.filter(
-            session=session,
-            word_id=word_id
-        ).first()
-
+        progress = progress_by_word.get(word_answer.get('word_id'))
         if progress:
             progress.is_correct = is_correct
-            progress.time_spent_seconds = time_spent
-            progress.pronunciation_attempts = pronunciation_attempts
-            progress.pronunciation_ok_count = pronunciation_ok_count
-            progress.completed_at = timezone.now()
-            progress.save()
+            progress.time_spent_seconds = word_answer.get('time_spent_seconds', 0)
+            progress.pronunciation_attempts = word_answer.get('pronunciation_attempts', 0)
+            progress.pronunciation_ok_count = word_answer.get('pronunciation_ok_count', 0)
+            progress.completed_at = now
 
         if is_correct:
             correct_count += 1
 
-        # Initialize SRS for new word
-        word = Word.objects.filter(id=word_id).first()
-        if word:
-            initialize_word_progress(user, word)
-            # Mark as learned (level 1)
-            word_progress = WordProgress.objects.filter(
-                user=user,
-                word=word
-            ).first()
-            if word_progress:
-                word_progress.srs_level = 1
-                word_progress.next_review_date = timezone.now()
-                word_progress.save()
+    NewWordLearningProgress.objects.bulk_update(list(progress_by_word.values()), [
+        'is_correct', 'time_spent_seconds', 'pronunciation_attempts',
+        'pronunciation_ok_count', 'completed_at'
+    ])
+
+    # Initialize SRS for new words and mark as learned (level 1)
+    mark_words_learned(user, word_ids)
+    advance_plans(user, word_ids)
 
     # Update session
-    session.words_learned = len(words_data)
-    session.total_questions += len(words_data)
-    session.correct_answers += correct_count
-    session.xp_earned += correct_count * 10
-    session.step_2_completed_at = timezone.now()
-    session.current_step = 3
-    session.save()
+    state = SessionState.of(session)
+    state.set(words_learned=len(words_data))
+    state.record_answers(questions=len(words_data), correct=correct_count, xp=correct_count * 10)
+    state.complete_step(2)
+    state.flush()
 
     response_data = {
         'is_correct': True,  # Step is completed
@@ -1405,16 +1354,9 @@ def submit_step_3(request):
     user = request.user
     session = get_object_or_404(LearningSession, id=session_id, user=user)
 
-    # Get grammar task
-    grammar_task = GrammarTask.objects.filter(
-        course_day=session.course_day,
-        session_type=session.session_type
-    ).first()
-
-    is_correct = False
-    if grammar_task:
-        # Simple comparison (can be enhanced for more flexible matching)
-        is_correct = (built_sentence.strip() == grammar_task.correct_hanzi.strip())
+    # Grade against the grammar task (content bundle)
+    content = get_content_bundle(session.course_day_id, session.session_type)
+    is_correct, correct_answer = grade_grammar(content, built_sentence)
 
     # Create step progress record
     StepProgress.objects.create(
@@ -1427,19 +1369,16 @@ def submit_step_3(request):
     )
 
     # Update session
-    session.total_questions += 1
-    if is_correct:
-        session.correct_answers += 1
-        session.xp_earned += 10
-    session.step_3_completed_at = timezone.now()
-    session.current_step = 4
-    session.save()
+    state = SessionState.of(session)
+    state.record_answers(correct=1 if is_correct else 0, xp=10 if is_correct else 0)
+    state.complete_step(3)
+    state.flush()
 
     response_data = {
         'is_correct': is_correct,
         'is_step_completed': True,
         'xp_earned': 10 if is_correct else 0,
-        'correct_answer': {'hanzi': grammar_task.correct_hanzi} if grammar_task else None,
+        'correct_answer': correct_answer,
         'next_step': 4,
         'session': LearningSessionSerializer(session).data
     }
@@ -1460,31 +1399,9 @@ def submit_step_4(request):
     user = request.user
     session = get_object_or_404(LearningSession, id=session_id, user=user)
 
-    # Get dialogue
-    dialogue = Dialogue.objects.filter(
-        course_day=session.course_day,
-        session_type=session.session_type
-    ).first()
-
-    is_correct = False
-    explanation = ''
-    if dialogue:
-        # Check if selected option is correct
-        try:
-            if selected_option_index is not None and 0 <= selected_option_index < len(dialogue.options):
-                is_correct = dialogue.options[selected_option_index].get('is_correct', False)
-        except Exception as e:
-            print(f"Error checking dialogue option: {e}")
-
-        # Get explanation based on user language
-        try:
-            if user.profile.preferred_language == 'kz':
-                explanation = dialogue.explanation_kz or ''
-            else:
-                explanation = dialogue.explanation_ru or ''
-        except Exception as e:
-            print(f"Error getting explanation: {e}")
-            explanation = ''
+    # Grade against the dialogue (content bundle)
+    content = get_content_bundle(session.course_day_id, session.session_type)
+    is_correct, explanation = grade_dialogue(content, selected_option_index, user_language(user))
 
     # Create step progress record
     StepProgress.objects.create(
@@ -1497,13 +1414,10 @@ def submit_step_4(request):
     )
 
     # Update session
-    session.total_questions += 1
-    if is_correct:
-        session.correct_answers += 1
-        session.xp_earned += 10
-    session.step_4_completed_at = timezone.now()
-    session.current_step = 5
-    session.save()
+    state = SessionState.of(session)
+    state.record_answers(correct=1 if is_correct else 0, xp=10 if is_correct else 0)
+    state.complete_step(4)
+    state.flush()
 
     response_data = {
         'is_correct': is_correct,
@@ -1530,19 +1444,9 @@ def submit_step_5(request):
     user = request.user
     session = get_object_or_404(LearningSession, id=session_id, user=user)
 
-    # Get exercise
-    exercise = WordArrangementExercise.objects.filter(
-        course_day=session.course_day,
-        session_type=session.session_type
-    ).first()
-
-    is_correct = False
-    if exercise:
-        # Check if arrangement is correct
-        # This is a simple check - can be enhanced
-        correct_order = [w.get('id') for w in exercise.scrambled_words]
-        # For now, just check if all words are present (order validation would be more complex)
-        is_correct = (sorted(arranged_word_ids) == sorted(correct_order))
+    # Grade against the exercise (content bundle)
+    content = get_content_bundle(session.course_day_id, session.session_type)
+    is_correct, correct_answer = grade_arrangement(content, arranged_word_ids)
 
     # Create step progress record
     StepProgress.objects.create(
@@ -1555,19 +1459,16 @@ def submit_step_5(request):
     )
 
     # Update session
-    session.total_questions += 1
-    if is_correct:
-        session.correct_answers += 1
-        session.xp_earned += 10
-    session.step_5_completed_at = timezone.now()
-    session.current_step = 6  # Completed
-    session.save()
+    state = SessionState.of(session)
+    state.record_answers(correct=1 if is_correct else 0, xp=10 if is_correct else 0)
+    state.complete_step(5)
+    state.flush()
 
     response_data = {
         'is_correct': is_correct,
         'is_step_completed': True,
         'xp_earned': 10 if is_correct else 0,
-        'correct_answer': {'target_hanzi': exercise.target_hanzi} if exercise else None,
+        'correct_answer': correct_answer,
         'next_step': None,  # Session complete
         'session': LearningSessionSerializer(session).data
     }
@@ -1575,6 +1476,32 @@ def submit_step_5(request):
     return Response(response_data)
 
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def submit_answers_batch(request):
+    """
+    Submit an ordered batch of answers across steps (offline replay queue)
+
+    Body: {"session_id": int, "answers": [{"idempotency_key": str,
+    "step": 1-5, ...step fields as in submit_step_N}]}
+
+    Answers are applied in one transaction. Keys already applied for the
+    session are not applied again; their stored result is returned with
+    "duplicate": true. Returns per-answer results and the session
+    counters instead of the full session.
+    """
+    try:
+        delta = apply_answer_batch(
+            request.user, request.data.get('session_id'), request.data.get('answers')
+        )
+    except LearningSession.DoesNotExist:
+        return Response({'error': 'Session not found'}, status=status.HTTP_404_NOT_FOUND)
+    except AnswerError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(delta)
+
+
 # ============================================================================
 # SRS REVIEW API
 # ============================================================================
@@ -1627,12 +1554,22 @@ def srs_mistakes_batch(request):
     Query params:
     - batch_size: number of words (default: 20)
     - hsk_level: optional HSK level filter
+    - cursor: next_cursor of the previous batch (keyset pagination)
     """
     user = request.user
     batch_size = int(request.GET.get('batch_size', 20))
     hsk_level = int(request.GET.get('hsk_level')) if 'hsk_level' in request.GET else None
 
-    word_progress_list = get_mistakes_batch(user, batch_size=batch_size, hsk_level=hsk_level)
+    cursor = None
+    if request.GET.get('cursor'):
+        try:
+            cursor = parse_mistakes_cursor(request.GET['cursor'])
+        except ValueError:
+            return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+
+    word_progress_list = get_mistakes_batch(
+        user, batch_size=batch_size, hsk_level=hsk_level, cursor=cursor
+    )
 
     words_data = []
     for wp in word_progress_list:
@@ -1649,12 +1586,18 @@ def srs_mistakes_batch(request):
             'correct_reviews': wp.correct_reviews
         })
 
+    # A full batch may have more words after it
+    next_cursor = None
+    if word_progress_list and len(word_progress_list) == batch_size:
+        next_cursor = mistakes_cursor(word_progress_list[-1])
+
     response_data = {
         'batch_id': str(uuid.uuid4()),
         'batch_number': 1,
         'total_batches': 1,
         'words': words_data,
-        'total_due': len(words_data)
+        'total_due': len(words_data),
+        'next_cursor': next_cursor
     }
 
     return Response(response_data)
@@ -1674,8 +1617,6 @@ def srs_submit_review(request):
         ]
     }
     """
-    from vocab.models import WordProgress
-
     user = request.user
     data = request.data
     batch_id = data.get('batch_id')
@@ -1687,35 +1628,26 @@ def srs_submit_review(request):
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    updated_words = []
-    reviews_processed = 0
-
-    for review in reviews:
-        word_id = review.get('word_id')
-        quality = review.get('quality')
-        time_spent_seconds = review.get('time_spent_seconds', 0)
+    # Apply all reviews in one transaction (one read, two bulk writes)
+    results = update_srs_batch(user, reviews)
 
-        try:
-            word_progress = WordProgress.objects.get(user=user, word_id=word_id)
-            old_srs_level = word_progress.srs_level
-            old_interval = word_progress.interval_days
-
-            update_srs(word_progress, quality, time_spent_seconds)
-
-            updated_words.append({
-                'word_id': word_id,
-                'old_srs_level': old_srs_level,
-                'new_srs_level': word_progress.srs_level,
-                'old_interval': old_interval,
-                'new_interval': word_progress.interval_days,
-                'next_review_date': word_progress.next_review_date.isoformat() if word_progress.next_review_date else None
-            })
-            reviews_processed += 1
-        except WordProgress.DoesNotExist:
-            continue
+    updated_words = [
+        {
+            'word_id': history.word_id,
+            'old_srs_level': history.old_srs_level,
+            'new_srs_level': history.new_srs_level,
+            'old_interval': history.old_interval,
+            'new_interval': history.new_interval,
+            'next_review_date': word_progress.next_review_date.isoformat() if word_progress.next_review_date else None
+        }
+        for word_progress, history in results
+    ]
+    reviews_processed = len(results)
 
     # Calculate XP earned
     xp_earned = sum(r.get('quality', 0) for r in reviews if r.get('quality', 0) >= 3) * 2
+    if reviews_processed:
+        award_xp(user.id, xp_earned, 'review')
 
     response_data = {
         'reviews_processed': reviews_processed,
@@ -1726,6 +1658,96 @@ def srs_submit_review(request):
     return Response(response_data)
 
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def srs_forecast(request):
+    """
+    Forecast daily SRS review workload (what-if simulation)
+    Query params:
+    - days: number of days to simulate (default: 30, max: 365)
+    - accuracy: expected share of correct answers, 0-1 (default: 0.85)
+    - daily_limit: optional maximum reviews per day
+    """
+    try:
+        days = int(request.GET.get('days', 30))
+        accuracy = float(request.GET.get('accuracy', 0.85))
+        daily_limit = int(request.GET['daily_limit']) if 'daily_limit' in request.GET else None
+    except ValueError:
+        return Response({'error': 'Invalid forecast parameters'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if days < 1 or days > 365:
+        return Response({'error': 'days must be between 1 and 365'}, status=status.HTTP_400_BAD_REQUEST)
+    if accuracy < 0 or accuracy > 1:
+        return Response({'error': 'accuracy must be between 0 and 1'}, status=status.HTTP_400_BAD_REQUEST)
+    if daily_limit is not None and daily_limit < 1:
+        return Response({'error': 'daily_limit must be at least 1'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        forecast = forecast_user(request.user, days=days, accuracy=accuracy, daily_limit=daily_limit)
+    except ValueError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    forecast['accuracy'] = accuracy
+
+    return Response(forecast)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def leaderboard(request):
+    """
+    Get a leaderboard page and the user's own rank
+    Query params:
+    - board: global (default), streak, hsk or weekly
+    - hsk (optional, board=hsk): HSK level (default: user's level)
+    - limit: entries per page (default: 20, max: 100)
+    - offset: entries to skip (default: 0)
+
+    Reads the precomputed ranking table (see core.leaderboard).
+    """
+    kind = request.GET.get('board', BOARD_GLOBAL)
+    if kind not in BOARD_KINDS:
+        return Response({'error': f"board must be one of {', '.join(BOARD_KINDS)}"}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = int(request.GET.get('limit', 20))
+        offset = int(request.GET.get('offset', 0))
+        hsk_level = int(request.GET['hsk']) if 'hsk' in request.GET else None
+    except ValueError:
+        return Response({'error': 'Invalid leaderboard parameters'}, status=status.HTTP_400_BAD_REQUEST)
+    if limit < 1 or limit > 100 or offset < 0:
+        return Response({'error': 'limit must be between 1 and 100'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if kind == 'hsk':
+        if hsk_level is None:
+            # Users without a profile get the profile default (HSK 1)
+            profile = getattr(request.user, 'profile', None)
+            hsk_level = profile.current_hsk_level if profile else 1
+        if hsk_level < 1 or hsk_level > 6:
+            return Response({'error': 'HSK level must be between 1 and 6'}, status=status.HTTP_400_BAD_REQUEST)
+        board = hsk_board(hsk_level)
+    elif kind == 'weekly':
+        board = weekly_board()
+    else:
+        board = kind
+
+    entries = get_top(board, limit=limit, offset=offset)
+    me = get_user_entry(board, request.user)
+
+    return Response({
+        'board': board,
+        'computed_at': entries[0].computed_at if entries else (me.computed_at if me else None),
+        'entries': [
+            {
+                'rank': entry.rank,
+                'user_id': entry.user_id,
+                'username': entry.user.username,
+                'score': entry.score
+            }
+            for entry in entries
+        ],
+        'me': {'rank': me.rank, 'score': me.score} if me else None
+    })
+
+
 # ============================================================================
 # ADMIN: CREATE DEMO DATA
 # ============================================================================
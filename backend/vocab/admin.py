@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import Word, GrammarRule, GrammarExample, WordProgress, ReviewHistory
+from .models import (
+    Word, GrammarRule, GrammarExample, WordProgress, ReviewHistory, UserSRSSummary,
+    ReviewDailyRollup, ReviewRollupWatermark
+)
 
 
 @admin.register(Word)
@@ -38,3 +41,25 @@ class ReviewHistoryAdmin(admin.ModelAdmin):
     list_filter = ['quality', 'reviewed_at']
     search_fields = ['user__username', 'word__hanzi']
     readonly_fields = ['created_at']
+
+
+@admin.register(UserSRSSummary)
+class UserSRSSummaryAdmin(admin.ModelAdmin):
+    list_display = ['user', 'total_reviews', 'correct_reviews', 'rebuilt_at', 'updated_at']
+    search_fields = ['user__username']
+    readonly_fields = ['rebuilt_at', 'updated_at']
+
+
+@admin.register(ReviewDailyRollup)
+class ReviewDailyRollupAdmin(admin.ModelAdmin):
+    list_display = ['user', 'date', 'reviews', 'correct_reviews', 'avg_review_time_seconds']
+    list_filter = ['date']
+    search_fields = ['user__username']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(ReviewRollupWatermark)
+class ReviewRollupWatermarkAdmin(admin.ModelAdmin):
+    list_display = ['user', 'rolled_up_through', 'updated_at']
+    search_fields = ['user__username']
+    readonly_fields = ['updated_at']
@@ -0,0 +1,95 @@
+"""
+Maintain monthly ReviewHistory partitions (PostgreSQL only)
+Run monthly: python manage.py manage_review_partitions [--months-ahead 3] [--drop-older-than MONTHS]
+
+Months whose rows landed in the DEFAULT partition (the command was not
+run ahead of them) get their own partition too, so retention can drop
+them later.
+"""
+from datetime import date, datetime, time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from vocab.models import ReviewDailyRollup, ReviewHistory
+from vocab.partitions import (
+    add_months, create_month_partition, default_partition_months, drop_partitions_before,
+    ensure_partitions, is_partitioned, list_partitions, month_start, partition_name
+)
+
+
+def _month_rolled_up(month: date) -> bool:
+    """
+    True if rollups account for every review of a month
+
+    Compares the (user, day) groups and the review count of the raw
+    history with the rollup rows of the same days.
+    """
+    end = add_months(month, 1)
+    history = ReviewHistory.objects.filter(
+        reviewed_at__gte=timezone.make_aware(datetime.combine(month, time.min)),
+        reviewed_at__lt=timezone.make_aware(datetime.combine(end, time.min))
+    ).order_by()
+    raw_reviews = history.count()
+    raw_days = history.annotate(day=TruncDate('reviewed_at')).values('user_id', 'day').distinct().count()
+    rolled = ReviewDailyRollup.objects.filter(date__gte=month, date__lt=end).aggregate(
+        days=Count('id'), reviews=Sum('reviews')
+    )
+    return raw_days == rolled['days'] and raw_reviews == (rolled['reviews'] or 0)
+
+
+class Command(BaseCommand):
+    help = 'Create upcoming ReviewHistory partitions and optionally drop old ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=3,
+                            help='Create partitions up to this many months ahead')
+        parser.add_argument('--drop-older-than', type=int, metavar='MONTHS',
+                            help='Drop raw history partitions older than this many months '
+                                 '(their totals must already be rolled up)')
+
+    def handle(self, *args, **options):
+        if not is_partitioned(connection):
+            self.stdout.write('ReviewHistory is not partitioned on this database, nothing to do')
+            return
+
+        this_month = month_start(timezone.localdate())
+        with transaction.atomic():
+            created = ensure_partitions(
+                connection, this_month, add_months(this_month, options['months_ahead'])
+            )
+        for name in created:
+            self.stdout.write(f'Created {name}')
+
+        # Months stuck in the DEFAULT partition: give them their own
+        # partition (their rows are moved out of DEFAULT)
+        for month in default_partition_months(connection):
+            if create_month_partition(connection, month):
+                self.stdout.write(f'Created {partition_name(month)} from rows in the DEFAULT partition')
+        stuck = default_partition_months(connection)
+        if stuck:
+            self.stderr.write(self.style.WARNING(
+                'The DEFAULT partition still holds rows of '
+                f"{', '.join(f'{month:%Y-%m}' for month in stuck)}; they cannot be dropped by retention"
+            ))
+
+        if options['drop_older_than'] is not None:
+            if options['drop_older_than'] < 1:
+                raise CommandError('--drop-older-than must be at least 1')
+            before = add_months(this_month, -options['drop_older_than'])
+            uncovered = [
+                name for name, month in list_partitions(connection)
+                if add_months(month, 1) <= before and not _month_rolled_up(month)
+            ]
+            if uncovered:
+                raise CommandError(
+                    f"Rollups do not cover {', '.join(uncovered)}, "
+                    'run rollup_review_history for those months first'
+                )
+            with transaction.atomic():
+                dropped = drop_partitions_before(connection, before)
+            for name in dropped:
+                self.stdout.write(f'Dropped {name}')
+
+        self.stdout.write(self.style.SUCCESS('ReviewHistory partitions are up to date'))
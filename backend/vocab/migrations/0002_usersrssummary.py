@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:27
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('vocab', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSRSSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level_counts', models.JSONField(default=dict)),
+                ('due_histogram', models.JSONField(default=dict)),
+                ('total_reviews', models.IntegerField(default=0)),
+                ('correct_reviews', models.IntegerField(default=0)),
+                ('rebuilt_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='srs_summary', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'User SRS Summary',
+                'verbose_name_plural': 'User SRS Summaries',
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vocab', '0002_usersrssummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wordprogress',
+            name='difficulty',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='wordprogress',
+            name='stability',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
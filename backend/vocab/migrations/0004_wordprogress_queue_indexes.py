@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vocab', '0003_srs_scheduler'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='wordprogress',
+            index=models.Index(condition=models.Q(('srs_level__gt', 0)), fields=['user', 'next_review_date', 'ease_factor'], name='wp_due_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wordprogress',
+            index=models.Index(fields=['user', 'srs_level'], name='wp_user_level_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:33
+
+from django.db import migrations, models
+
+
+def backfill_struggle_score(apps, schema_editor):
+    """Same formula as WordProgress.refresh_struggle_score"""
+    WordProgress = apps.get_model('vocab', 'WordProgress')
+    batch = []
+    for wp in WordProgress.objects.filter(total_reviews__gt=0).only(
+        'id', 'srs_level', 'total_reviews', 'correct_reviews'
+    ).iterator(chunk_size=2000):
+        accuracy = wp.correct_reviews / wp.total_reviews
+        if wp.srs_level > 2 and accuracy >= 0.7:
+            continue
+        wp.struggle_score = round(1 + (1 - accuracy) + max(0, 3 - wp.srs_level) / 3, 4)
+        batch.append(wp)
+        if len(batch) >= 2000:
+            WordProgress.objects.bulk_update(batch, ['struggle_score'])
+            batch = []
+    if batch:
+        WordProgress.objects.bulk_update(batch, ['struggle_score'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vocab', '0004_wordprogress_queue_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wordprogress',
+            name='struggle_score',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddIndex(
+            model_name='wordprogress',
+            index=models.Index(condition=models.Q(('struggle_score__gt', 0)), fields=['user', '-struggle_score', 'id'], name='wp_struggle_idx'),
+        ),
+        migrations.RunPython(backfill_struggle_score, migrations.RunPython.noop),
+    ]
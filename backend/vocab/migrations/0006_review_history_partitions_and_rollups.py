@@ -0,0 +1,115 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:35
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Monthly partitions are created from the month of the oldest review
+# through this many months after the current one (the default of
+# manage_review_partitions --months-ahead, which creates later months)
+MONTHS_AHEAD = 3
+
+
+def partition_review_history(apps, schema_editor):
+    """
+    Rebuild vocab_reviewhistory as a table partitioned by month (PostgreSQL only)
+
+    The primary key becomes (id, reviewed_at): PostgreSQL requires the
+    partition key in every unique constraint. Every month of the existing
+    history gets its own partition, so none of it lands in DEFAULT.
+    Secondary indexes and foreign keys of the original table are
+    recreated on the new parent.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+
+    table = 'vocab_reviewhistory'
+    old_table = f'{table}_unpartitioned'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT indexdef FROM pg_indexes WHERE tablename = %s "
+            "AND schemaname = current_schema() AND indexname NOT IN ("
+            "  SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype IN ('p', 'u'))",
+            [table, table]
+        )
+        index_defs = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'f'",
+            [table]
+        )
+        foreign_keys = cursor.fetchall()
+
+        cursor.execute(f"ALTER TABLE {table} RENAME TO {old_table}")
+        cursor.execute(
+            f"CREATE TABLE {table} (LIKE {old_table} INCLUDING DEFAULTS INCLUDING IDENTITY "
+            f"INCLUDING CONSTRAINTS) PARTITION BY RANGE (reviewed_at)"
+        )
+        cursor.execute(f"ALTER TABLE {table} ADD PRIMARY KEY (id, reviewed_at)")
+        cursor.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+        cursor.execute(
+            "SELECT month::date, (month + interval '1 month')::date FROM generate_series("
+            f"  (SELECT date_trunc('month', COALESCE(MIN(reviewed_at), now())) FROM {old_table}),"
+            f"  date_trunc('month', now()) + interval '{MONTHS_AHEAD} months',"
+            "  interval '1 month'"
+            ") AS month"
+        )
+        for start, end in cursor.fetchall():
+            cursor.execute(
+                f"CREATE TABLE {table}_p{start:%Y%m} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{start}') TO ('{end}')"
+            )
+
+        cursor.execute(f"INSERT INTO {table} SELECT * FROM {old_table}")
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f"COALESCE(MAX(id), 0) + 1, false) FROM {table}"
+        )
+        cursor.execute(f"DROP TABLE {old_table}")
+        for index_def in index_defs:
+            cursor.execute(index_def)
+        for name, definition in foreign_keys:
+            cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('vocab', '0005_wordprogress_struggle_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('reviews', models.IntegerField(default=0)),
+                ('correct_reviews', models.IntegerField(default=0)),
+                ('total_review_time_seconds', models.IntegerField(default=0)),
+                ('quality_counts', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Review Daily Rollup',
+                'verbose_name_plural': 'Review Daily Rollups',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='reviewhistory',
+            index=models.Index(fields=['user', 'reviewed_at'], name='rh_user_reviewed_idx'),
+        ),
+        migrations.AddField(
+            model_name='reviewdailyrollup',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='review_rollups', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='reviewdailyrollup',
+            constraint=models.UniqueConstraint(fields=('user', 'date'), name='unique_review_rollup_user_date'),
+        ),
+        migrations.RunPython(partition_review_history, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('vocab', '0006_review_history_partitions_and_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewRollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rolled_up_through', models.DateField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='review_rollup_watermark', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Review Rollup Watermark',
+                'verbose_name_plural': 'Review Rollup Watermarks',
+            },
+        ),
+    ]
@@ -121,11 +121,18 @@ class WordProgress(models.Model):
     interval_days = models.IntegerField(default=0)
     next_review_date = models.DateTimeField(null=True, blank=True)
 
+    # Memory model state (FSRS scheduler; unused by SM-2)
+    stability = models.FloatField(null=True, blank=True)  # Days until recall drops to 90%
+    difficulty = models.FloatField(null=True, blank=True)  # 1 (easy) - 10 (hard)
+
     # Statistics
     total_reviews = models.IntegerField(default=0)
     correct_reviews = models.IntegerField(default=0)
     last_reviewed_at = models.DateTimeField(null=True, blank=True)
 
+    # Mistakes queue ranking, maintained by refresh_struggle_score (0 = not a mistake)
+    struggle_score = models.FloatField(default=0.0)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -134,6 +141,23 @@ class WordProgress(models.Model):
         verbose_name_plural = 'Word Progress'
         unique_together = [['user', 'word']]
         ordering = ['user', 'next_review_date']
+        indexes = [
+            # Due queue (get_srs_batch, get_due_count): range on next_review_date,
+            # ordered by next_review_date, ease_factor; level 0 is never due
+            models.Index(
+                fields=['user', 'next_review_date', 'ease_factor'],
+                condition=models.Q(srs_level__gt=0),
+                name='wp_due_queue_idx'
+            ),
+            # Mistakes queue (get_mistakes_batch): top-k by struggle_score, keyset on id
+            models.Index(
+                fields=['user', '-struggle_score', 'id'],
+                condition=models.Q(struggle_score__gt=0),
+                name='wp_struggle_idx'
+            ),
+            # Per-level counts (stats, summaries, by_status)
+            models.Index(fields=['user', 'srs_level'], name='wp_user_level_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.word.hanzi} (Level {self.srs_level})"
@@ -145,6 +169,26 @@ class WordProgress(models.Model):
             return 0.0
         return round(self.correct_reviews / self.total_reviews, 2)
 
+    # Words below this accuracy (or at SRS level 0-2) are "mistakes"
+    MISTAKE_ACCURACY_THRESHOLD = 0.7
+
+    def refresh_struggle_score(self):
+        """
+        Recompute struggle_score from the SRS state
+
+        A reviewed word is a mistake if its SRS level is 0-2 or its
+        accuracy is below 70%. Mistakes score between 1 and 3: lower
+        accuracy and lower levels score higher. Everything else scores 0.
+        """
+        if self.total_reviews == 0:
+            self.struggle_score = 0.0
+            return
+        accuracy = self.correct_reviews / self.total_reviews
+        if self.srs_level > 2 and accuracy >= self.MISTAKE_ACCURACY_THRESHOLD:
+            self.struggle_score = 0.0
+            return
+        self.struggle_score = round(1 + (1 - accuracy) + max(0, 3 - self.srs_level) / 3, 4)
+
 
 class ReviewHistory(models.Model):
     """
@@ -182,6 +226,106 @@ class ReviewHistory(models.Model):
         verbose_name = 'Review History'
         verbose_name_plural = 'Review History'
         ordering = ['-reviewed_at']
+        # Partitioned by month on reviewed_at on PostgreSQL (see vocab.partitions)
+        indexes = [
+            models.Index(fields=['user', 'reviewed_at'], name='rh_user_reviewed_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.word.hanzi} - Q{self.quality}"
+
+
+class UserSRSSummary(models.Model):
+    """
+    Materialized per-user SRS counters for the main screen
+    Maintained incrementally by learning.srs_summary
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='srs_summary'
+    )
+
+    # Word counts per SRS level: {"0": n, "1": n, ..., "8": n}
+    level_counts = models.JSONField(default=dict)
+
+    # Words with srs_level > 0 by next_review_date hour: {"YYYY-MM-DDTHH": n}
+    due_histogram = models.JSONField(default=dict)
+
+    # Review totals (mirror of WordProgress.total_reviews / correct_reviews)
+    total_reviews = models.IntegerField(default=0)
+    correct_reviews = models.IntegerField(default=0)
+
+    rebuilt_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'User SRS Summary'
+        verbose_name_plural = 'User SRS Summaries'
+
+    def __str__(self):
+        return f"{self.user.username} - SRS summary"
+
+
+class ReviewDailyRollup(models.Model):
+    """
+    Per-user daily totals of ReviewHistory
+    Written by the rollup_review_history management command (see
+    learning.review_rollups); only complete days are rolled up
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='review_rollups'
+    )
+    date = models.DateField()
+
+    reviews = models.IntegerField(default=0)
+    correct_reviews = models.IntegerField(default=0)
+    total_review_time_seconds = models.IntegerField(default=0)
+
+    # Reviews per SM-2 quality rating: {"0": n, ..., "5": n}
+    quality_counts = models.JSONField(default=dict)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Review Daily Rollup'
+        verbose_name_plural = 'Review Daily Rollups'
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date'], name='unique_review_rollup_user_date'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.date} ({self.reviews} reviews)"
+
+    @property
+    def avg_review_time_seconds(self):
+        if self.reviews == 0:
+            return 0.0
+        return round(self.total_review_time_seconds / self.reviews, 1)
+
+
+class ReviewRollupWatermark(models.Model):
+    """
+    Last day up to which a user's ReviewHistory is completely rolled up
+    Every day up to rolled_up_through is covered by ReviewDailyRollup (days
+    without reviews have no row); later days are read from raw history.
+    Advanced by learning.review_rollups.rollup_reviews
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='review_rollup_watermark'
+    )
+    rolled_up_through = models.DateField()
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Review Rollup Watermark'
+        verbose_name_plural = 'Review Rollup Watermarks'
+
+    def __str__(self):
+        return f"{self.user.username} - rolled up through {self.rolled_up_through}"
@@ -0,0 +1,172 @@
+"""
+Monthly range partitioning of vocab_reviewhistory (PostgreSQL only)
+
+On PostgreSQL the review history table is partitioned by reviewed_at into
+one partition per month (vocab_reviewhistory_pYYYYMM) plus a DEFAULT
+partition that catches rows outside the created ranges. The primary key
+becomes (id, reviewed_at) because PostgreSQL requires the partition key
+in every unique constraint; Django still addresses rows by id.
+
+On other databases (SQLite in development) every function here is a
+no-op and ReviewHistory stays a plain table.
+
+Partitions are created ahead of time by the manage_review_partitions
+management command so the DEFAULT partition stays empty. Rows that land
+in DEFAULT anyway (a month the command did not create in time) are moved
+into their month's partition when it is created.
+"""
+from datetime import date
+from typing import List, Tuple
+from django.db import transaction
+
+TABLE = 'vocab_reviewhistory'
+DEFAULT_PARTITION = f'{TABLE}_default'
+
+
+def supports_partitioning(connection) -> bool:
+    return connection.vendor == 'postgresql'
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(day: date, months: int) -> date:
+    """First day of the month `months` after day's month"""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f'{TABLE}_p{month:%Y%m}'
+
+
+def is_partitioned(connection) -> bool:
+    """True if the review history table is a partitioned table"""
+    if not supports_partitioning(connection):
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relkind FROM pg_class c "
+            "WHERE c.relname = %s AND c.relnamespace = current_schema()::regnamespace",
+            [TABLE]
+        )
+        row = cursor.fetchone()
+    return bool(row) and row[0] == 'p'
+
+
+def list_partitions(connection) -> List[Tuple[str, date]]:
+    """(name, month) of every monthly partition, oldest first"""
+    if not is_partitioned(connection):
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = %s",
+            [TABLE]
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    prefix = f'{TABLE}_p'
+    partitions = []
+    for name in names:
+        suffix = name[len(prefix):]
+        if name.startswith(prefix) and len(suffix) == 6 and suffix.isdigit():
+            partitions.append((name, date(int(suffix[:4]), int(suffix[4:]), 1)))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def create_month_partition(connection, month: date) -> bool:
+    """
+    Create the partition for one month if missing
+
+    PostgreSQL rejects a new partition while the DEFAULT partition holds
+    rows of its range, so DEFAULT is detached, the month's rows are moved
+    into the new partition and DEFAULT is attached again, all in one
+    transaction.
+
+    Returns:
+        True if the partition was created
+    """
+    month = month_start(month)
+    name = partition_name(month)
+    start, end = month.isoformat(), add_months(month, 1).isoformat()
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s)", [name])
+        if cursor.fetchone()[0] is not None:
+            return False
+        cursor.execute(
+            f"SELECT 1 FROM {DEFAULT_PARTITION} WHERE reviewed_at >= %s AND reviewed_at < %s LIMIT 1",
+            [start, end]
+        )
+        if cursor.fetchone() is None:
+            cursor.execute(
+                f"CREATE TABLE {name} PARTITION OF {TABLE} "
+                f"FOR VALUES FROM ('{start}') TO ('{end}')"
+            )
+            return True
+
+        cursor.execute(f"ALTER TABLE {TABLE} DETACH PARTITION {DEFAULT_PARTITION}")
+        cursor.execute(
+            f"CREATE TABLE {name} PARTITION OF {TABLE} "
+            f"FOR VALUES FROM ('{start}') TO ('{end}')"
+        )
+        cursor.execute(
+            f"INSERT INTO {name} SELECT * FROM {DEFAULT_PARTITION} "
+            f"WHERE reviewed_at >= %s AND reviewed_at < %s",
+            [start, end]
+        )
+        cursor.execute(
+            f"DELETE FROM {DEFAULT_PARTITION} WHERE reviewed_at >= %s AND reviewed_at < %s",
+            [start, end]
+        )
+        cursor.execute(f"ALTER TABLE {TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT")
+    return True
+
+
+def default_partition_months(connection) -> List[date]:
+    """Months that have rows in the DEFAULT partition, oldest first"""
+    if not is_partitioned(connection):
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT DISTINCT date_trunc('month', reviewed_at)::date FROM {DEFAULT_PARTITION} ORDER BY 1"
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def ensure_partitions(connection, first_month: date, last_month: date) -> List[str]:
+    """
+    Create monthly partitions from first_month to last_month (inclusive)
+
+    Returns:
+        Names of the partitions created
+    """
+    if not is_partitioned(connection):
+        return []
+    created = []
+    month = month_start(first_month)
+    while month <= last_month:
+        if create_month_partition(connection, month):
+            created.append(partition_name(month))
+        month = add_months(month, 1)
+    return created
+
+
+def drop_partitions_before(connection, before: date) -> List[str]:
+    """
+    Drop monthly partitions that end on or before `before`
+
+    Returns:
+        Names of the partitions dropped
+    """
+    dropped = []
+    for name, month in list_partitions(connection):
+        if add_months(month, 1) <= before:
+            with connection.cursor() as cursor:
+                cursor.execute(f"DROP TABLE {name}")
+            dropped.append(name)
+    return dropped
+